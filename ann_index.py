@@ -0,0 +1,333 @@
+# ann_index.py
+#
+# Approximate nearest-neighbor search by cosine similarity, using
+# random-projection LSH (SimHash).
+#
+# Every vector is hashed into `n_tables` buckets of `n_bits` sign bits each.
+# A query only looks at the vectors sharing a bucket with it (optionally also
+# the buckets one bit away, `probe=1`) and re-ranks those candidates exactly.
+#
+# Trade-off knobs:
+#   more tables / probe=1  → higher recall, more candidates to re-rank
+#   more bits              → smaller buckets, faster queries, lower recall
+#
+# Benchmark (recall against exact search):
+#   python ann_index.py --n 50000 --dim 64
+
+import argparse
+import time
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+# incremental adds append blocks; merge them once there are this many
+_MAX_BLOCKS = 32
+
+
+def _normalize(X):
+    """L2-normalize rows of a dense array or sparse matrix."""
+    if sparse.issparse(X):
+        X = sparse.csr_matrix(X, dtype=np.float32)
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sparse.diags(1.0 / norms).dot(X).tocsr().astype(np.float32)
+
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+class LSHIndex:
+    def __init__(
+        self,
+        dim: int,
+        n_tables: int = 8,
+        n_bits: int = 12,
+        probe: int = 0,
+        seed: int = 0,
+        planes: Optional[np.ndarray] = None,
+    ):
+        """planes: reuse another index's hyperplanes (same dim / tables / bits)."""
+        if n_bits > 63:
+            raise ValueError("n_bits must be ≤ 63")
+        self.dim = dim
+        self.n_tables = n_tables
+        self.n_bits = n_bits
+        self.probe = probe
+        self.seed = seed
+
+        if planes is None:
+            rng = np.random.default_rng(seed)
+            planes = rng.standard_normal((dim, n_tables * n_bits)).astype(np.float32)
+        elif planes.shape != (dim, n_tables * n_bits):
+            raise ValueError(f"planes must be {dim} × {n_tables * n_bits}")
+        self.planes = planes
+        self._weights = (1 << np.arange(n_bits, dtype=np.int64))
+
+        self.keys: List[Hashable] = []
+        self.key_to_row: Dict[Hashable, int] = {}
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(n_tables)]
+
+        self._blocks: list = []       # vectors as added (dense arrays or CSR)
+        self._starts: List[int] = []  # first row of each block
+        self._codes: List[np.ndarray] = []
+        self._sparse: Optional[bool] = None
+
+    def __len__(self) -> int:
+        return len(self.key_to_row)
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+
+    def _hash(self, X) -> np.ndarray:
+        """(n, dim) → (n, n_tables) integer bucket codes."""
+        proj = X @ self.planes
+        proj = np.asarray(proj.todense() if sparse.issparse(proj) else proj)
+        bits = (proj > 0).reshape(-1, self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._weights
+
+    def add(self, keys: Sequence[Hashable], X) -> None:
+        """Insert vectors incrementally; keys must be new."""
+        keys = list(keys)
+        if not keys:
+            return
+        X = _normalize(X)
+        if X.shape != (len(keys), self.dim):
+            raise ValueError(f"expected {len(keys)} × {self.dim} vectors, got {X.shape}")
+        if self._sparse is None:
+            self._sparse = sparse.issparse(X)
+        elif self._sparse != sparse.issparse(X):
+            raise ValueError("cannot mix dense and sparse vectors in one index")
+
+        start = len(self.keys)
+        for offset, key in enumerate(keys):
+            if key in self.key_to_row:
+                raise KeyError(f"duplicate key: {key!r}")
+            self.key_to_row[key] = start + offset
+        self.keys.extend(keys)
+
+        codes = self._hash(X)
+        for t in range(self.n_tables):
+            table = self.buckets[t]
+            for offset, code in enumerate(codes[:, t].tolist()):
+                table.setdefault(code, []).append(start + offset)
+
+        self._codes.append(codes)
+        self._blocks.append(X)
+        self._starts.append(start)
+        if len(self._blocks) > _MAX_BLOCKS:
+            self._compact()
+
+    def remove(self, key: Hashable) -> None:
+        """
+        Drop a key from the buckets so queries stop returning it. Its row
+        stays allocated until the index is rebuilt.
+        """
+        row = self.key_to_row.pop(key)
+        b = int(np.searchsorted(self._starts, row, side="right")) - 1
+        codes = self._codes[b][row - self._starts[b]]
+        for t in range(self.n_tables):
+            bucket = self.buckets[t].get(int(codes[t]))
+            if bucket is not None:
+                bucket.remove(row)
+                if not bucket:
+                    del self.buckets[t][int(codes[t])]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.key_to_row
+
+    def _compact(self) -> None:
+        if len(self._blocks) > 1:
+            if self._sparse:
+                self._blocks = [sparse.vstack(self._blocks, format="csr")]
+            else:
+                self._blocks = [np.vstack(self._blocks)]
+            self._codes = [np.vstack(self._codes)]
+            self._starts = [0]
+
+    @property
+    def vectors(self):
+        if not self._blocks:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        self._compact()
+        return self._blocks[0]
+
+    @property
+    def codes(self) -> np.ndarray:
+        if not self._codes:
+            return np.zeros((0, self.n_tables), dtype=np.int64)
+        self._compact()
+        return self._codes[0]
+
+    def _take(self, rows: np.ndarray):
+        """Vectors for sorted `rows` without merging the blocks."""
+        if len(self._blocks) == 1:
+            return self._blocks[0][rows]
+        which = np.searchsorted(self._starts, rows, side="right") - 1
+        parts = [
+            self._blocks[b][rows[which == b] - self._starts[b]]
+            for b in np.unique(which)
+        ]
+        return sparse.vstack(parts, format="csr") if self._sparse else np.vstack(parts)
+
+    # -----------------------------
+    # Querying
+    # -----------------------------
+
+    def _probe_codes(self, code: int) -> List[int]:
+        if self.probe <= 0:
+            return [code]
+        return [code] + [code ^ (1 << b) for b in range(self.n_bits)]
+
+    def candidates(self, q) -> np.ndarray:
+        """Rows sharing a (probed) bucket with q in any table."""
+        code = self._hash(_normalize(q))[0]
+        found = []
+        for t in range(self.n_tables):
+            table = self.buckets[t]
+            for c in self._probe_codes(int(code[t])):
+                rows = table.get(c)
+                if rows:
+                    found.append(rows)
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate([np.asarray(r) for r in found]))
+
+    def query(
+        self,
+        q,
+        k: int = 10,
+        exclude: Optional[Hashable] = None,
+    ) -> List[Tuple[Hashable, float]]:
+        """Approximate top-k [(key, cosine)] for one query vector."""
+        rows = self.candidates(q)
+        if exclude is not None and exclude in self.key_to_row:
+            rows = rows[rows != self.key_to_row[exclude]]
+        if len(rows) == 0:
+            return []
+
+        q = _normalize(q)
+        sims = self._take(rows) @ q.T
+        sims = np.asarray(sims.todense() if sparse.issparse(sims) else sims).ravel()
+
+        k = min(k, len(rows))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self.keys[rows[i]], float(sims[i])) for i in top]
+
+    def exact_query(self, q, k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Brute-force top-k, for measuring recall."""
+        if not len(self):
+            return []
+        rows = self._live_rows()
+        sims = self.vectors[rows] @ _normalize(q).T
+        sims = np.asarray(sims.todense() if sparse.issparse(sims) else sims).ravel()
+        k = min(k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(self.keys[rows[i]], float(sims[i])) for i in top]
+
+    def _live_rows(self) -> np.ndarray:
+        return np.sort(np.fromiter(self.key_to_row.values(), dtype=np.int64))
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+
+    def save(self, path: str) -> None:
+        """Only live rows are written, so removed keys are compacted away."""
+        rows = self._live_rows()
+        X = self.vectors[rows] if len(rows) else self.vectors
+        keys = [self.keys[r] for r in rows]
+        # integer keys keep their dtype, so a loaded index answers like the
+        # one that was saved; anything else is stored as str
+        if keys and all(isinstance(k, (int, np.integer)) and not isinstance(k, bool) for k in keys):
+            keys = np.array(keys, dtype=np.int64)
+        else:
+            keys = np.array([str(k) for k in keys], dtype=str)
+        arrays = dict(
+            config=np.array([self.dim, self.n_tables, self.n_bits, self.probe, self.seed]),
+            planes=self.planes,
+            codes=self.codes[rows] if len(rows) else self.codes,
+            keys=keys,
+            is_sparse=np.array(bool(self._sparse)),
+        )
+        if self._sparse:
+            arrays.update(data=X.data, indices=X.indices, indptr=X.indptr)
+        else:
+            arrays.update(vectors=X)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "LSHIndex":
+        """Integer keys come back as int, all others as str."""
+        with np.load(path) as data:
+            dim, n_tables, n_bits, probe, seed = (int(v) for v in data["config"])
+            index = cls(dim, n_tables=n_tables, n_bits=n_bits, probe=probe, seed=seed)
+            index.planes = data["planes"]
+            keys = data["keys"].tolist()
+            if bool(data["is_sparse"]):
+                X = sparse.csr_matrix(
+                    (data["data"], data["indices"], data["indptr"]), shape=(len(keys), dim)
+                )
+            else:
+                X = data["vectors"]
+            codes = data["codes"]
+
+        index.keys = keys
+        index.key_to_row = {k: i for i, k in enumerate(keys)}
+        for t in range(n_tables):
+            table = index.buckets[t]
+            for row, code in enumerate(codes[:, t].tolist()):
+                table.setdefault(code, []).append(row)
+        index._sparse = bool(sparse.issparse(X))
+        if keys:
+            index._blocks, index._codes, index._starts = [X], [codes], [0]
+        return index
+
+
+# -----------------------------
+# Benchmark
+# -----------------------------
+
+def recall_at_k(index: LSHIndex, queries: np.ndarray, k: int = 10) -> Tuple[float, float, float]:
+    """(recall@k, mean ANN ms/query, mean exact ms/query)."""
+    hits, ann_s, exact_s = 0, 0.0, 0.0
+    for q in queries:
+        t0 = time.perf_counter()
+        approx = {key for key, _ in index.query(q, k)}
+        t1 = time.perf_counter()
+        exact = {key for key, _ in index.exact_query(q, k)}
+        t2 = time.perf_counter()
+        hits += len(approx & exact)
+        ann_s += t1 - t0
+        exact_s += t2 - t1
+    n = len(queries)
+    return hits / (n * k), 1000 * ann_s / n, 1000 * exact_s / n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LSH recall / latency benchmark.")
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # clustered data, like venues grouped by city × activity
+    rng = np.random.default_rng(args.seed)
+    centers = rng.standard_normal((max(1, args.n // 200), args.dim))
+    X = centers[rng.integers(len(centers), size=args.n)] + 0.5 * rng.standard_normal((args.n, args.dim))
+    Q = X[rng.choice(args.n, size=args.queries, replace=False)] + 0.1 * rng.standard_normal((args.queries, args.dim))
+
+    print(f"{args.n} vectors × {args.dim} dims, recall@{args.k} vs exact search")
+    print(f"{'tables':>6} {'bits':>4} {'probe':>5} {'recall':>7} {'ann ms':>8} {'exact ms':>9}")
+    for n_tables, n_bits, probe in [(8, 16, 0), (16, 16, 0), (8, 16, 1), (16, 16, 1), (16, 12, 1)]:
+        index = LSHIndex(args.dim, n_tables=n_tables, n_bits=n_bits, probe=probe, seed=args.seed)
+        index.add(range(args.n), X)
+        recall, ann_ms, exact_ms = recall_at_k(index, Q, args.k)
+        print(f"{n_tables:>6} {n_bits:>4} {probe:>5} {recall:>7.3f} {ann_ms:>8.3f} {exact_ms:>9.3f}")
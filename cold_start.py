@@ -0,0 +1,290 @@
+# cold_start.py
+#
+# Precomputed rankings for cold-start users.
+#
+# A user with no ratings gets the same answer as anyone else standing in the
+# same place with the same preferences, so those answers are computed ahead
+# of time by a background job:
+#   key    geocell × activities × env × intensity
+#          (geocell = lat/lon snapped to a cell_deg grid, "*" = no location)
+#   value  ranked venues at the cell center, by proximity, preference
+#          similarity and aggregate rating (popularity_scores)
+# Lists are stored as uint16 venue ids in one flat array + offsets, so the
+# whole table is a few hundred KB and a request is one dict lookup.
+#
+#   python cold_start.py --out cold_start.npz
+
+import argparse
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from gyms import GYMS
+from recommender_system import ALL_ENVS, ALL_TYPES
+from recommendation_pipeline import (
+    PopularityScore,
+    RequestContext,
+    default_pipeline,
+)
+from regions import ShardedCatalog, ShardedRecommender
+
+CELL_DEG = 0.02                         # ≈ 2.2 km north-south
+PAD_CELLS = 5                           # cells around the venues' bounding box
+INTENSITIES = [None, "low", "medium", "high"]
+
+Combo = Tuple[Tuple[str, ...], Optional[str], Optional[str]]
+
+
+def normalize_intensity(intensity: Optional[str]) -> Optional[str]:
+    """Same buckets as _match_intensity / _encode_user."""
+    if not intensity:
+        return None
+    s = str(intensity).lower()
+    if s.startswith("low") or s == "1":
+        return "low"
+    if s.startswith("med") or s == "2":
+        return "medium"
+    if s.startswith("high") or s == "3":
+        return "high"
+    return None
+
+
+def normalize_combo(
+    activities: Optional[Sequence[str]], env: Optional[str], intensity: Optional[str]
+) -> Combo:
+    return tuple(sorted(set(activities or ()))), env or None, normalize_intensity(intensity)
+
+
+def geocell(lat: Optional[float], lon: Optional[float], cell_deg: float = CELL_DEG) -> str:
+    if lat is None or lon is None:
+        return "*"
+    return f"{math.floor(lat / cell_deg)}:{math.floor(lon / cell_deg)}"
+
+
+def cell_center(cell: str, cell_deg: float = CELL_DEG) -> Tuple[Optional[float], Optional[float]]:
+    if cell == "*":
+        return None, None
+    i, j = map(int, cell.split(":"))
+    return (i + 0.5) * cell_deg, (j + 0.5) * cell_deg
+
+
+def cells_around(gyms: Iterable[dict], cell_deg: float = CELL_DEG, pad: int = PAD_CELLS) -> List[str]:
+    """Every cell within `pad` cells of some venue, plus "*"."""
+    cells = {"*"}
+    for g in gyms:
+        i = math.floor(g["latitude"] / cell_deg)
+        j = math.floor(g["longitude"] / cell_deg)
+        for di in range(-pad, pad + 1):
+            for dj in range(-pad, pad + 1):
+                cells.add(f"{i + di}:{j + dj}")
+    return sorted(cells)
+
+
+def default_combos(observed: Iterable[Combo] = ()) -> List[Combo]:
+    """No / one activity × every env × every intensity, plus observed combos."""
+    combos = {
+        ((a,) if a else (), e, i)
+        for a, e, i in itertools.product([None] + ALL_TYPES, [None] + ALL_ENVS, INTENSITIES)
+    }
+    combos.update(observed)
+    return sorted(combos, key=lambda c: (len(c[0]), c[0], c[1] or "", c[2] or ""))
+
+
+def observed_combos(user_docs: Iterable[dict], min_users: int = 3) -> List[Combo]:
+    """Preference combinations shared by at least min_users stored users."""
+    counts: Dict[Combo, int] = {}
+    for u in user_docs:
+        p = u.get("preferences") or {}
+        c = normalize_combo(p.get("activities"), p.get("env"), p.get("intensity"))
+        counts[c] = counts.get(c, 0) + 1
+    return [c for c, n in counts.items() if n >= min_users]
+
+
+def _key(cell: str, combo: Combo) -> str:
+    acts, env, intensity = combo
+    return f"{cell}|{','.join(acts)}|{env or ''}|{intensity or ''}"
+
+
+# -----------------------------
+# Table
+# -----------------------------
+
+class ColdStartTable:
+    def __init__(
+        self,
+        names: List[str],
+        keys: List[str],
+        offsets: np.ndarray,
+        flat: np.ndarray,
+        cell_deg: float = CELL_DEG,
+    ):
+        self.names = names
+        self.offsets = offsets
+        self.flat = flat
+        self.cell_deg = cell_deg
+        self.slot = {k: i for i, k in enumerate(keys)}
+
+    def __len__(self) -> int:
+        return len(self.slot)
+
+    def lookup(
+        self,
+        activities: Optional[Sequence[str]],
+        env: Optional[str],
+        intensity: Optional[str],
+        lat: Optional[float] = None,
+        lon: Optional[float] = None,
+    ) -> Optional[List[str]]:
+        """Precomputed list for this cell and combo, or None if not covered."""
+        cell = geocell(lat, lon, self.cell_deg)
+        i = self.slot.get(_key(cell, normalize_combo(activities, env, intensity)))
+        if i is None:
+            return None
+        ids = self.flat[self.offsets[i]:self.offsets[i + 1]]
+        return [self.names[j] for j in ids.tolist()]
+
+    def save(self, path: str) -> None:
+        keys = sorted(self.slot, key=self.slot.get)
+        np.savez_compressed(
+            path,
+            names=np.array(self.names),
+            keys=np.array(keys),
+            offsets=self.offsets,
+            flat=self.flat,
+            cell_deg=np.array(self.cell_deg),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ColdStartTable":
+        with np.load(path) as data:
+            return cls(
+                names=data["names"].tolist(),
+                keys=data["keys"].tolist(),
+                offsets=data["offsets"],
+                flat=data["flat"],
+                cell_deg=float(data["cell_deg"]),
+            )
+
+
+def build_table(
+    recommender: ShardedRecommender,
+    cells: Sequence[str],
+    combos: Sequence[Combo],
+    top_k: int = 15,
+    cell_deg: float = CELL_DEG,
+) -> ColdStartTable:
+    names = sorted(recommender.catalog.order, key=recommender.catalog.order.get)
+    if len(names) > np.iinfo(np.uint16).max:
+        raise ValueError("catalog too large for uint16 venue ids")
+    ids = {n: i for i, n in enumerate(names)}
+
+    keys: List[str] = []
+    offsets = [0]
+    flat: List[int] = []
+    for cell in cells:
+        lat, lon = cell_center(cell, cell_deg)
+        for combo in combos:
+            acts, env, intensity = combo
+            ctx = RequestContext(list(acts) or None, env, intensity, lat, lon)
+            ranked = recommender.run(ctx, top_k=top_k).names
+            keys.append(_key(cell, combo))
+            flat.extend(ids[n] for n in ranked)
+            offsets.append(len(flat))
+
+    return ColdStartTable(
+        names, keys,
+        np.asarray(offsets, dtype=np.int32),
+        np.asarray(flat, dtype=np.uint16),
+        cell_deg,
+    )
+
+
+def cold_start_recommender(
+    gyms: Iterable[dict] = GYMS,
+    popularity: Optional[Dict[str, float]] = None,
+) -> ShardedRecommender:
+    """Sharded pipeline with the aggregate rating as an extra scorer."""
+    def make_pipeline(filters):
+        pipe = default_pipeline(popularity=popularity, filters=filters)
+        if popularity:
+            pipe.scorers.append(PopularityScore(popularity))
+        return pipe
+
+    return ShardedRecommender(ShardedCatalog(gyms), make_pipeline=make_pipeline)
+
+
+class ColdStartCache:
+    """The live table, rebuilt by build_fn on a background thread."""
+
+    def __init__(self, build_fn: Callable[[], ColdStartTable], path: Optional[str] = None):
+        self.build_fn = build_fn
+        self.path = path
+        self.table: Optional[ColdStartTable] = None
+        if path and os.path.exists(path):
+            self.table = ColdStartTable.load(path)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def lookup(self, *args, **kwargs) -> Optional[List[str]]:
+        table = self.table
+        return table.lookup(*args, **kwargs) if table is not None else None
+
+    def refresh(self) -> None:
+        table = self.build_fn()
+        if self.path:
+            table.save(self.path)
+        self.table = table
+
+    def start_background_refresh(self, interval_s: float = 3600.0) -> None:
+        """Build now (unless loaded from disk), then every interval_s seconds."""
+        def loop():
+            if self.table is None:
+                self.refresh()
+            while not self._stop.wait(interval_s):
+                self.refresh()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="cold-start-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute cold-start rankings per geocell.")
+    parser.add_argument("--out", default="cold_start.npz")
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--from-mongo", action="store_true",
+                        help="use aggregate ratings and users' preference combos from MongoDB")
+    args = parser.parse_args()
+
+    popularity, observed = None, []
+    if args.from_mongo:
+        from mongodb import ratings_collection, users_collection
+        from recommendation_pipeline import popularity_scores
+
+        popularity = popularity_scores(ratings_collection.find({}, {"gym_name": 1, "rating": 1}))
+        observed = observed_combos(users_collection.find({}, {"preferences": 1}))
+
+    t0 = time.perf_counter()
+    cells = cells_around(GYMS)
+    combos = default_combos(observed)
+    table = build_table(cold_start_recommender(GYMS, popularity), cells, combos, top_k=args.top_k)
+    table.save(args.out)
+    print(f"{len(cells)} cells × {len(combos)} combos = {len(table)} lists, "
+          f"{table.flat.nbytes / 1024:.0f} KB ids, built in {time.perf_counter() - t0:.1f}s → {args.out}")
+
+    t0 = time.perf_counter()
+    for _ in range(10000):
+        table.lookup(["Boxing"], "Indoor", "High", 45.50, -73.57)
+    print(f"lookup: {1e6 * (time.perf_counter() - t0) / 10000:.1f} µs")
+    print(table.lookup(["Boxing"], "Indoor", "High", 45.50, -73.57))
@@ -0,0 +1,178 @@
+# content_cache.py
+#
+# On-disk cache of fitted content models, keyed by a hash of the catalog.
+#
+# Content-Based.py / Hybrid.py used to refit TF-IDF and recompute similarities
+# in every process at startup. A fitted model (vectorizer vocabulary + idf,
+# TF-IDF matrix, neighbor table, …) is now written once under
+#   <cache_dir>/<catalog hash>/
+# and every later worker with the same catalog and build parameters just
+# loads it. Any change to a venue's features gives a new hash → one rebuild.
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Callable, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ann_index import LSHIndex
+from gyms import GYMS
+from recommender_system import venue_text
+
+CACHE_DIR = os.environ.get(
+    "CONTENT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".content_cache"),
+)
+
+# bump when the on-disk layout changes
+FORMAT_VERSION = 2                      # 2: frames pickled (JSON re-typed "001" → 1)
+
+
+def catalog_items_df(gyms: Iterable[dict] = GYMS) -> pd.DataFrame:
+    """The venue catalog as an items frame (item_id = title = gym name)."""
+    return pd.DataFrame([
+        {"item_id": g["name"], "title": g["name"], "features_text": venue_text(g)}
+        for g in gyms
+    ])
+
+
+def catalog_hash(items_df: pd.DataFrame, params: Optional[dict] = None) -> str:
+    """sha256 over the catalog rows and the build parameters."""
+    h = hashlib.sha256()
+    h.update(json.dumps(
+        {"format": FORMAT_VERSION, "params": params or {}},
+        sort_keys=True, default=str,
+    ).encode("utf-8"))
+    h.update(items_df.to_json(orient="split", index=False).encode("utf-8"))
+    return h.hexdigest()[:32]
+
+
+# -----------------------------
+# Save / load
+# -----------------------------
+
+def _vectorizer_params(vec: TfidfVectorizer) -> dict:
+    return {
+        k: v for k, v in vec.get_params().items()
+        if isinstance(v, (str, int, float, bool, type(None), tuple, list))
+    }
+
+
+def save_content_model(model: Dict, path: str) -> None:
+    """
+    Write every entry of a content model dict into directory `path`.
+    Dicts (the title / id lookups) are skipped – they are cheap to rebuild.
+    """
+    os.makedirs(path, exist_ok=True)
+    manifest = {}
+    arrays = {}
+
+    for key, value in model.items():
+        if isinstance(value, TfidfVectorizer):
+            with open(os.path.join(path, f"{key}.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "params": _vectorizer_params(value),
+                    "vocabulary": {t: int(i) for t, i in value.vocabulary_.items()},
+                }, f)
+            np.save(os.path.join(path, f"{key}.idf.npy"), value.idf_)
+            manifest[key] = "vectorizer"
+        elif sparse.issparse(value):
+            sparse.save_npz(os.path.join(path, f"{key}.npz"), sparse.csr_matrix(value))
+            manifest[key] = "sparse"
+        elif isinstance(value, np.ndarray):
+            arrays[key] = value
+            manifest[key] = "array"
+        elif isinstance(value, pd.DataFrame):
+            # pickled, not JSON: keeps dtypes, so ids like "001" or titles
+            # like "1984" stay strings
+            value.to_pickle(os.path.join(path, f"{key}.frame.pkl"))
+            manifest[key] = "frame"
+        elif isinstance(value, LSHIndex):
+            value.save(os.path.join(path, f"{key}.ann.npz"))
+            manifest[key] = "ann"
+
+    if arrays:
+        np.savez(os.path.join(path, "arrays.npz"), **arrays)
+    with open(os.path.join(path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def load_content_model(path: str) -> Dict:
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    arrays = np.load(os.path.join(path, "arrays.npz")) if "array" in manifest.values() else {}
+    model = {}
+    for key, kind in manifest.items():
+        if kind == "vectorizer":
+            with open(os.path.join(path, f"{key}.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            params = meta["params"]
+            if isinstance(params.get("ngram_range"), list):
+                params["ngram_range"] = tuple(params["ngram_range"])
+            vec = TfidfVectorizer(**params)
+            vec.vocabulary_ = meta["vocabulary"]
+            vec.idf_ = np.load(os.path.join(path, f"{key}.idf.npy"))
+            model[key] = vec
+        elif kind == "sparse":
+            model[key] = sparse.load_npz(os.path.join(path, f"{key}.npz")).tocsr()
+        elif kind == "array":
+            model[key] = arrays[key]
+        elif kind == "frame":
+            model[key] = pd.read_pickle(os.path.join(path, f"{key}.frame.pkl"))
+        elif kind == "ann":
+            model[key] = LSHIndex.load(os.path.join(path, f"{key}.ann.npz"))
+    return model
+
+
+def load_or_build(
+    items_df: pd.DataFrame,
+    build_fn: Callable[[pd.DataFrame], Dict],
+    params: Optional[dict] = None,
+    cache_dir: str = CACHE_DIR,
+    finalize: Optional[Callable[[Dict], Dict]] = None,
+) -> Dict:
+    """
+    Load the model for this catalog + params from cache_dir, or build it
+    with build_fn(items_df) and store it. `finalize` runs on loaded models
+    to rebuild anything that is not persisted (e.g. lookup dicts).
+    """
+    key = catalog_hash(items_df, params)
+    path = os.path.join(cache_dir, key)
+
+    if os.path.exists(os.path.join(path, "manifest.json")):
+        model = load_content_model(path)
+        return finalize(model) if finalize else model
+
+    model = build_fn(items_df)
+
+    # write into a temp dir, then rename: concurrent workers never see half a model
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=f".{key}.", dir=cache_dir)
+    try:
+        save_content_model(model, tmp)
+        os.replace(tmp, path)
+    except OSError:
+        # another worker renamed its copy first – theirs is identical
+        shutil.rmtree(tmp, ignore_errors=True)
+    return model
+
+
+if __name__ == "__main__":
+    # round trip: numeric-looking ids and titles must come back unchanged
+    df = pd.DataFrame({
+        "item_id": ["001", "002", "010"],
+        "title": ["1984", "Pound for Pound", "2001"],
+        "features_text": ["boxing indoor", "boxing ring", "parks outdoor"],
+    })
+    with tempfile.TemporaryDirectory() as d:
+        save_content_model({"df": df}, d)
+        back = load_content_model(d)["df"]
+    pd.testing.assert_frame_equal(back, df)
+    print("frame round trip ok:", back["item_id"].tolist(), back["title"].tolist())
@@ -10,6 +10,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "215 Rue Jean-Talon Ouest, Montréal, QC H2R 2X6",
+    "hours": {"mon-fri": [["06:30", "21:30"]], "sat": [["09:00", "16:00"]], "sun": [["10:00", "14:00"]]},
     "latitude": 45.5361,
     "longitude": -73.615
   },
@@ -22,6 +23,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "2520 Boul Saint-Joseph E #207, Montréal, QC H1Y 2A2",
+    "hours": {"mon-fri": [["16:00", "21:30"]], "sat": [["10:00", "13:00"]]},
     "latitude": 45.531,
     "longitude": -73.565
   },
@@ -34,6 +36,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "1827 Rue Sainte-Catherine Ouest, Montréal, QC H3H 1M2",
+    "hours": {"mon-fri": [["06:00", "22:00"]], "sat-sun": [["08:00", "18:00"]]},
     "latitude": 45.4975,
     "longitude": -73.578
   },
@@ -45,6 +48,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "8782 Boulevard Saint-Laurent, Montréal, QC H2N 1M4",
+    "hours": {"mon-fri": [["07:00", "10:00"], ["16:00", "22:00"]], "sat-sun": [["10:00", "15:00"]]},
     "latitude": 45.5467,
     "longitude": -73.64
   },
@@ -57,6 +61,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "4767 Rue Dagenais #106B, Montréal, QC H4C 1L8",
+    "hours": {"mon-fri": [["06:00", "21:00"]], "sat-sun": [["09:00", "17:00"]]},
     "latitude": 45.464,
     "longitude": -73.606
   },
@@ -69,6 +74,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "275 Rue Sherbrooke Ouest, Montréal, QC H2X 1Y1",
+    "hours": {"mon-fri": [["06:30", "21:30"]], "sat": [["09:00", "14:00"]]},
     "latitude": 45.501,
     "longitude": -73.5765
   },
@@ -82,6 +88,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "1515 Rue Sainte-Catherine Ouest, Montréal, QC H3G 2W1",
+    "hours": {"mon-fri": [["17:00", "21:00"]]},
     "latitude": 45.496,
     "longitude": -73.578
   },
@@ -94,6 +101,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "2093 Rue de la Visitation, Montréal, QC H2L 3J6",
+    "hours": {"tue": [["18:30", "21:00"]], "thu": [["18:30", "21:00"]], "sat": [["10:00", "12:30"]]},
     "latitude": 45.5315,
     "longitude": -73.56
   },
@@ -105,6 +113,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "475 Avenue des Pins Ouest, Montréal, QC H2W 1S4",
+    "hours": {"mon-fri": [["06:30", "23:00"]], "sat-sun": [["08:00", "21:00"]]},
     "latitude": 45.5101,
     "longitude": -73.5808
   },
@@ -116,6 +125,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "680 Rue Sainte-Catherine Ouest 2nd Floor, Montréal, QC H3B 1C2",
+    "hours": {"mon-fri": [["06:00", "21:00"]], "sat-sun": [["08:00", "14:00"]]},
     "latitude": 45.511,
     "longitude": -73.5605
   },
@@ -129,6 +139,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "9 Rue Sainte-Catherine Est, Montréal, QC H2X 1K3",
+    "hours": {"mon-fri": [["06:00", "22:00"]], "sat-sun": [["09:00", "17:00"]]},
     "latitude": 45.512,
     "longitude": -73.557
   },
@@ -142,6 +153,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "5335A Rue Sherbrooke Ouest, Montréal, QC H4A 1V2",
+    "hours": {"mon-fri": [["06:30", "21:00"]], "sat-sun": [["09:00", "13:00"]]},
     "latitude": 45.477,
     "longitude": -73.63
   },
@@ -154,6 +166,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "550 Avenue Richmond, Montréal, QC H3J 1V3",
+    "hours": {"mon-fri": [["06:00", "21:00"]], "sat-sun": [["08:00", "16:00"]]},
     "latitude": 45.4815,
     "longitude": -73.5825
   },
@@ -166,6 +179,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "8400 Boul Saint-Laurent Suite 307, Montréal, QC H2P 2M4",
+    "hours": {"mon-fri": [["16:00", "22:00"]], "sat": [["10:00", "14:00"]]},
     "latitude": 45.515,
     "longitude": -73.5775
   },
@@ -177,6 +191,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "3270 Rue Bélanger, Montréal, QC H1X 1A1",
+    "hours": {"mon-fri": [["07:00", "21:00"]], "sat-sun": [["09:00", "15:00"]]},
     "latitude": 45.544,
     "longitude": -73.5955
   },
@@ -188,6 +203,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "8490 Rue Jeanne-Mance #302, Montréal, QC H2P 2S3",
+    "hours": {"mon-fri": [["06:00", "22:00"]], "sat-sun": [["08:00", "18:00"]]},
     "latitude": 45.495,
     "longitude": -73.576
   },
@@ -199,6 +215,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "3645 Rue Notre-Dame Ouest, Montréal, QC H4C 1P6",
+    "hours": {"mon-fri": [["06:00", "22:00"]], "sat-sun": [["08:00", "16:00"]]},
     "latitude": 45.4659,
     "longitude": -73.579
   },
@@ -213,6 +230,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "6789 Rue Saint-Jacques, Montréal, QC H4B 1V3",
+    "hours": {"mon-fri": [["16:30", "21:30"]], "sat": [["10:00", "13:00"]]},
     "latitude": 45.4613,
     "longitude": -73.6015
   },
@@ -227,6 +245,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "3700 Boulevard Crémazie E, Montréal, QC H2A 1B2",
+    "hours": {"mon-fri": [["09:00", "21:30"]], "sat-sun": [["09:00", "14:00"]]},
     "latitude": 45.554,
     "longitude": -73.64
   },
@@ -240,6 +259,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "2600 Rue Ontario E Suite 152, Montréal, QC H2K 4K4",
+    "hours": {"mon-fri": [["15:00", "21:00"]], "sat": [["09:00", "13:00"]]},
     "latitude": 45.5225,
     "longitude": -73.564
   },
@@ -253,6 +273,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "5275 Rue Ferrier, Montréal, QC H4P 1L7",
+    "hours": {"mon-fri": [["07:00", "22:00"]], "sat-sun": [["09:00", "16:00"]]},
     "latitude": 45.487,
     "longitude": -73.667
   },
@@ -262,6 +283,7 @@ GYMS = [
     "level": [],
     "env": "Outdoor",
     "address": "3819 Avenue Calixa-Lavallée, Montréal, QC H2L 3A7",
+    "hours": {"daily": [["06:00", "24:00"]]},
     "latitude": 45.519,
     "longitude": -73.574
   },
@@ -271,6 +293,7 @@ GYMS = [
     "level": [],
     "env": "Outdoor",
     "address": "1196 Chemin Remembrance, Montréal, QC H3H 1A2",
+    "hours": {"daily": [["06:00", "24:00"]]},
     "latitude": 45.504,
     "longitude": -73.587
   },
@@ -280,6 +303,7 @@ GYMS = [
     "level": [],
     "env": "Outdoor",
     "address": "45 Av. Victoria, Westmount, QC H3Z 2J2",
+    "hours": {"daily": [["06:00", "23:00"]]},
     "latitude": 45.4935,
     "longitude": -73.5863
   },
@@ -289,6 +313,7 @@ GYMS = [
     "level": [],
     "env": "Outdoor",
     "address": "3200 Rue de Castelnau Est, Montréal, QC H2M 2W4",
+    "hours": {"daily": [["06:00", "24:00"]]},
     "latitude": 45.542,
     "longitude": -73.63
   },
@@ -298,6 +323,7 @@ GYMS = [
     "level": [],
     "env": "Outdoor",
     "address": "2100 Chemin Remembrance, Montréal, QC H3H 1A2",
+    "hours": {"daily": [["06:00", "23:00"]]},
     "latitude": 45.505,
     "longitude": -73.586
   },
@@ -307,6 +333,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "1470 Rue Peel, Montréal, QC H3A 1T1",
+    "hours": {"mon-fri": [["07:00", "21:00"]], "sat-sun": [["09:00", "13:00"]]},
     "latitude": 45.4987,
     "longitude": -73.571
   },
@@ -316,6 +343,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "356 Rue Saint-Paul Ouest, Montréal, QC H2Y 2A7",
+    "hours": {"daily": [["10:00", "22:00"]]},
     "latitude": 45.5065,
     "longitude": -73.5545
   },
@@ -325,6 +353,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "355 Rue Saint-Jacques, Montréal, QC H2Y 1N9",
+    "hours": {"daily": [["09:00", "21:00"]]},
     "latitude": 45.506,
     "longitude": -73.554
   },
@@ -334,6 +363,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "111 Rue Sainte-Catherine Ouest, Montréal, QC H2X 1K1",
+    "hours": {"daily": [["10:00", "23:00"]]},
     "latitude": 45.5075,
     "longitude": -73.567
   },
@@ -343,6 +373,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "4715 Rue Saint-Denis, Montréal, QC H2J 2L6",
+    "hours": {"fri": [["17:00", "21:00"]], "sat-sun": [["10:00", "18:00"]]},
     "latitude": 45.522,
     "longitude": -73.58
   },
@@ -352,6 +383,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "2067 Rue Crescent, Montréal, QC H3G 2C1",
+    "hours": {"mon-fri": [["11:00", "21:00"]], "sat-sun": [["11:00", "20:00"]]},
     "latitude": 45.491,
     "longitude": -73.5795
   },
@@ -361,6 +393,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "1623 Rue Sainte-Catherine Ouest, Montréal, QC H3H 1L8",
+    "hours": {"daily": [["11:00", "22:00"]]},
     "latitude": 45.509,
     "longitude": -73.564
   },
@@ -370,6 +403,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "1645 Rue Sainte-Catherine Ouest, Montréal, QC H3H 1L9",
+    "hours": {"daily": [["11:30", "22:00"]]},
     "latitude": 45.5092,
     "longitude": -73.5642
   },
@@ -379,6 +413,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "4986 Rue Saint-Denis, Montréal, QC H2J 2K8",
+    "hours": {"mon-thu": [["11:00", "23:00"]], "fri-sat": [["11:00", "02:00"]], "sun": [["12:00", "22:00"]]},
     "latitude": 45.5265,
     "longitude": -73.581
   },
@@ -388,6 +423,7 @@ GYMS = [
     "level": [],
     "env": "Indoor",
     "address": "1418 Rue Crescent, Montréal, QC H3G 2B7",
+    "hours": {"daily": [["12:00", "22:00"]]},
     "latitude": 45.4905,
     "longitude": -73.579
   },
@@ -397,6 +433,7 @@ GYMS = [
         "level": [1, 2, 3],
         "env": "Indoor",
         "address": "1404 Drummond St, Montréal, QC H3G 1P3",
+        "hours": {"daily": [["00:00", "24:00"]]},
         "latitude": 45.4989159136213,
         "longitude": -73.57483428948704
     },
@@ -406,6 +443,7 @@ GYMS = [
   "level": [1, 2],
   "env": "Indoor",
   "address": "75 King St East, Toronto, ON M5C 2R1",
+  "hours": {"mon-fri": [["06:00", "22:00"]], "sat-sun": [["08:00", "18:00"]]},
   "latitude": 43.6489,
   "longitude": -79.3769
 },
@@ -415,6 +453,7 @@ GYMS = [
   "level": [1, 2, 3],
   "env": "Indoor",
   "address": "120 Adelaide St East, Toronto, ON M5C 1J3",
+  "hours": {"mon-fri": [["06:00", "09:00"], ["12:00", "14:00"], ["17:00", "21:00"]], "sat": [["10:00", "14:00"]]},
   "latitude": 43.6493,
   "longitude": -79.3758
 },
@@ -424,6 +463,7 @@ GYMS = [
   "level": [],
   "env": "Outdoor",
   "address": "35 Wellington St East, Toronto, ON M5E 1B1",
+  "hours": {"daily": [["06:00", "24:00"]]},
   "latitude": 43.6479,
   "longitude": -79.3757
 },
@@ -433,6 +473,7 @@ GYMS = [
   "level": [],
   "env": "Outdoor",
   "address": "85 The Esplanade, Toronto, ON M5E 1Z4",
+  "hours": {"daily": [["06:00", "24:00"]]},
   "latitude": 43.6472,
   "longitude": -79.3738
 },
@@ -442,6 +483,7 @@ GYMS = [
   "level": [],
   "env": "Indoor",
   "address": "60 King St East, Toronto, ON M5C 1G4",
+  "hours": {"mon-fri": [["06:30", "21:00"]], "sat-sun": [["08:00", "14:00"]]},
   "latitude": 43.6484,
   "longitude": -79.3755
 },
@@ -451,6 +493,7 @@ GYMS = [
   "level": [],
   "env": "Indoor",
   "address": "90 Front St East, Toronto, ON M5E 1C4",
+  "hours": {"daily": [["10:00", "21:00"]]},
   "latitude": 43.6481,
   "longitude": -79.3729
 },
@@ -460,6 +503,7 @@ GYMS = [
   "level": [],
   "env": "Indoor",
   "address": "10 Market St, Toronto, ON M5E 1M6",
+  "hours": {"mon-fri": [["10:30", "20:00"]], "sat": [["11:00", "17:00"]]},
   "latitude": 43.6480,
   "longitude": -79.3718
 },
@@ -469,6 +513,7 @@ GYMS = [
   "level": [],
   "env": "Indoor",
   "address": "120 The Esplanade, Toronto, ON M5E 1A9",
+  "hours": {"daily": [["11:00", "22:00"]]},
   "latitude": 43.6475,
   "longitude": -79.3746
 },
@@ -478,6 +523,7 @@ GYMS = [
   "level": [1],
   "env": "Indoor",
   "address": "1351 Woodbine Ave, Toronto, ON M4C 4G4",
+  "hours": {"mon-fri": [["17:00", "22:00"]], "sat": [["10:00", "13:00"]]},
   "latitude": 43.69668,
   "longitude": -79.3173
 },
@@ -489,6 +535,7 @@ GYMS = [
     ],
     "env": "Indoor",
     "address": "475 Avenue des Pins Ouest, Montréal, QC H2W 1S4",
+    "hours": {"mon-fri": [["17:00", "21:00"]]},
     "latitude": 45.5101,
     "longitude": -73.5808
   },
@@ -0,0 +1,242 @@
+# incremental_content.py
+#
+# Content model that absorbs new / edited venues without refitting.
+#
+# TfidfVectorizer.fit_transform needs the whole corpus to build its vocabulary
+# and idf weights, so one new venue meant a full rebuild. Here:
+#   - tokens are hashed into a fixed feature space (stable across processes),
+#   - document frequencies are counted online as venues come and go,
+#   - each upsert vectorizes one venue with the current idf and inserts it
+#     into the LSH neighbor index (ann_index.py),
+#   - an occasional reweight() pass re-vectorizes everything with the latest
+#     idf and swaps in a fresh index, optionally on a background thread,
+#   - similar() answers are memoized until the next edit or reweight, so the
+#     serving path repeats no LSH queries for an unchanged catalog.
+
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from ann_index import LSHIndex
+from recommender_system import venue_text
+
+# same tokenization as recommender_system/Content-Based.py
+TOKEN_RE = re.compile(r"(?u)\b[\w:-]+\b")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in ENGLISH_STOP_WORDS]
+
+
+class IncrementalContentModel:
+    def __init__(
+        self,
+        n_features: int = 2 ** 14,
+        ann_params: Optional[dict] = None,
+        reweight_after: float = 0.2,
+    ):
+        """
+        reweight_after: fraction of the catalog that may change before the
+        background thread re-weights everything with fresh idf values.
+        """
+        self.n_features = n_features
+        self.ann_params = ann_params or {"n_tables": 16, "n_bits": 12, "probe": 1}
+        self.reweight_after = reweight_after
+
+        self.df = np.zeros(n_features, dtype=np.int32)
+        self.docs: Dict[Hashable, Dict[int, int]] = {}   # key → {feature: term count}
+        self.index = LSHIndex(n_features, **self.ann_params)
+
+        self._lock = threading.RLock()
+        self._version = 0
+        self._touched: Dict[Hashable, int] = {}          # key → version of last change
+        self._changes_since_reweight = 0
+        self._similar: Dict[Tuple[Hashable, int], List[Tuple[Hashable, float]]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _new_index(self) -> LSHIndex:
+        # same hyperplanes as the live index: bucket codes stay comparable
+        return LSHIndex(self.n_features, planes=self.index.planes, **self.ann_params)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # -----------------------------
+    # Vectorizing
+    # -----------------------------
+
+    def _features(self, text: str) -> Dict[int, int]:
+        counts: Dict[int, int] = {}
+        for tok in tokenize(text):
+            f = zlib.crc32(tok.encode("utf-8")) % self.n_features
+            counts[f] = counts.get(f, 0) + 1
+        return counts
+
+    def _idf(self, features: Iterable[int]) -> np.ndarray:
+        """Smoothed idf, as TfidfVectorizer(smooth_idf=True) computes it."""
+        n = len(self.docs)
+        df = self.df[np.fromiter(features, dtype=np.int64)]
+        return np.log((1.0 + n) / (1.0 + df)) + 1.0
+
+    def _vector(self, counts: Dict[int, int]) -> sparse.csr_matrix:
+        cols = np.fromiter(counts, dtype=np.int64, count=len(counts))
+        tf = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        vals = tf * self._idf(cols) if len(cols) else tf
+        return sparse.csr_matrix(
+            (vals.astype(np.float32), (np.zeros(len(cols), dtype=np.int64), cols)),
+            shape=(1, self.n_features),
+        )
+
+    # -----------------------------
+    # Catalog edits
+    # -----------------------------
+
+    def upsert(self, key: Hashable, text: str) -> None:
+        """Add or replace one venue; takes effect for the next query."""
+        counts = self._features(text)
+        with self._lock:
+            old = self.docs.get(key)
+            if old is not None:
+                self.df[list(old)] -= 1
+                self.index.remove(key)
+            self.docs[key] = counts
+            if counts:
+                self.df[list(counts)] += 1
+            self.index.add([key], self._vector(counts))
+            self._mark(key)
+
+    def remove(self, key: Hashable) -> None:
+        with self._lock:
+            old = self.docs.pop(key)
+            self.df[list(old)] -= 1
+            self.index.remove(key)
+            self._mark(key)
+
+    def upsert_venue(self, gym: dict) -> None:
+        self.upsert(gym["name"], venue_text(gym))
+
+    def _mark(self, key: Hashable) -> None:
+        self._similar.clear()               # any edit can change anyone's neighbors
+        self._version += 1
+        self._touched[key] = self._version
+        self._changes_since_reweight += 1
+
+    def similar(self, key: Hashable, k: int = 5) -> List[Tuple[Hashable, float]]:
+        with self._lock:
+            hit = self._similar.get((key, k))
+            if hit is None:
+                counts = self.docs[key]
+                hit = self._similar[(key, k)] = self.index.query(self._vector(counts), k=k, exclude=key)
+            return hit
+
+    def similar_to_text(self, text: str, k: int = 5) -> List[Tuple[Hashable, float]]:
+        with self._lock:
+            return self.index.query(self._vector(self._features(text)), k=k)
+
+    # -----------------------------
+    # Re-weighting
+    # -----------------------------
+
+    def reweight(self) -> None:
+        """
+        Re-vectorize every venue with the current idf into a fresh index.
+        Edits made while the new index is being built are replayed before
+        it is swapped in, so nothing is lost.
+        """
+        with self._lock:
+            snapshot = dict(self.docs)
+            version = self._version
+            df = self.df.copy()
+
+        n = len(snapshot)
+        index = self._new_index()
+        if snapshot:
+            keys = list(snapshot)
+            rows, cols, tfs = [], [], []
+            for r, key in enumerate(keys):
+                counts = snapshot[key]
+                rows.extend([r] * len(counts))
+                cols.extend(counts)
+                tfs.extend(counts.values())
+            cols = np.asarray(cols, dtype=np.int64)
+            idf = np.log((1.0 + n) / (1.0 + df[cols])) + 1.0
+            X = sparse.csr_matrix(
+                (np.asarray(tfs, dtype=np.float32) * idf, (rows, cols)),
+                shape=(n, self.n_features),
+            )
+            index.add(keys, X)
+
+        with self._lock:
+            for key, v in self._touched.items():
+                if v <= version:
+                    continue
+                if key in index:
+                    index.remove(key)
+                if key in self.docs:
+                    index.add([key], self._vector(self.docs[key]))
+            self.index = index
+            self._similar.clear()
+            self._touched = {k: v for k, v in self._touched.items() if v > version}
+            self._changes_since_reweight = len(self._touched)
+
+    def needs_reweight(self) -> bool:
+        return self._changes_since_reweight > self.reweight_after * max(len(self.docs), 1)
+
+    def start_background_reweight(self, interval_s: float = 60.0) -> None:
+        """
+        Check every interval_s seconds and re-weight once enough has changed.
+        No-op when the thread is already running.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.wait(interval_s):
+                if self.needs_reweight():
+                    self.reweight()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="content-reweight", daemon=True)
+        self._thread.start()
+
+    def stop_background_reweight(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def build_from_catalog(gyms: Iterable[dict], **kwargs) -> IncrementalContentModel:
+    model = IncrementalContentModel(**kwargs)
+    for g in gyms:
+        model.upsert_venue(g)
+    model.reweight()
+    return model
+
+
+if __name__ == "__main__":
+    from gyms import GYMS
+
+    t0 = time.perf_counter()
+    model = build_from_catalog(GYMS)
+    print(f"built {len(model)} venues in {1000 * (time.perf_counter() - t0):.1f} ms")
+    print(model.similar("Thai Long", k=3))
+
+    new_gym = {
+        "name": "Plateau Muay Thai",
+        "type": "Muay Thai",
+        "level": [1, 2],
+        "env": "Indoor",
+        "address": "4500 Rue Saint-Denis, Montréal, QC H2J 2L3",
+    }
+    t0 = time.perf_counter()
+    model.upsert_venue(new_gym)
+    print(f"upsert: {1000 * (time.perf_counter() - t0):.2f} ms")
+    print(model.similar("Plateau Muay Thai", k=3))
@@ -1,5 +1,9 @@
-from dataclasses import dataclass
-from typing import Tuple, Dict, List
+import bisect
+import itertools
+from dataclasses import dataclass, replace
+from typing import Callable, Tuple, Dict, List, Optional
+
+import numpy as np
 
 
 # facts
@@ -30,14 +34,36 @@ class TravelerPref:
 
 
 # rules
+#   check_* are the bare predicates used for ranking; rule_* wrap them with the
+#   human-readable explanation, which is only rendered for results being shown.
+def check_budget(pref: TravelerPref, dest: Destination) -> bool:
+    return dest.avg_cost <= pref.max_budget
+
+
+def check_season(pref: TravelerPref, dest: Destination) -> bool:
+    return pref.season in dest.seasons
+
+
+def check_activity(pref: TravelerPref, dest: Destination) -> bool:
+    return any(a in dest.activities for a in pref.likes)
+
+
+def check_heat(pref: TravelerPref, dest: Destination) -> bool:
+    return not pref.dislikes_heat or dest.avg_temp_c <= 24
+
+
+def check_kind(pref: TravelerPref, dest: Destination) -> bool:
+    return not pref.prefers_kind or dest.kind in pref.prefers_kind
+
+
 def rule_budget(pref: TravelerPref, dest: Destination):
-    ok = dest.avg_cost <= pref.max_budget
+    ok = check_budget(pref, dest)
     return ok, (f"Budget ok ({dest.avg_cost} ≤ {pref.max_budget})"
                 if ok else f"Too expensive ({dest.avg_cost} > {pref.max_budget})")
 
 
 def rule_season(pref: TravelerPref, dest: Destination):
-    ok = pref.season in dest.seasons
+    ok = check_season(pref, dest)
     return ok, (f"Season match ({pref.season})" if ok else "Season mismatch")
 
 
@@ -50,36 +76,293 @@ def rule_activity(pref: TravelerPref, dest: Destination):
 def rule_heat(pref: TravelerPref, dest: Destination):
     if not pref.dislikes_heat:
         return True, "Heat tolerance irrelevant"
-    ok = dest.avg_temp_c <= 24
+    ok = check_heat(pref, dest)
     return ok, (f"Not too hot ({dest.avg_temp_c}°C)" if ok else f"Too hot ({dest.avg_temp_c}°C)")
 
 
 def rule_kind(pref: TravelerPref, dest: Destination):
     if not pref.prefers_kind:
         return True, "No kind preference"
-    ok = dest.kind in pref.prefers_kind
+    ok = check_kind(pref, dest)
     return ok, (f"Preferred kind ({dest.kind})" if ok else f"Not preferred kind ({dest.kind})")
 
 
 RULES: List = [rule_budget, rule_season, rule_activity, rule_heat, rule_kind]
 
+CHECKS: Dict[Callable, Callable[[TravelerPref, Destination], bool]] = {
+    rule_budget: check_budget,
+    rule_season: check_season,
+    rule_activity: check_activity,
+    rule_heat: check_heat,
+    rule_kind: check_kind,
+}
+
+
+def check_for(rule: Callable) -> Callable[[TravelerPref, Destination], bool]:
+    """The predicate of a rule (rules without one are run and the text dropped)."""
+    return CHECKS.get(rule) or (lambda pref, dest: rule(pref, dest)[0])
+
 
 # evaluating rules
-def evaluate(pref: TravelerPref, kb: Dict[str, Destination]):
+def passbits(pref: TravelerPref, dest: Destination, checks: List[Callable]) -> int:
+    """Bit j set ⇔ rule j passes."""
+    bits = 0
+    for j, check in enumerate(checks):
+        if check(pref, dest):
+            bits |= 1 << j
+    return bits
+
+
+def rank(pref: TravelerPref, kb: Dict[str, Destination], rules: List = RULES):
+    """[(score, name, pass bits)] best first – no explanation text."""
+    checks = [check_for(r) for r in rules]
     scored = []
     for name, dest in kb.items():
-        explanations = []
-        passed = 0
-        for rule in RULES:
-            ok, why = rule(pref, dest)
-            explanations.append(("PASS" if ok else "FAIL", why))
-            if ok:
-                passed += 1
-        score = passed / len(RULES)
-        scored.append((score, name, explanations))
+        bits = passbits(pref, dest, checks)
+        scored.append((bin(bits).count("1") / len(rules), name, bits))
     return sorted(scored, reverse=True)
 
 
+def render(pref: TravelerPref, dest: Destination, rules: List = RULES):
+    """Replay the rules for one destination: [(PASS/FAIL, why)]."""
+    out = []
+    for rule in rules:
+        ok, why = rule(pref, dest)
+        out.append(("PASS" if ok else "FAIL", why))
+    return out
+
+
+def explain(pref: TravelerPref, name: str, kb: Dict[str, Destination] = KB, rules: List = RULES):
+    return render(pref, kb[name], rules)
+
+
+def evaluate(pref: TravelerPref, kb: Dict[str, Destination], top_k: Optional[int] = None):
+    """Ranked (score, name, explanations); text is rendered for the top_k only."""
+    scored = rank(pref, kb)
+    if top_k is not None:
+        scored = scored[:top_k]
+    return [(score, name, render(pref, kb[name])) for score, name, _ in scored]
+
+
+# compiled rule engine
+#   evaluate() runs every rule on every destination. RuleEngine compiles the KB
+#   once into bitmask indexes (bit i = i-th destination, ids ordered by cost):
+#     season / activity / kind → mask of destinations
+#     budget                   → bisect on the cost-sorted array = low-bits mask
+#     heat                     → mask of destinations at or below HEAT_LIMIT_C
+#   Hard rules narrow the candidates with a few big-int ANDs; rules it has no
+#   index for run as functions on the remaining candidates only, stopping at
+#   the first failed hard rule. Ranking matches evaluate(): score = passed
+#   rules / len(rules), then name (descending), hard-rule failures dropped.
+HEAT_LIMIT_C = 24
+HARD_RULES = (rule_budget, rule_season, rule_activity)
+
+
+def _bits(mask: int) -> np.ndarray:
+    """Set bit positions of mask, ascending."""
+    if not mask:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+class RuleEngine:
+    def __init__(self, kb: Dict[str, Destination], rules: List = RULES, hard=HARD_RULES):
+        self.rules = list(rules)
+        self.hard = [r for r in self.rules if r in hard]
+        self.soft = [r for r in self.rules if r not in hard]
+
+        items = sorted(kb.items(), key=lambda kv: kv[1].avg_cost)
+        self.names = [n for n, _ in items]
+        self.dests = [d for _, d in items]
+        self.costs = [d.avg_cost for d in self.dests]
+        self.n = len(items)
+        self.all = (1 << self.n) - 1
+        # ties rank by name, descending (as evaluate() sorts)
+        self.name_rank = np.empty(self.n, dtype=np.int64)
+        self.name_rank[sorted(range(self.n), key=self.names.__getitem__, reverse=True)] = np.arange(self.n)
+
+        season: Dict[str, int] = {}
+        activity: Dict[str, int] = {}
+        kind: Dict[str, int] = {}
+        cool = 0
+        for i, d in enumerate(self.dests):
+            bit = 1 << i
+            for s in d.seasons:
+                season[s] = season.get(s, 0) | bit
+            for a in d.activities:
+                activity[a] = activity.get(a, 0) | bit
+            kind[d.kind] = kind.get(d.kind, 0) | bit
+            if d.avg_temp_c <= HEAT_LIMIT_C:
+                cool |= bit
+        self.season, self.activity, self.kind, self.cool = season, activity, kind, cool
+
+        # rule → pref → mask of destinations passing it
+        self.indexed: Dict[Callable, Callable[[TravelerPref], int]] = {
+            rule_budget: lambda p: (1 << bisect.bisect_right(self.costs, p.max_budget)) - 1,
+            rule_season: lambda p: self.season.get(p.season, 0),
+            rule_activity: self._activity_mask,
+            rule_heat: lambda p: self.cool if p.dislikes_heat else self.all,
+            rule_kind: self._kind_mask,
+        }
+
+    def _activity_mask(self, pref: TravelerPref) -> int:
+        m = 0
+        for a in pref.likes:
+            m |= self.activity.get(a, 0)
+        return m
+
+    def _kind_mask(self, pref: TravelerPref) -> int:
+        if not pref.prefers_kind:
+            return self.all
+        m = 0
+        for k in pref.prefers_kind:
+            m |= self.kind.get(k, 0)
+        return m
+
+    def _candidates(self, pref: TravelerPref) -> Tuple[int, List[Callable]]:
+        """Mask after the indexed hard rules + the hard rules left to run."""
+        mask = self.all
+        pending = []
+        for rule in self.hard:
+            if rule in self.indexed:
+                mask &= self.indexed[rule](pref)
+                if not mask:
+                    break
+            else:
+                pending.append(rule)
+        return mask, pending
+
+    def _groups(self, pref: TravelerPref) -> Dict[int, np.ndarray]:
+        """{rules passed: destination ids} for destinations passing every hard rule."""
+        mask, pending = self._candidates(pref)
+        soft_masks = [self.indexed[r](pref) for r in self.soft if r in self.indexed]
+        soft_fns = [check_for(r) for r in self.soft if r not in self.indexed]
+        pending = [check_for(r) for r in pending]
+
+        groups: Dict[int, List[np.ndarray]] = {}
+        # one AND per combination of soft masks instead of a test per destination
+        for combo in itertools.product((1, 0), repeat=len(soft_masks)):
+            m = mask
+            for bit, sm in zip(combo, soft_masks):
+                m &= sm if bit else ~sm
+            ids = _bits(m)
+            if pending:
+                ids = np.array([i for i in ids.tolist()
+                                if all(c(pref, self.dests[i]) for c in pending)], dtype=np.int64)
+            if not len(ids):
+                continue
+            passed = len(self.hard) + sum(combo)
+            if not soft_fns:
+                groups.setdefault(passed, []).append(ids)
+                continue
+            for i in ids.tolist():
+                extra = sum(1 for c in soft_fns if c(pref, self.dests[i]))
+                groups.setdefault(passed + extra, []).append(np.array([i], dtype=np.int64))
+        return {k: np.concatenate(v) for k, v in groups.items()}
+
+    def rule_mask(self, rule: Callable, pref: TravelerPref) -> int:
+        """Mask of destinations passing one rule (index lookup, or run it on all)."""
+        if rule in self.indexed:
+            return self.indexed[rule](pref)
+        check = check_for(rule)
+        ok = np.fromiter((check(pref, d) for d in self.dests), dtype=bool, count=self.n)
+        return int.from_bytes(np.packbits(ok, bitorder="little").tobytes(), "little")
+
+    def query(self, pref: TravelerPref, top_k: Optional[int] = None, explain: bool = True):
+        """Ranked (score, name, explanations) for destinations passing every hard rule."""
+        return self._top(self._groups(pref), pref, top_k, explain)
+
+    def _top(self, groups: Dict[int, np.ndarray], pref: TravelerPref,
+             top_k: Optional[int], explain: bool):
+        out = []
+        for passed, ids in sorted(groups.items(), reverse=True):
+            want = len(ids) if top_k is None else min(top_k - len(out), len(ids))
+            if want <= 0:
+                break
+            rank = self.name_rank[ids]
+            if want < len(ids):
+                keep = np.argpartition(rank, want - 1)[:want]
+                ids, rank = ids[keep], rank[keep]
+            score = passed / len(self.rules)
+            for i in ids[np.argsort(rank)].tolist():
+                out.append((score, self.names[i], self.explain(pref, i) if explain else []))
+        return out
+
+    def explain(self, pref: TravelerPref, i: int):
+        """Every rule's (PASS/FAIL, why) for destination id i."""
+        return render(pref, self.dests[i], self.rules)
+
+
+# incremental re-evaluation
+#   A RuleSession keeps, per rule, the mask of destinations passing it for the
+#   traveler's current preferences (the per-(rule, destination) results), and
+#   the AND of the soft-rule masks per pass/fail combination. update() re-runs
+#   only the rules reading a changed field (RULE_INPUTS) and rebuilds only the
+#   joins those rules feed; the ranked list is then refreshed in place.
+RULE_INPUTS: Dict[Callable, Tuple[str, ...]] = {
+    rule_budget: ("max_budget",),
+    rule_season: ("season",),
+    rule_activity: ("likes",),
+    rule_heat: ("dislikes_heat",),
+    rule_kind: ("prefers_kind",),
+}
+
+
+class RuleSession:
+    def __init__(self, engine: RuleEngine, pref: TravelerPref,
+                 top_k: Optional[int] = 10, explain: bool = False):
+        self.engine = engine
+        self.pref = pref
+        self.top_k = top_k
+        self.explain = explain
+        self.masks = {r: engine.rule_mask(r, pref) for r in engine.rules}
+        self.ranked: List = []
+        self._hard = engine.all
+        self._combos: List[Tuple[int, int]] = []     # (soft rules passed, mask)
+        self._refresh(set(engine.rules))
+
+    def update(self, **changes) -> List:
+        """Change some preference fields; returns the (same, updated) ranked list."""
+        old, self.pref = self.pref, replace(self.pref, **changes)
+        changed = {f for f in changes if getattr(old, f) != getattr(self.pref, f)}
+        if not changed:
+            return self.ranked
+        stale = {
+            r for r in self.engine.rules
+            if r not in RULE_INPUTS or changed.intersection(RULE_INPUTS[r])
+        }
+        for r in stale:
+            self.masks[r] = self.engine.rule_mask(r, self.pref)
+        self._refresh(stale)
+        return self.ranked
+
+    def _refresh(self, stale) -> None:
+        e = self.engine
+        if any(r in stale for r in e.hard):
+            self._hard = e.all
+            for r in e.hard:
+                self._hard &= self.masks[r]
+        if any(r in stale for r in e.soft):
+            soft = [self.masks[r] for r in e.soft]
+            self._combos = []
+            for combo in itertools.product((1, 0), repeat=len(soft)):
+                m = e.all
+                for bit, sm in zip(combo, soft):
+                    m &= sm if bit else ~sm
+                self._combos.append((sum(combo), m))
+        elif not self._combos:
+            self._combos = [(0, e.all)]
+
+        groups: Dict[int, List[np.ndarray]] = {}
+        for passed, m in self._combos:
+            ids = _bits(self._hard & m)
+            if len(ids):
+                groups.setdefault(len(e.hard) + passed, []).append(ids)
+        groups = {k: np.concatenate(v) for k, v in groups.items()}
+        self.ranked[:] = e._top(groups, self.pref, self.top_k, self.explain)
+
+
 # Runner
 prefs = TravelerPref(
     likes=("Hiking",),
@@ -95,4 +378,54 @@ prefs = TravelerPref(
 #     for status, why in expl:
 #         print(" -", status, "|", why)
 
-print(KB)
\ No newline at end of file
+print(KB)
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    engine = RuleEngine(KB)
+    assert engine.query(prefs) == [r for r in evaluate(prefs, KB)
+                                   if all(ok == "PASS" for ok, _ in r[2][:3])]
+
+    rng = random.Random(0)
+    kinds = ["Mountain", "City", "Beach", "Lake", "Desert"]
+    acts = ["Hiking", "FoodTour", "Surfing", "Museum", "Skiing", "Diving", "Nightlife", "Wine"]
+    seasons = ["Winter", "Spring", "Summer", "Autumn"]
+    big = {
+        f"D{i}": Destination(
+            rng.choice(kinds),
+            tuple(rng.sample(acts, rng.randint(1, 3))),
+            tuple(rng.sample(seasons, rng.randint(1, 2))),
+            rng.randint(300, 5000),
+            rng.randint(-5, 35),
+        )
+        for i in range(100_000)
+    }
+    t0 = time.perf_counter()
+    engine = RuleEngine(big)
+    print(f"compiled {len(big)} destinations in {time.perf_counter() - t0:.2f}s")
+
+    queries = [
+        TravelerPref(tuple(rng.sample(acts, 2)), rng.choice(seasons), rng.randint(400, 1500),
+                     rng.random() < 0.5, tuple(rng.sample(kinds, 1)))
+        for _ in range(200)
+    ]
+    t0 = time.perf_counter()
+    for q in queries:
+        engine.query(q, top_k=10)
+    print(f"query (top 10): {1000 * (time.perf_counter() - t0) / len(queries):.3f} ms")
+
+    # budget slider: 100 steps, only rule_budget and the hard join re-run
+    session = RuleSession(engine, queries[0])
+    t0 = time.perf_counter()
+    for budget in range(500, 1500, 10):
+        session.update(max_budget=budget)
+    print(f"session update (budget slider): {1000 * (time.perf_counter() - t0) / 100:.3f} ms")
+
+    t0 = time.perf_counter()
+    evaluate(queries[0], big)
+    print(f"evaluate, all explanations: {1000 * (time.perf_counter() - t0):.0f} ms")
+    t0 = time.perf_counter()
+    evaluate(queries[0], big, top_k=10)
+    print(f"evaluate, top 10 explained: {1000 * (time.perf_counter() - t0):.0f} ms")
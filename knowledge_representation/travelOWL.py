@@ -1,6 +1,31 @@
+import bisect
+import json
+import os
+from collections import defaultdict
+
 from owlready2 import *
 
-onto = get_ontology("travel.rdf").load()
+# The ontology lives in a persistent SQLite quadstore: travel.rdf is parsed
+# once (or again when it is newer than the store), every later start just
+# reopens the store.
+RDF_PATH = os.environ.get("TRAVEL_RDF", "travel.rdf")
+WORLD_PATH = os.environ.get("TRAVEL_WORLD", "travel.sqlite3")
+
+
+def open_travel_world(rdf_path=RDF_PATH, world_path=WORLD_PATH):
+    stale = not os.path.exists(world_path) or (
+        os.path.exists(rdf_path) and os.path.getmtime(rdf_path) > os.path.getmtime(world_path))
+    world = World(filename=world_path, exclusive=False)
+    onto = None
+    if not stale:
+        onto = next((o for o in list(world.ontologies.values()) if o.Destination is not None), None)
+    if onto is None:
+        onto = world.get_ontology("file://" + os.path.abspath(rdf_path)).load(reload=True)
+        world.save()
+    return world, onto
+
+
+world, onto = open_travel_world()
 
 
 with onto:
@@ -13,40 +38,189 @@ with onto:
     class Recommended(Thing): pass
     class recommends(Traveler >> onto.Destination): pass
 
-# Create a traveler
-t = onto.Traveler("Joe")
-t.likesActivity.append(onto.Surfing)
-t.likesActivity.append(onto.Hiking)
-t.prefersSeason.append(onto.Summer)
-t.prefersSeason.append(onto.Winter)
-t.maxBudget.append(2000.0)
-
 # Helper functions to check data properties
 def get_data_value(ind, prop):
     vals = list(prop[ind])
     return vals[0] if vals else None
 
+
+# Destination attributes, exported once into plain lookup tables: one bulk
+# get_relations() query per property instead of per-destination lookups.
+class DestinationTable:
+    def __init__(self, onto):
+        self.entities = {d.name: d for d in onto.Destination.instances()}
+        self.offers = defaultdict(set)
+        self.seasons = defaultdict(set)
+        self.by_activity = defaultdict(set)
+        self.by_season = defaultdict(set)
+        for d, a in onto.offers.get_relations():
+            self.offers[d.name].add(a.name)
+            self.by_activity[a.name].add(d.name)
+        for d, s in onto.suitableIn.get_relations():
+            self.seasons[d.name].add(s.name)
+            self.by_season[s.name].add(d.name)
+
+        self.cost = {}
+        for d, c in onto.avgCost.get_relations():
+            self.cost.setdefault(d.name, c)
+        ranked = sorted((c, n) for n, c in self.cost.items())
+        self.costs = [c for c, _ in ranked]
+        self.names_by_cost = [n for _, n in ranked]
+
+        self.visa = {}
+        if onto.visaFreeForCa is not None:
+            for d, v in onto.visaFreeForCa.get_relations():
+                self.visa.setdefault(d.name, v)
+        self.visa_blocked = {n for n, v in self.visa.items() if v is not True}
+
+        # bitmasks for batch reasoning: bit i = names_by_cost[i], so a budget
+        # cut-off is the low bits; destinations without a cost never pass it
+        self.bit = {n: 1 << i for i, n in enumerate(self.names_by_cost)}
+        self.activity_mask = defaultdict(int)
+        self.season_mask = defaultdict(int)
+        for a, names in self.by_activity.items():
+            for n in names:
+                self.activity_mask[a] |= self.bit.get(n, 0)
+        for s, names in self.by_season.items():
+            for n in names:
+                self.season_mask[s] |= self.bit.get(n, 0)
+        self.visa_ok_mask = (1 << len(self.names_by_cost)) - 1
+        for n in self.visa_blocked:
+            self.visa_ok_mask &= ~self.bit.get(n, 0)
+
+    def within_budget(self, budget):
+        if budget is None:
+            return set()
+        return set(self.names_by_cost[:bisect.bisect_right(self.costs, budget)])
+
+    def candidates(self, likes, seasons, budget):
+        """Names passing every check, by set operations on the tables."""
+        act = set().union(*(self.by_activity.get(a, ()) for a in likes))
+        sea = set().union(*(self.by_season.get(s, ()) for s in seasons))
+        return (act & sea & self.within_budget(budget)) - self.visa_blocked
+
+    def mask_for(self, likes, seasons, budget):
+        if budget is None:
+            return 0
+        m = (1 << bisect.bisect_right(self.costs, budget)) - 1
+        m &= self.visa_ok_mask
+        if not m:
+            return 0
+        act = 0
+        for a in likes:
+            act |= self.activity_mask.get(a, 0)
+        sea = 0
+        for s in seasons:
+            sea |= self.season_mask.get(s, 0)
+        return m & act & sea
+
+    def names_in(self, mask):
+        out = []
+        while mask:
+            low = mask & -mask
+            out.append(self.names_by_cost[low.bit_length() - 1])
+            mask ^= low
+        return out
+
+
+table = DestinationTable(onto)
+
+
+def traveler_prefs(traveler):
+    return ({a.name for a in traveler.likesActivity},
+            {s.name for s in traveler.prefersSeason},
+            get_data_value(traveler, onto.maxBudget))
+
+
+# checks, as bits of a pass mask; explanations are only rendered on demand
+ACTIVITY, SEASON, BUDGET, VISA = 1, 2, 4, 8
+ALL_CHECKS = ACTIVITY | SEASON | BUDGET | VISA
+
+def destination_checks(traveler, dest, prefs=None):
+    likes, seasons, budget = prefs or traveler_prefs(traveler)
+    name = dest.name
+    bits = 0
+    if likes & table.offers.get(name, set()):
+        bits |= ACTIVITY
+    if seasons & table.seasons.get(name, set()):
+        bits |= SEASON
+    cost = table.cost.get(name)
+    if cost is not None and budget is not None and cost <= budget:
+        bits |= BUDGET
+    if name not in table.visa_blocked:
+        bits |= VISA
+    return bits
+
 def destination_ok_for(traveler, dest):
-    # activity match
-    act_match = any(a in dest.offers for a in traveler.likesActivity)
-    # season match
-    season_match = any(s in dest.suitableIn for s in traveler.prefersSeason)
-    # budget check
-    cost = get_data_value(dest, onto.avgCost)
-    budget = get_data_value(traveler, onto.maxBudget)
-    budget_ok = (cost is not None and budget is not None and cost <= budget)
-    # visa
-    visa_ok = True
-    if hasattr(onto, "visaFreeForCa"):
-        v = get_data_value(dest, onto.visaFreeForCa)
-        visa_ok = (v is None) or (v is True)
-    return act_match and season_match and budget_ok and visa_ok
-
-# Run a reasoner: recommend destinations meeting constraints
-for d in onto.Destination.instances():
-    if destination_ok_for(t, d):
-        t.recommends.append(d)
-        onto.Recommended(d.name + "_RecommendedForStudent")
-
-# Show results
-print("Recommendations:", [d.name for d in t.recommends])
+    return destination_checks(traveler, dest) == ALL_CHECKS
+
+def explain_destination(traveler, dest, bits=None):
+    """Replay the checks for one destination: [(PASS/FAIL, why)]."""
+    likes, seasons, budget = prefs = traveler_prefs(traveler)
+    if bits is None:
+        bits = destination_checks(traveler, dest, prefs)
+    cost = table.cost.get(dest.name)
+    status = lambda bit: "PASS" if bits & bit else "FAIL"
+    return [
+        (status(ACTIVITY), "Offers " + ", ".join(sorted(likes & table.offers.get(dest.name, set())))
+         if bits & ACTIVITY else "No liked activities"),
+        (status(SEASON), "Good in " + ", ".join(sorted(seasons & table.seasons.get(dest.name, set())))
+         if bits & SEASON else "Season mismatch"),
+        (status(BUDGET), f"Budget ok ({cost} ≤ {budget})" if bits & BUDGET
+         else f"Over budget ({cost} > {budget})"),
+        (status(VISA), "Visa-free for Canadians" if bits & VISA else "Visa required"),
+    ]
+
+def recommend_for(traveler):
+    return [table.entities[n] for n in sorted(table.candidates(*traveler_prefs(traveler)))]
+
+
+# batch reasoning: every traveler's constraints as bitmask joins over all
+# destinations, in one pass; travelers with identical constraints share the
+# result. Nothing is written back to the ontology.
+def all_traveler_prefs(onto=onto):
+    """{traveler name: (likes, seasons, budget)} from three bulk queries."""
+    prefs = {tr.name: (set(), set(), None) for tr in onto.Traveler.instances()}
+    for tr, a in onto.likesActivity.get_relations():
+        prefs[tr.name][0].add(a.name)
+    for tr, s in onto.prefersSeason.get_relations():
+        prefs[tr.name][1].add(s.name)
+    for tr, b in onto.maxBudget.get_relations():
+        likes, seasons, budget = prefs[tr.name]
+        if budget is None:
+            prefs[tr.name] = (likes, seasons, b)
+    return prefs
+
+def recommend_batch(prefs):
+    """{traveler: (likes, seasons, budget)} → {traveler: [destination name]}."""
+    memo = {}
+    out = {}
+    for who, (likes, seasons, budget) in prefs.items():
+        key = (frozenset(likes), frozenset(seasons), budget)
+        if key not in memo:
+            memo[key] = sorted(table.names_in(table.mask_for(likes, seasons, budget)))
+        out[who] = memo[key]
+    return out
+
+def precompute_suggestions(out_path="travel_suggestions.json"):
+    """Nightly job: suggestions for every traveler in the store, as JSON."""
+    suggestions = recommend_batch(all_traveler_prefs())
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(suggestions, f, indent=2, sort_keys=True)
+    return suggestions
+
+
+if __name__ == "__main__":
+    # Create a traveler (assigned, not appended: the store keeps Joe between runs)
+    t = onto.Traveler("Joe")
+    t.likesActivity = [onto.Surfing, onto.Hiking]
+    t.prefersSeason = [onto.Summer, onto.Winter]
+    t.maxBudget = [2000.0]
+
+    # Run a reasoner: recommend destinations meeting constraints
+    suggestions = recommend_batch(all_traveler_prefs())
+
+    # Show results
+    print("Recommendations:", suggestions["Joe"])
+    for name in suggestions["Joe"][:3]:
+        print(name, explain_destination(t, table.entities[name]))
@@ -0,0 +1,311 @@
+# loadtest.py
+#
+# Load test for the API (main.py).
+#
+# Seeds synthetic users (signup, preferences, location, ratings) through the
+# API, then drives a weighted mix of calls from `concurrency` concurrent
+# clients and reports throughput and p50/p95/p99 latency per route.
+#
+#   target   --url http://host:8000   a running server (backed by its mongod)
+#            (default)                main.app in-process, over ASGI; Mongo is
+#                                     MONGODB_URI, "mongomock://" unless set
+#   SLOs     --slo recommendations:p95=150 ...   exit status 1 when missed
+#
+#   python loadtest.py --users 200 --requests 5000 --concurrency 64
+#
+# Every run signs up fresh accounts (emails carry a run tag), so it can be
+# pointed at the same database repeatedly.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from gyms import GYMS
+
+# not imported from recommender_system: that would open the Mongo client
+# before MONGODB_URI is chosen
+ALL_TYPES = sorted({g.get("type") for g in GYMS if g.get("type")})
+ALL_ENVS = sorted({g.get("env") for g in GYMS if g.get("env")})
+INTENSITIES = ["Low", "Medium", "High"]
+
+# share of each operation in the traffic mix
+DEFAULT_MIX: Dict[str, float] = {
+    "login": 0.10,
+    "save_preferences": 0.10,
+    "location": 0.25,
+    "rate": 0.15,
+    "recommendations": 0.40,
+}
+
+
+@dataclass
+class SyntheticUser:
+    email: str
+    password: str
+    lat: float
+    lon: float
+    user_id: Optional[str] = None
+
+
+def make_users(n: int, rng: random.Random, tag: str) -> List[SyntheticUser]:
+    """Users scattered around the catalog's venues."""
+    users = []
+    for i in range(n):
+        g = rng.choice(GYMS)
+        users.append(SyntheticUser(
+            email=f"load-{tag}-{i}@example.com",
+            password=f"pw-{i}",
+            lat=g["latitude"] + rng.uniform(-0.05, 0.05),
+            lon=g["longitude"] + rng.uniform(-0.05, 0.05),
+        ))
+    return users
+
+
+def random_preferences(user: SyntheticUser, rng: random.Random) -> dict:
+    when = datetime.now(timezone.utc) + timedelta(hours=rng.randint(0, 72))
+    return {
+        "user_id": user.user_id,
+        "activities": rng.sample(ALL_TYPES, rng.randint(1, 2)),
+        "env": rng.choice(ALL_ENVS),
+        "intensity": rng.choice(INTENSITIES),
+        "time": when.isoformat(),
+    }
+
+
+def random_rating(user: SyntheticUser, rng: random.Random) -> dict:
+    g = rng.choice(GYMS)
+    return {
+        "user_id": user.user_id,
+        "place_id": g["name"],
+        "gym_name": g["name"],
+        "rating": rng.randint(1, 5),
+    }
+
+
+# -----------------------------
+# Operations
+# -----------------------------
+Op = Callable[[httpx.AsyncClient, SyntheticUser, random.Random], Awaitable[httpx.Response]]
+
+
+async def op_login(client, user, rng):
+    return await client.post("/login", json={"email": user.email, "password": user.password})
+
+
+async def op_save_preferences(client, user, rng):
+    return await client.post("/api/preferences/", json=random_preferences(user, rng))
+
+
+async def op_location(client, user, rng):
+    user.lat += rng.uniform(-0.002, 0.002)
+    user.lon += rng.uniform(-0.002, 0.002)
+    return await client.put("/user/location", json={
+        "user_id": user.user_id,
+        "location": {"latitude": user.lat, "longitude": user.lon},
+    })
+
+
+async def op_rate(client, user, rng):
+    return await client.post("/api/ratings/", json=random_rating(user, rng))
+
+
+async def op_recommendations(client, user, rng):
+    return await client.get("/recommendations", params={"user_id": user.user_id})
+
+
+# op name → (route label, request)
+OPS: Dict[str, Tuple[str, Op]] = {
+    "login": ("POST /login", op_login),
+    "save_preferences": ("POST /api/preferences/", op_save_preferences),
+    "location": ("PUT /user/location", op_location),
+    "rate": ("POST /api/ratings/", op_rate),
+    "recommendations": ("GET /recommendations", op_recommendations),
+}
+
+
+async def seed(client: httpx.AsyncClient, users: List[SyntheticUser], ratings_per_user: int,
+               concurrency: int, rng: random.Random) -> None:
+    """Sign every user up and give them preferences, a location and ratings."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(user: SyntheticUser, urng: random.Random):
+        async with sem:
+            r = await client.post("/signup", json={
+                "email": user.email, "password": user.password, "name": user.email.split("@")[0],
+            })
+            r.raise_for_status()
+            user.user_id = r.json()["id"]
+            (await op_save_preferences(client, user, urng)).raise_for_status()
+            (await op_location(client, user, urng)).raise_for_status()
+            for _ in range(ratings_per_user):
+                (await op_rate(client, user, urng)).raise_for_status()
+
+    await asyncio.gather(*(one(u, random.Random(rng.random())) for u in users))
+
+
+# -----------------------------
+# Run + report
+# -----------------------------
+
+@dataclass
+class RouteStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed_s: float) -> dict:
+        lat = np.asarray(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        return {
+            "requests": len(self.latencies_ms),
+            "errors": self.errors,
+            "rps": len(self.latencies_ms) / elapsed_s if elapsed_s else 0.0,
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(lat.max()),
+        }
+
+
+async def drive(client: httpx.AsyncClient, users: List[SyntheticUser], n_requests: int,
+                concurrency: int, mix: Dict[str, float], rng: random.Random) -> Tuple[Dict[str, RouteStats], float]:
+    """n_requests calls drawn from `mix`, issued by `concurrency` workers."""
+    names = list(mix)
+    plan = rng.choices(names, weights=[mix[n] for n in names], k=n_requests)
+    who = [rng.randrange(len(users)) for _ in range(n_requests)]
+    stats: Dict[str, RouteStats] = {OPS[n][0]: RouteStats() for n in names}
+    next_i = 0
+
+    async def worker(wrng: random.Random):
+        nonlocal next_i
+        while next_i < n_requests:
+            i = next_i
+            next_i += 1
+            label, op = OPS[plan[i]]
+            t0 = time.perf_counter()
+            try:
+                r = await op(client, users[who[i]], wrng)
+                failed = r.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            st = stats[label]
+            st.latencies_ms.append(1000 * (time.perf_counter() - t0))
+            st.errors += failed
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker(random.Random(rng.random())) for _ in range(concurrency)))
+    return stats, time.perf_counter() - t0
+
+
+def report(stats: Dict[str, RouteStats], elapsed_s: float) -> Dict[str, dict]:
+    rows = {label: st.summary(elapsed_s) for label, st in stats.items()}
+    total = RouteStats([x for st in stats.values() for x in st.latencies_ms],
+                       sum(st.errors for st in stats.values()))
+    rows["total"] = total.summary(elapsed_s)
+
+    print(f"{'route':26s} {'reqs':>7s} {'err':>5s} {'req/s':>8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for label, r in rows.items():
+        print(f"{label:26s} {r['requests']:7d} {r['errors']:5d} {r['rps']:8.1f} "
+              f"{r['p50']:8.2f} {r['p95']:8.2f} {r['p99']:8.2f} {r['max']:8.2f}")
+    print("(latencies in ms)")
+    return rows
+
+
+def parse_slo(spec: str) -> Tuple[str, str, float]:
+    """"recommendations:p95=150" → (op or "total", "p95", 150.0)."""
+    try:
+        name, rest = spec.split(":", 1)
+        pct, ms = rest.split("=", 1)
+        if name not in OPS and name != "total" or pct not in ("p50", "p95", "p99", "max"):
+            raise ValueError
+        return name, pct, float(ms)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad SLO {spec!r}, expected <op>:<p50|p95|p99|max>=<ms>")
+
+
+def check_slos(rows: Dict[str, dict], slos: List[Tuple[str, str, float]]) -> bool:
+    ok = True
+    for name, pct, limit in slos:
+        label = OPS[name][0] if name in OPS else "total"
+        got = rows[label][pct]
+        passed = got <= limit
+        ok &= passed
+        print(f"SLO {name} {pct} ≤ {limit:.0f} ms: {got:.2f} ms {'ok' if passed else 'MISSED'}")
+    return ok
+
+
+@asynccontextmanager
+async def app_client(url: Optional[str], concurrency: int) -> AsyncIterator[httpx.AsyncClient]:
+    if url:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60.0) as client:
+            yield client
+        return
+
+    os.environ.setdefault("MONGODB_URI", "mongomock://")
+    import main
+
+    # ASGITransport sends no lifespan events: run main's startup / shutdown here
+    async with main.app.router.lifespan_context(main.app):
+        # the cold-start table builds in the background at startup; measure
+        # the steady state, not the warm-up
+        while main.cold_start.table is None:
+            await asyncio.sleep(0.2)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60.0) as client:
+            yield client
+
+
+async def run(args) -> Dict[str, dict]:
+    rng = random.Random(args.seed)
+    mix = dict(DEFAULT_MIX)
+    mix.update(args.mix or {})
+    unknown = set(mix) - set(OPS)
+    if unknown:
+        raise SystemExit(f"unknown ops in --mix: {', '.join(sorted(unknown))}")
+    mix = {n: w for n, w in mix.items() if w > 0}
+    users = make_users(args.users, rng, uuid.uuid4().hex[:8])
+
+    async with app_client(args.url, args.concurrency) as client:
+        t0 = time.perf_counter()
+        await seed(client, users, args.ratings_per_user, args.concurrency, rng)
+        print(f"seeded {len(users)} users × {args.ratings_per_user} ratings in {time.perf_counter() - t0:.1f}s")
+
+        stats, elapsed = await drive(client, users, args.requests, args.concurrency, mix, rng)
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {elapsed:.2f}s")
+    return report(stats, elapsed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the API with a synthetic traffic mix.")
+    parser.add_argument("--url", help="base URL of a running server (default: main.app in-process)")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--ratings-per-user", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=json.loads,
+                        help=f'JSON weights overriding {json.dumps(DEFAULT_MIX)}')
+    parser.add_argument("--slo", type=parse_slo, action="append", default=[],
+                        help="<op>:<p50|p95|p99|max>=<ms>, op in %s or total" % ", ".join(OPS))
+    parser.add_argument("--json", dest="json_out", help="write the per-route report here")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args))
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+    if not check_slos(rows, args.slo):
+        sys.exit(1)
@@ -1,13 +1,20 @@
 # main.py
+import asyncio
+import importlib.util
+import os
+import threading
+from contextlib import asynccontextmanager
+from dataclasses import asdict
 from datetime import datetime, timezone
 
 
-from typing import Optional, Dict           # ✅ add Dict here
+from typing import Optional, Dict, Tuple    # ✅ add Dict here
 from bson import ObjectId
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 from fastapi import Query
 from pymongo.errors import DuplicateKeyError
+from starlette.concurrency import run_in_threadpool
 from gyms import GYMS                      # ✅ add this line
 from models import (
     Preferences,
@@ -17,17 +24,168 @@ from models import (
     LoginRequest,
     MapSearch,
     UpdatePreferencesRequest,
-    Rating, PreferencesIn, RatingIn
+    Rating, PreferencesIn, RatingIn, VenueIn
 )
 from mongodb import users_collection
 from mongodb import ratings_collection
-from recommender_system import gyms_for_preferences
+from mongodb import weather_collection
+from mongodb import ensure_indexes
+from recommender_system import (
+    ALL_ENVS,
+    ALL_TYPES,
+    GYMS_BY_NAME,
+    _load_user_ratings,
+    _weather_adjust,
+    remove_gym,
+    upsert_gym,
+)
+from recommendation_pipeline import RequestContext, default_pipeline, popularity_scores
+from regions import ShardedCatalog, ShardedRecommender
+from opening_hours import OpeningHoursIndex, venue_hours, weekly_intervals
+from incremental_content import build_from_catalog
+from weather_context import WeatherCache
+from cold_start import (
+    ColdStartCache,
+    build_table,
+    cells_around,
+    cold_start_recommender,
+    default_combos,
+    observed_combos,
+)
+from matrix_factorization import ALSModel, load_model, train_als
+from ratings_matrix import ratings_to_csr
+from traffic_capture import TrafficRecorder
 
 
 # -------------------------------------------------
 # FastAPI app
 # -------------------------------------------------
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Everything that touches Mongo or starts a thread runs here, not at import,
+    so tools importing main (loadtest.py, replay.py) get no side effects.
+    """
+    await run_in_threadpool(_startup)
+    try:
+        yield
+    finally:
+        cold_start.stop_background_refresh()
+        content_model.stop_background_reweight()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# opt-in: record a sample of requests for replay.py (traffic_capture.py)
+TRAFFIC_LOG = os.environ.get("TRAFFIC_LOG")
+if TRAFFIC_LOG:
+    app.add_middleware(
+        TrafficRecorder,
+        path=TRAFFIC_LOG,
+        sample_rate=float(os.environ.get("TRAFFIC_SAMPLE_RATE", "0.01")),
+        salt=os.environ.get("TRAFFIC_SALT"),
+        # assistant messages are logged as their intent, not their text
+        classify_text=lambda text: assistant.detect_intent(text)[0],
+    )
+
+# ALS model trained offline by matrix_factorization.py; without one, it is
+# trained from the ratings collection with the popularity refresh below
+MF_MODEL_PATH = os.environ.get("MF_MODEL_PATH", "als_model.npz")
+offline_mf_model = load_model(MF_MODEL_PATH)
+
+# two-stage recommender (recommendation_pipeline.py) per region shard
+# (regions.py); popularity feeds the candidate generator once a shard
+# outgrows the candidate budget
+catalog = ShardedCatalog(GYMS)
+
+# content similarity for the rerank stage; catalog edits (PUT/DELETE
+# /catalog/venues) update it in place, and idf drift is re-weighted in the
+# background (incremental_content.py)
+content_model = build_from_catalog(GYMS)
+
+
+def _load_rating_models() -> Tuple[Dict[str, float], Optional[ALSModel]]:
+    """Popularity and the CF (ALS) model, from one scan of the ratings."""
+    docs = list(ratings_collection.find({}, {"user_id": 1, "gym_name": 1, "rating": 1, "_id": 0}))
+    model = offline_mf_model
+    if model is None:
+        triples = [
+            (d["user_id"], d["gym_name"], float(d["rating"]))
+            for d in docs
+            if d.get("user_id") and d.get("gym_name") and isinstance(d.get("rating"), (int, float))
+        ]
+        model = train_als(*ratings_to_csr(triples)) if triples else None
+    return popularity_scores(docs), model
+
+
+def _make_recommender(popularity: Dict[str, float], mf: Optional[ALSModel]) -> ShardedRecommender:
+    return ShardedRecommender(
+        catalog,
+        make_pipeline=lambda filters: default_pipeline(
+            mf_model=mf, popularity=popularity, filters=filters,
+            similar=content_model.similar,
+        ),
+    )
+
+
+# loaded from the ratings at startup
+gym_popularity: Dict[str, float] = {}
+mf_model = offline_mf_model
+recommender = _make_recommender(gym_popularity, mf_model)
+
+# each venue's weekly "hours" from gyms.py, compiled once (opening_hours.py)
+opening_hours = OpeningHoursIndex(GYMS)
+
+# latest client-reported weather per area, shared by all users in it
+weather = WeatherCache(weather_collection)
+
+# cold-start users (no preferences or no ratings) are served from rankings
+# precomputed per geocell by cold_start.py; the refresh, in the background,
+# also recomputes gym_popularity and mf_model so new ratings reach the
+# popularity stage and the CF scorer
+COLD_START_PATH = os.environ.get("COLD_START_PATH", "cold_start.npz")
+COLD_START_REFRESH_S = float(os.environ.get("COLD_START_REFRESH_S", "3600"))
+
+
+def _refresh_rankings():
+    """Background refresh: popularity from the latest ratings, then the cold-start table."""
+    global gym_popularity, mf_model, recommender
+    gym_popularity, mf_model = _load_rating_models()
+    recommender = _make_recommender(gym_popularity, mf_model)
+    return build_table(
+        cold_start_recommender(GYMS, gym_popularity),
+        cells_around(GYMS),
+        default_combos(observed_combos(users_collection.find({}, {"preferences": 1}))),
+    )
+
+
+cold_start = ColdStartCache(_refresh_rankings, path=COLD_START_PATH)
+
+
+def _startup():
+    global gym_popularity, mf_model, recommender
+    ensure_indexes()
+    gym_popularity, mf_model = _load_rating_models()
+    recommender = _make_recommender(gym_popularity, mf_model)
+    content_model.start_background_reweight()
+    cold_start.start_background_refresh(COLD_START_REFRESH_S)
+
+
+def _load_assistant():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "software_agent", "Virtual-Assistant-RB.py")
+    spec = importlib.util.spec_from_file_location("virtual_assistant", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# rule-based assistant (software_agent/Virtual-Assistant-RB.py), one Ctx per
+# chat session; sessions are evicted when idle or when the store is full
+assistant = _load_assistant()
+ASSISTANT_MAX_SESSIONS = int(os.environ.get("ASSISTANT_MAX_SESSIONS", "10000"))
+ASSISTANT_IDLE_S = float(os.environ.get("ASSISTANT_IDLE_S", "1800"))
+assistant_sessions = assistant.SessionStore(ASSISTANT_MAX_SESSIONS, ASSISTANT_IDLE_S)
 
 
 # -------------------------------------------------
@@ -94,6 +252,16 @@ class WeatherUpdateRequest(BaseModel):
     main: str
     description: Optional[str] = None
     temp_c: Optional[float] = None
+    location: Optional[MapLocation] = None   # default: the user's stored location
+
+
+class AssistantSessionRequest(BaseModel):
+    user_id: Optional[str] = None    # optional: personalizes "gyms near me"
+
+
+class AssistantMessage(BaseModel):
+    session_id: str
+    text: str
 
 
 # -------------------------------------------------
@@ -301,41 +469,104 @@ def api_update_time(payload: TimeUpdateRequest):
 @app.put("/user/weather")
 def api_update_weather(payload: WeatherUpdateRequest):
     """
-    Stores the latest weather forecast for this user.
+    Reports the weather the client sees at its location.
+
+    Conditions are shared per area (weather_context.py): only the first
+    report for an area within the TTL is stored, the rest are dropped.
     """
-    users_collection.update_one(
-        {"_id": ObjectId(payload.user_id)},
-        {
-            "$set": {
-                "weather": {
-                    "main": payload.main,
-                    "description": payload.description,
-                    "temp_c": payload.temp_c,
-                    "updated_at": datetime.utcnow().isoformat(),
-                }
-            }
-        },
-    )
+    location = payload.location
+    if location is not None:
+        lat, lon = location.latitude, location.longitude
+    elif current_user.user_id == payload.user_id and current_user.latitude is not None:
+        lat, lon = current_user.latitude, current_user.longitude
+    else:
+        user = users_collection.find_one({"_id": ObjectId(payload.user_id)}, {"location": 1}) or {}
+        loc = user.get("location") or {}
+        lat, lon = loc.get("latitude"), loc.get("longitude")
+
+    report, stored = weather.report(lat, lon, payload.main, payload.description, payload.temp_c)
 
     if current_user.user_id == payload.user_id:
         current_user.set_weather(payload.main, payload.description, payload.temp_c)
 
-    return {"status": "ok", "weather": payload.dict()}
+    return {
+        "status": "ok",
+        "weather": payload.dict(exclude={"location"}),
+        "stored": stored,
+        "area_weather": asdict(report) if report else None,
+    }
+
+
+# -------------------------------------------------
+# Catalog edits (operations)
+# -------------------------------------------------
+_catalog_lock = threading.Lock()
+
+
+def _rebuild_catalog():
+    """Shards, pipelines and the hours index over the edited GYMS."""
+    global catalog, recommender, opening_hours
+    catalog = ShardedCatalog(GYMS)
+    recommender = _make_recommender(gym_popularity, mf_model)
+    opening_hours = OpeningHoursIndex(GYMS)
+
+
+@app.put("/catalog/venues")
+def upsert_venue(venue: VenueIn):
+    """
+    Add a venue, or replace the one with the same name. Served from the next
+    request on; the content model takes it in without a refit. In memory
+    only: gyms.py stays the catalog a restart starts from.
+    """
+    if venue.type not in ALL_TYPES or venue.env not in ALL_ENVS:
+        raise HTTPException(status_code=422, detail="Unknown venue type or env")
+    gym = venue.model_dump(exclude_none=True)
+    if "hours" in gym:
+        try:
+            weekly_intervals(venue_hours(gym["hours"]))
+        except ValueError:
+            raise HTTPException(status_code=422, detail="Invalid hours")
+
+    with _catalog_lock:
+        created = upsert_gym(gym)
+        content_model.upsert_venue(gym)
+        _rebuild_catalog()
+    return {"status": "ok", "name": venue.name, "created": created}
+
+
+@app.delete("/catalog/venues/{name}")
+def delete_venue(name: str):
+    with _catalog_lock:
+        if name not in GYMS_BY_NAME:
+            raise HTTPException(status_code=404, detail="Venue not found")
+        remove_gym(name)
+        content_model.remove(name)
+        _rebuild_catalog()
+    return {"status": "ok", "name": name}
 
 
 # -------------------------------------------------
 # Recommendations
 # -------------------------------------------------
 @app.get("/recommendations")
-def recommendations(user_id: str = Query(..., description="Mongo _id of the user as a string")):
+def recommendations(
+    response: Response,
+    user_id: str = Query(..., description="Mongo _id of the user as a string"),
+):
     """
     Return a list of gym names recommended for this user.
 
     It:
     - looks up the user by user_id in MongoDB
     - reads user['preferences'] (activities, env, intensity, time)
+    - ranks venues open at preferences.time first (opening_hours.py)
+    - down-ranks outdoor venues in bad weather for the area (weather_context.py)
+    - users without preferences or ratings get the precomputed cold-start
+      list for their geocell (cold_start.py) when there is one
     - optionally uses user['location'] for distance sorting
-    - calls gyms_for_preferences(...)
+    - runs the two-stage pipeline (candidates → rerank) on the user's
+      region shard: the gyms_for_preferences(...) signals plus ALS (CF) and
+      content similarity; per-stage times go out in a Server-Timing header
     """
 
     # 1) Validate ObjectId
@@ -349,11 +580,8 @@ def recommendations(user_id: str = Query(..., description="Mongo _id of the user
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # 3) Ensure preferences exist
-    prefs = user.get("preferences")
-    if not prefs:
-        # You can use 204 or 400; I’ll use 400 with a clear message
-        raise HTTPException(status_code=400, detail="Preferences not set for this user")
+    # 3) Preferences (none yet → ranked as "any activity")
+    prefs = user.get("preferences") or {}
 
     activities = prefs.get("activities") or []
     env = prefs.get("env")
@@ -365,23 +593,40 @@ def recommendations(user_id: str = Query(..., description="Mongo _id of the user
     user_lat = location.get("latitude")
     user_lon = location.get("longitude")
 
-    open_status: Dict[str, bool] = {
-        gym["name"]: True
-        for gym in GYMS
-    }
-
-    # 5) Call your recommender
-    gym_names = gyms_for_preferences(
+    # open / closed at the time the user plans to go (default: now)
+    open_status = opening_hours.open_at(prefs.get("time"))
+    outdoor_factor = weather.suitability(user_lat, user_lon)
+
+    # 5) No ratings yet → one lookup in the precomputed cold-start table
+    user_ratings = _load_user_ratings(user_id)  # 👈 so ratings influence this user
+    if not user_ratings:
+        names = cold_start.lookup(activities, env, intensity, user_lat, user_lon)
+        if names is not None:
+            # a table loaded from disk may name venues since removed
+            names = [n for n in names if n in GYMS_BY_NAME]
+            # precomputed lists ignore hours and weather: re-apply "open first"
+            names.sort(key=lambda n: not _weather_adjust(
+                GYMS_BY_NAME[n], 0.0, open_status.get(n, False), outdoor_factor
+            )[1])
+            return {"recommendations": names}
+
+    # 6) Call your recommender
+    ctx = RequestContext(
         activities=activities,
         env=env,
         intensity=intensity,
         user_lat=user_lat,
         user_lon=user_lon,
-        user_id=user_id,  # 👈 so ratings influence this user
+        user_ratings=user_ratings,
         open_status=open_status,
+        outdoor_factor=outdoor_factor,
+    )
+    result = recommender.run(ctx)
+    response.headers["Server-Timing"] = ", ".join(
+        f"{stage.replace(':', '-')};dur={1000 * s:.3f}" for stage, s in result.timings.items()
     )
 
-    return {"recommendations": gym_names}
+    return {"recommendations": result.names}
 
 
 from fastapi import Query
@@ -570,3 +815,92 @@ def get_preferences(user_id: str = Query(..., description="Mongo _id of the user
         prefs["time"] = t_utc.isoformat().replace("+00:00", "Z")
 
     return {"preferences": prefs}
+
+
+# -------------------------------------------------
+# Assistant chat
+# -------------------------------------------------
+def _assistant_ctx(user_id: Optional[str]):
+    """A fresh assistant Ctx, primed with the user's profile and ratings."""
+    ctx = assistant.Ctx()
+    if not user_id:
+        return ctx
+
+    try:
+        user_obj_id = ObjectId(user_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid user_id")
+
+    user = users_collection.find_one({"_id": user_obj_id})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    location = user.get("location") or {}
+    if location.get("latitude") is not None and location.get("longitude") is not None:
+        ctx.memory["location"] = (location["latitude"], location["longitude"])
+    ctx.memory["user_name"] = user.get("name")
+    ctx.memory["activities"] = (user.get("preferences") or {}).get("activities") or None
+    ctx.memory["ratings"] = _load_user_ratings(user_id)
+    return ctx
+
+
+@app.post("/assistant/sessions")
+async def assistant_start(req: AssistantSessionRequest):
+    ctx = await run_in_threadpool(_assistant_ctx, req.user_id)
+    return {"session_id": assistant_sessions.create(ctx)}
+
+
+@app.post("/assistant/messages")
+async def assistant_message(msg: AssistantMessage):
+    ctx = assistant_sessions.get(msg.session_id)
+    if ctx is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+
+    intent, reply = await assistant.respond_async(msg.text, ctx)
+    if intent == "bye":
+        assistant_sessions.drop(msg.session_id)
+    return {"intent": intent, "reply": reply}
+
+
+@app.delete("/assistant/sessions/{session_id}")
+async def assistant_end(session_id: str):
+    if not assistant_sessions.drop(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"ok": True}
+
+
+@app.websocket("/assistant/ws")
+async def assistant_ws(websocket: WebSocket, user_id: Optional[str] = None):
+    """
+    One chat per connection: text in, {"intent", "reply"} out; closed when idle.
+    The chat is a session in assistant_sessions like the HTTP ones, so it
+    counts toward ASSISTANT_MAX_SESSIONS; once evicted the socket is closed.
+    """
+    await websocket.accept()
+    try:
+        ctx = await run_in_threadpool(_assistant_ctx, user_id)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    session_id = assistant_sessions.create(ctx)
+    try:
+        while True:
+            try:
+                text = await asyncio.wait_for(websocket.receive_text(), ASSISTANT_IDLE_S)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="idle")
+                return
+            ctx = assistant_sessions.get(session_id)
+            if ctx is None:
+                await websocket.close(code=1013, reason="session evicted")
+                return
+            intent, reply = await assistant.respond_async(text, ctx)
+            await websocket.send_json({"intent": intent, "reply": reply})
+            if intent == "bye":
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        assistant_sessions.drop(session_id)
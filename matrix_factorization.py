@@ -0,0 +1,294 @@
+# matrix_factorization.py
+#
+# Alternating-least-squares factorization of the user × venue ratings.
+#
+# Train offline from a ratings export:
+#   python matrix_factorization.py ratings.json --rank 32 --reg 0.1 --out als_model.npz
+# or straight from the ratings collection:
+#   python matrix_factorization.py --from-mongo --out als_model.npz
+#
+# Serving only needs the float32 item factors: a user's latent vector is
+# folded in from their current ratings, then every venue is scored with one
+# matrix-vector product.
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from ratings_matrix import build_ui_sparse, ratings_to_csr
+
+# keep each batched normal-equation block (entries × rank × rank) around 64 MB
+_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+# -----------------------------
+# Ratings export
+# -----------------------------
+
+def load_ratings_export(path: str) -> List[Tuple[str, str, float]]:
+    """
+    Read a `ratings` collection export (JSON array or one document per line,
+    as written by mongoexport) into (user_id, gym_name, rating) triples.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+
+    if text.startswith("["):
+        docs = json.loads(text)
+    else:
+        docs = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    out = []
+    for d in docs:
+        user = d.get("user_id")
+        name = d.get("gym_name")
+        rating = d.get("rating")
+        if user and name and isinstance(rating, (int, float)):
+            out.append((str(user), name, float(rating)))
+    return out
+
+
+# -----------------------------
+# Model
+# -----------------------------
+
+class ALSModel:
+    def __init__(
+        self,
+        user_ids: List[str],
+        item_ids: List[str],
+        user_factors: np.ndarray,
+        item_factors: np.ndarray,
+        global_mean: float,
+        reg: float,
+    ):
+        self.user_ids = list(user_ids)
+        self.item_ids = list(item_ids)
+        self.user_factors = np.asarray(user_factors, dtype=np.float32)
+        self.item_factors = np.ascontiguousarray(item_factors, dtype=np.float32)
+        self.global_mean = float(global_mean)
+        self.reg = float(reg)
+
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index = {it: i for i, it in enumerate(self.item_ids)}
+
+    @property
+    def rank(self) -> int:
+        return self.item_factors.shape[1]
+
+    def fold_in(self, ratings: Dict[str, float]) -> np.ndarray:
+        """
+        Latent vector for a user from their ratings, with the item factors
+        held fixed – one rank × rank solve, no retraining.
+        """
+        idx = [self.item_index[it] for it in ratings if it in self.item_index]
+        if not idx:
+            return np.zeros(self.rank, dtype=np.float32)
+
+        r = np.array(
+            [ratings[self.item_ids[i]] for i in idx], dtype=np.float64
+        ) - self.global_mean
+        Y = self.item_factors[idx].astype(np.float64)
+        A = Y.T @ Y + self.reg * len(idx) * np.eye(self.rank)
+        return np.linalg.solve(A, Y.T @ r).astype(np.float32)
+
+    def score(self, user_vec: np.ndarray) -> np.ndarray:
+        """Deviation from the global mean for every item (item order = item_ids)."""
+        return self.item_factors @ user_vec
+
+    def scores_for_ratings(self, ratings: Dict[str, float]) -> Dict[str, float]:
+        """{ item: predicted deviation } for a user known only by their ratings."""
+        if not ratings:
+            return {}
+        scores = self.score(self.fold_in(ratings))
+        return dict(zip(self.item_ids, scores.tolist()))
+
+    def predict(self, user_id: str, item_id: str) -> Optional[float]:
+        u = self.user_index.get(user_id)
+        i = self.item_index.get(item_id)
+        if u is None or i is None:
+            return None
+        return float(self.global_mean + self.user_factors[u] @ self.item_factors[i])
+
+    def save(self, path: str) -> None:
+        np.savez(
+            path,
+            user_ids=np.array(self.user_ids, dtype=str),
+            item_ids=np.array(self.item_ids, dtype=str),
+            user_factors=self.user_factors,
+            item_factors=self.item_factors,
+            global_mean=np.float64(self.global_mean),
+            reg=np.float64(self.reg),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ALSModel":
+        with np.load(path) as data:
+            return cls(
+                user_ids=data["user_ids"].tolist(),
+                item_ids=data["item_ids"].tolist(),
+                user_factors=data["user_factors"],
+                item_factors=data["item_factors"],
+                global_mean=float(data["global_mean"]),
+                reg=float(data["reg"]),
+            )
+
+
+def load_model(path: str) -> Optional[ALSModel]:
+    """Load a trained model if the file exists, else None."""
+    if not os.path.exists(path):
+        return None
+    return ALSModel.load(path)
+
+
+# -----------------------------
+# Training
+# -----------------------------
+
+def _row_blocks(indptr: np.ndarray, max_entries: int) -> List[Tuple[int, int]]:
+    """Split rows into contiguous blocks holding at most ~max_entries ratings."""
+    blocks = []
+    start = 0
+    n_rows = len(indptr) - 1
+    while start < n_rows:
+        end = int(np.searchsorted(indptr, indptr[start] + max_entries, side="right")) - 1
+        end = min(max(end, start + 1), n_rows)
+        blocks.append((start, end))
+        start = end
+    return blocks
+
+
+def _solve_block(
+    R: csr_matrix,
+    fixed: np.ndarray,
+    out: np.ndarray,
+    start: int,
+    end: int,
+    reg: float,
+) -> None:
+    """
+    Solve the ridge normal equations for rows start..end of R in one batch:
+      (Yᵤᵀ Yᵤ + reg · nᵤ · I) xᵤ = Yᵤᵀ rᵤ
+    """
+    lo, hi = R.indptr[start], R.indptr[end]
+    n_rows, nnz, rank = end - start, hi - lo, fixed.shape[1]
+    counts = np.diff(R.indptr[start:end + 1])
+    has = counts > 0
+
+    if not has.any():
+        out[start:end] = 0.0
+        return
+
+    # per-row sums over the block's ratings as sparse × dense products:
+    # `pick` has this block's sparsity pattern, with ones / ratings as data
+    Y = fixed[R.indices[lo:hi]]                       # (nnz, rank)
+    local = (np.arange(nnz), R.indptr[start:end + 1] - lo)
+    pick = csr_matrix((np.ones(nnz), *local), shape=(n_rows, nnz))
+    rated = csr_matrix((R.data[lo:hi], *local), shape=(n_rows, nnz))
+
+    outer = np.einsum("ni,nj->nij", Y, Y).reshape(nnz, rank * rank)
+    A = (pick @ outer).reshape(n_rows, rank, rank)[has]
+    b = (rated @ Y)[has]
+    A += (reg * counts[has])[:, None, None] * np.eye(rank)
+
+    block = np.zeros((n_rows, rank))
+    block[has] = np.linalg.solve(A, b[:, :, None])[:, :, 0]
+    out[start:end] = block
+
+
+def _als_half_step(
+    R: csr_matrix,
+    fixed: np.ndarray,
+    out: np.ndarray,
+    reg: float,
+    pool: ThreadPoolExecutor,
+) -> None:
+    rank = fixed.shape[1]
+    max_entries = max(1, _BLOCK_BYTES // (rank * rank * 8))
+    futures = [
+        pool.submit(_solve_block, R, fixed, out, start, end, reg)
+        for start, end in _row_blocks(R.indptr, max_entries)
+    ]
+    for f in futures:
+        f.result()
+
+
+def train_als(
+    R: csr_matrix,
+    user_ids: List[str],
+    item_ids: List[str],
+    rank: int = 32,
+    reg: float = 0.1,
+    iterations: int = 15,
+    n_threads: Optional[int] = None,
+    seed: int = 0,
+) -> ALSModel:
+    """
+    Explicit-feedback ALS with weighted-λ regularization.
+
+    Each half step solves every user (then every item) independently, so the
+    rows are cut into blocks and solved on a thread pool; the batched
+    np.linalg.solve calls release the GIL and use all cores.
+    """
+    R = csr_matrix(R, dtype=np.float64, copy=True)     # centered in place below
+    global_mean = float(R.data.mean()) if R.nnz else 0.0
+    R.data -= global_mean
+    Rt = R.T.tocsr()
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(scale=0.1, size=(R.shape[0], rank))
+    Y = rng.normal(scale=0.1, size=(R.shape[1], rank))
+
+    with ThreadPoolExecutor(max_workers=n_threads or os.cpu_count()) as pool:
+        for _ in range(iterations):
+            _als_half_step(R, Y, X, reg, pool)
+            _als_half_step(Rt, X, Y, reg, pool)
+
+    return ALSModel(user_ids, item_ids, X, Y, global_mean, reg)
+
+
+def rmse(model: ALSModel, triples: Iterable[Tuple[str, str, float]]) -> float:
+    errs = [
+        (p - r) ** 2
+        for u, it, r in triples
+        if (p := model.predict(u, it)) is not None
+    ]
+    return float(np.sqrt(np.mean(errs))) if errs else float("nan")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the ALS venue recommender.")
+    parser.add_argument("ratings", nargs="?", help="ratings export (mongoexport JSON / JSON lines)")
+    parser.add_argument("--from-mongo", action="store_true", help="stream ratings from MongoDB instead")
+    parser.add_argument("--rank", type=int, default=32)
+    parser.add_argument("--reg", type=float, default=0.1)
+    parser.add_argument("--iters", type=int, default=15)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--out", default="als_model.npz")
+    args = parser.parse_args()
+
+    if args.from_mongo:
+        R, users, items = build_ui_sparse()
+        coo = R.tocoo()
+        triples = [
+            (users[u], items[i], float(r))
+            for u, i, r in zip(coo.row, coo.col, coo.data)
+        ]
+    elif args.ratings:
+        triples = load_ratings_export(args.ratings)
+        R, users, items = ratings_to_csr(triples)
+    else:
+        parser.error("pass a ratings export or --from-mongo")
+
+    model = train_als(
+        R, users, items,
+        rank=args.rank, reg=args.reg, iterations=args.iters, n_threads=args.threads,
+    )
+    model.save(args.out)
+    print(f"{R.shape[0]} users × {R.shape[1]} venues, {R.nnz} ratings")
+    print(f"train RMSE: {rmse(model, triples):.4f} → saved {args.out}")
@@ -17,7 +17,7 @@ class ActivityEnum(str, Enum):
 
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -74,6 +74,17 @@ class UpdatePreferencesRequest(BaseModel):
     preferences: Preferences
 
 
+class VenueIn(BaseModel):
+    name: str                    # key: an existing name replaces that venue
+    type: str                    # one of the catalog types ("Boxing", "Parks", ...)
+    env: str                     # "Indoor" / "Outdoor"
+    level: List[int] = []
+    address: str = ""
+    latitude: float
+    longitude: float
+    hours: Optional[Dict[str, List[List[str]]]] = None   # {"mon-fri": [["06:00", "22:00"]]}
+
+
 class Rating(BaseModel):
     user_id: str                 # Mongo _id of the user as a string
     gym_name: str                # name from GYMS[i]["name"]
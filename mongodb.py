@@ -1,20 +1,38 @@
+import os
+
 from pymongo import MongoClient
 from passlib.context import CryptContext
 
-MONGODB_URI = "mongodb://localhost:27017"
+# "mongomock://" runs against an in-memory stand-in (needs mongomock), for
+# load tests without a mongod (loadtest.py)
+MONGODB_URI = os.environ.get("MONGODB_URI", "mongodb://localhost:27017")
+
+if MONGODB_URI.startswith("mongomock://"):
+    import mongomock
 
-client = MongoClient(MONGODB_URI)
+    client = mongomock.MongoClient()
+else:
+    client = MongoClient(MONGODB_URI)
 db = client["iuiapp_db"]
 
 users_collection = db["users"]
 ratings_collection = db["ratings"]
 preferences_collection = db["preferences"]
+weather_collection = db["weather"]          # one doc per geocell (weather_context.py)
+
+
+def ensure_indexes():
+    """
+    Called once by the API at startup (not at import, so offline tools can
+    import the recommender without a running mongod).
+    """
+    # 🔧 Make this idempotent – let Mongo reuse the existing index
+    ratings_collection.create_index(
+        [("user_id", 1), ("place_id", 1)],
+        unique=True,  # keep unique constraint
+        # no "name" here – Mongo will detect existing index and reuse it
+    )
+    weather_collection.create_index([("cell", 1)], unique=True)
 
-# 🔧 Make this idempotent – let Mongo reuse the existing index
-ratings_collection.create_index(
-    [("user_id", 1), ("place_id", 1)],
-    unique=True,  # keep unique constraint
-    # no "name" here – Mongo will detect existing index and reuse it
-)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -0,0 +1,294 @@
+# opening_hours.py
+#
+# Venue opening hours, compiled into an interval index.
+#
+# Data model
+#   weekly hours  {day: [("HH:MM", "HH:MM"), ...]}; a close before the open
+#                 time runs past midnight, "24:00" is end of day. Venues carry
+#                 theirs in gyms.py as "hours", keyed by day or day range
+#                 ("mon-fri", "sat", "daily"); a day not listed is closed
+#   fallbacks     per-name `hours` passed to the index win over the venue's
+#                 own; then per venue type (default_hours); a venue with no
+#                 hours anywhere counts as open
+#   exceptions    HoursException(when, venue, intervals): a date or a recurring
+#                 (month, day) on which one venue (or all, venue=None) keeps
+#                 other hours; intervals=[] means closed
+#
+# The hours in gyms.py are sample data for the demo catalog. DEFAULT_HOURS /
+# EXCEPTIONS below are placeholders and are not used by default.
+#
+# Index
+#   every venue's week is cut into minute-of-week intervals; one sweep over
+#   the sorted boundaries gives, per segment, a bitmask of the open venues.
+#   open_at(t) is a bisect + one int → "which venues are open at t" for the
+#   whole catalog. Dates with exceptions, and the dates after them (hours run
+#   past midnight), get their own (cached) day index.
+
+import bisect
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo
+
+from gyms import GYMS
+
+# Montréal and Toronto share a timezone
+TIMEZONE = ZoneInfo("America/Toronto")
+
+DAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+WEEK_MIN = 7 * 24 * 60
+DAY_MIN = 24 * 60
+
+Interval = Tuple[str, str]
+WeeklyHours = Dict[str, List[Interval]]
+
+
+def _every_day(*intervals: Interval) -> WeeklyHours:
+    return {d: list(intervals) for d in DAYS}
+
+
+def _weekdays_weekend(weekdays: List[Interval], weekend: List[Interval]) -> WeeklyHours:
+    return {d: list(weekdays if i < 5 else weekend) for i, d in enumerate(DAYS)}
+
+
+# PLACEHOLDER: invented hours per venue type, not from the venue data
+DEFAULT_HOURS: Dict[str, WeeklyHours] = {
+    "Boxing": _weekdays_weekend([("06:00", "22:00")], [("08:00", "18:00")]),
+    "Muay Thai": _weekdays_weekend([("06:00", "22:00")], [("09:00", "17:00")]),
+    "Savate": {
+        **_weekdays_weekend([("17:00", "22:00")], []),
+        "sat": [("10:00", "14:00")],
+    },
+    "Parks": _every_day(("06:00", "24:00")),
+    "Relax": _every_day(("09:00", "21:00")),
+    "Eat": _every_day(("11:00", "23:00")),
+}
+
+@dataclass(frozen=True)
+class HoursException:
+    when: Union[date, Tuple[int, int]]      # a date, or (month, day) every year
+    venue: Optional[str] = None             # None = every venue
+    intervals: Tuple[Interval, ...] = ()    # () = closed all day
+
+    def applies(self, day: date) -> bool:
+        if isinstance(self.when, date):
+            return self.when == day
+        return (day.month, day.day) == self.when
+
+
+# PLACEHOLDER: holiday closures
+EXCEPTIONS: List[HoursException] = [
+    HoursException((12, 25)),
+    HoursException((1, 1)),
+    # parks stay open on holidays
+    *(HoursException(when, g["name"], (("06:00", "24:00"),))
+      for when in [(12, 25), (1, 1)]
+      for g in GYMS if g.get("type") == "Parks"),
+]
+
+
+def venue_hours(spec: Dict[str, Sequence[Sequence[str]]]) -> WeeklyHours:
+    """gyms.py "hours" ({"mon-fri": [["06:00", "22:00"]], ...}) → WeeklyHours."""
+    out: WeeklyHours = {}
+    for key, intervals in spec.items():
+        first, _, last = ("mon-sun" if key == "daily" else key).partition("-")
+        lo, hi = DAYS.index(first), DAYS.index(last or first)
+        for d in DAYS[lo:hi + 1]:
+            out.setdefault(d, []).extend((s, e) for s, e in intervals)
+    return out
+
+
+def _minutes(hhmm: str) -> int:
+    h, m = hhmm.split(":")
+    return int(h) * 60 + int(m)
+
+
+def _day_intervals(intervals: Iterable[Interval], offset: int) -> List[Tuple[int, int]]:
+    """("HH:MM", "HH:MM") pairs → [start, end) minutes from `offset`."""
+    out = []
+    for start, end in intervals:
+        s, e = _minutes(start), _minutes(end)
+        if e <= s:
+            e += DAY_MIN                    # closes after midnight
+        out.append((offset + s, offset + e))
+    return out
+
+
+def weekly_intervals(hours: WeeklyHours) -> List[Tuple[int, int]]:
+    """Minute-of-week intervals; anything past Sunday midnight wraps to Monday."""
+    out = []
+    for i, day in enumerate(DAYS):
+        for s, e in _day_intervals(hours.get(day, ()), i * DAY_MIN):
+            if e <= WEEK_MIN:
+                out.append((s, e))
+            else:
+                out.append((s, WEEK_MIN))
+                out.append((0, e - WEEK_MIN))
+    return out
+
+
+def _sweep(per_venue: Sequence[List[Tuple[int, int]]], span: int) -> Tuple[List[int], List[int]]:
+    """
+    (bounds, masks): masks[i] has bit v set when venue v is open on
+    [bounds[i], bounds[i + 1]).
+    """
+    events: Dict[int, List[Tuple[int, int]]] = {0: [], span: []}
+    for v, intervals in enumerate(per_venue):
+        for s, e in intervals:
+            events.setdefault(s, []).append((v, +1))
+            events.setdefault(e, []).append((v, -1))
+
+    depth = [0] * len(per_venue)            # overlapping intervals per venue
+    mask = 0
+    bounds: List[int] = []
+    masks: List[int] = []
+    for t in sorted(events):
+        for v, d in events[t]:
+            depth[v] += d
+            if depth[v] > 0:
+                mask |= 1 << v
+            else:
+                mask &= ~(1 << v)
+        if t < span:
+            bounds.append(t)
+            masks.append(mask)
+    return bounds, masks
+
+
+def to_local(t: Union[datetime, str, None]) -> datetime:
+    """Venue-local time. Naive datetimes are UTC, as Mongo returns them."""
+    if t is None:
+        t = datetime.now(timezone.utc)
+    elif isinstance(t, str):
+        t = datetime.fromisoformat(t.replace("Z", "+00:00"))
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return t.astimezone(TIMEZONE)
+
+
+# -----------------------------
+# Index
+# -----------------------------
+
+class OpenVenues(Mapping):
+    """{gym name: is open} for the whole catalog, backed by one bitmask."""
+
+    def __init__(self, index: Dict[str, int], mask: int):
+        self._index = index
+        self.mask = mask
+
+    def __getitem__(self, name: str) -> bool:
+        return bool(self.mask >> self._index[name] & 1)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def open_names(self) -> List[str]:
+        return [n for n, i in self._index.items() if self.mask >> i & 1]
+
+
+class OpeningHoursIndex:
+    def __init__(
+        self,
+        gyms: Iterable[dict] = GYMS,
+        hours: Optional[Dict[str, WeeklyHours]] = None,
+        default_hours: Optional[Dict[str, WeeklyHours]] = None,
+        exceptions: Sequence[HoursException] = (),
+    ):
+        """
+        hours: per-name overrides; otherwise a venue's own "hours", then
+        default_hours by type. Venues with none of these are always open.
+        """
+        gyms = list(gyms)
+        hours = hours or {}
+        default_hours = default_hours or {}
+        self.names = [g["name"] for g in gyms]
+        self.index = {n: i for i, n in enumerate(self.names)}
+        self.exceptions = list(exceptions)
+
+        always = _every_day(("00:00", "24:00"))
+        self.hours: List[WeeklyHours] = [
+            hours.get(g["name"])
+            or (venue_hours(g["hours"]) if g.get("hours") else None)
+            or default_hours.get(g.get("type"))
+            or always
+            for g in gyms
+        ]
+        self.weekly: List[List[Tuple[int, int]]] = [weekly_intervals(h) for h in self.hours]
+        self.bounds, self.masks = _sweep(self.weekly, WEEK_MIN)
+        self._days: Dict[date, Optional[Tuple[List[int], List[int]]]] = {}
+
+    def _overrides(self, day: date) -> Dict[int, Iterable[Interval]]:
+        """{venue: intervals} of the exceptions on this date; later entries win."""
+        override: Dict[int, Iterable[Interval]] = {}
+        for e in self.exceptions:
+            if e.applies(day):
+                rows = range(len(self.names)) if e.venue is None else [self.index.get(e.venue)]
+                for v in rows:
+                    if v is not None:
+                        override[v] = e.intervals
+        return override
+
+    def _day_index(self, day: date) -> Optional[Tuple[List[int], List[int]]]:
+        """
+        Index for a date with exceptions (or right after one, for hours past
+        midnight), or None when the weekly one applies.
+        """
+        if day in self._days:
+            return self._days[day]
+
+        before = day - timedelta(days=1)
+        today, yesterday = self._overrides(day), self._overrides(before)
+        result = None
+        if today or yesterday:
+            def own(v: int, d: date, override: Dict[int, Iterable[Interval]]):
+                """v's intervals starting on d, in minutes from d's midnight."""
+                if v in override:
+                    return _day_intervals(override[v], 0)
+                return _day_intervals(self.hours[v].get(DAYS[d.weekday()], ()), 0)
+
+            per_venue = []
+            for v in range(len(self.names)):
+                intervals = [(s, min(e, DAY_MIN)) for s, e in own(v, day, today)]
+                # yesterday's hours that run past midnight
+                intervals += [(0, e - DAY_MIN) for s, e in own(v, before, yesterday) if e > DAY_MIN]
+                per_venue.append(intervals)
+            result = _sweep(per_venue, DAY_MIN)
+
+        self._days[day] = result
+        return result
+
+    def mask_at(self, t: Union[datetime, str, None] = None) -> int:
+        local = to_local(t)
+        minute = local.hour * 60 + local.minute
+        day = self._day_index(local.date())
+        if day is not None:
+            bounds, masks = day
+        else:
+            bounds, masks = self.bounds, self.masks
+            minute += local.weekday() * DAY_MIN
+        return masks[bisect.bisect_right(bounds, minute) - 1]
+
+    def open_at(self, t: Union[datetime, str, None] = None) -> OpenVenues:
+        """Which venues are open at t (default: now)."""
+        return OpenVenues(self.index, self.mask_at(t))
+
+
+if __name__ == "__main__":
+    import time
+
+    t0 = time.perf_counter()
+    idx = OpeningHoursIndex(GYMS, default_hours=DEFAULT_HOURS, exceptions=EXCEPTIONS)
+    print(f"{len(idx.names)} venues, {len(idx.bounds)} weekly segments, "
+          f"built in {1000 * (time.perf_counter() - t0):.2f} ms")
+
+    for when in ["2025-03-12T12:00:00Z", "2025-03-12T03:30:00Z", "2025-03-15T22:00:00Z",
+                 "2025-12-25T15:00:00Z"]:
+        t0 = time.perf_counter()
+        status = idx.open_at(when)
+        us = 1e6 * (time.perf_counter() - t0)
+        print(f"{when}: {len(status.open_names()):2d} open ({us:.1f} µs)")
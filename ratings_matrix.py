@@ -0,0 +1,91 @@
+# ratings_matrix.py
+#
+# Sparse user × venue rating matrices, built without a dense pivot.
+#
+# pandas.pivot_table (build_ui in recommender_system/) materializes the whole
+# ratings DataFrame and then a dense users × items grid that is mostly NaN.
+# Here ids are assigned on the fly and only (row, col, rating) coordinates are
+# kept, so memory grows with the number of ratings, not users × items.
+
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class _CoordinateBuilder:
+    """Growing (row, col, value) buffers with string ids mapped to ints."""
+
+    def __init__(self):
+        self.user_index: Dict[str, int] = {}
+        self.item_index: Dict[str, int] = {}
+        self.rows = array("i")
+        self.cols = array("i")
+        self.vals = array("f")
+
+    def add(self, user: str, item: str, rating: float) -> None:
+        self.rows.append(self.user_index.setdefault(user, len(self.user_index)))
+        self.cols.append(self.item_index.setdefault(item, len(self.item_index)))
+        self.vals.append(rating)
+
+    def to_csr(self) -> Tuple[csr_matrix, List[str], List[str]]:
+        shape = (len(self.user_index), len(self.item_index))
+        rows = np.frombuffer(self.rows, dtype=np.int32)
+        cols = np.frombuffer(self.cols, dtype=np.int32)
+        vals = np.frombuffer(self.vals, dtype=np.float32)
+
+        R = csr_matrix((vals, (rows, cols)), shape=shape)
+        R.sum_duplicates()
+
+        # same (user, item) twice → mean, like pivot_table(aggfunc="mean")
+        if R.nnz < len(vals):
+            counts = csr_matrix(
+                (np.ones(len(vals), dtype=np.float32), (rows, cols)), shape=shape
+            )
+            counts.sum_duplicates()
+            R.data /= counts.data
+
+        return R, list(self.user_index), list(self.item_index)
+
+
+def ratings_to_csr(
+    triples: Iterable[Tuple[str, str, float]],
+) -> Tuple[csr_matrix, List[str], List[str]]:
+    """(user, item, rating) triples → users × items CSR plus the id lists."""
+    builder = _CoordinateBuilder()
+    for user, item, rating in triples:
+        builder.add(user, item, rating)
+    return builder.to_csr()
+
+
+def build_ui_sparse(
+    collection=None,
+    query: Optional[dict] = None,
+    batch_size: int = 5000,
+    user_field: str = "user_id",
+    item_field: str = "gym_name",
+    rating_field: str = "rating",
+) -> Tuple[csr_matrix, List[str], List[str]]:
+    """
+    Stream the ratings collection into a users × items CSR matrix.
+
+    Documents are fetched `batch_size` at a time with a projection on the
+    three fields we need; row i / column j of the result are user_ids[i] /
+    item_ids[j].
+    """
+    if collection is None:
+        from mongodb import ratings_collection
+        collection = ratings_collection
+
+    projection = {user_field: 1, item_field: 1, rating_field: 1, "_id": 0}
+    cursor = collection.find(query or {}, projection, batch_size=batch_size)
+
+    builder = _CoordinateBuilder()
+    for d in cursor:
+        user = d.get(user_field)
+        item = d.get(item_field)
+        rating = d.get(rating_field)
+        if user and item and isinstance(rating, (int, float)):
+            builder.add(str(user), item, float(rating))
+    return builder.to_csr()
@@ -0,0 +1,335 @@
+# recommendation_pipeline.py
+#
+# Two-stage recommendation: cheap candidate generation, then the expensive
+# scorers on the candidates only.
+#
+#   stage 1  filters     hard attribute filters (activity / env / intensity)
+#                        answered from precomputed indexes
+#            generators  if that still leaves more than `max_candidates`
+#                        venues, keep the union of the nearest ones and the
+#                        most popular ones
+#   stage 2  scorers     preference similarity, rating boost, ALS prediction,
+#                        content similarity … summed with per-scorer weights
+#            rank        same ordering as gyms_for_preferences
+#                        (open first, distance, score)
+#
+# Every stage is a plain callable with a `name`, so signals can be added or
+# swapped per call site, and each one is timed separately.
+#
+# With the default stages and a catalog no larger than max_candidates this
+# returns exactly what gyms_for_preferences returns.
+
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from gyms import GYMS
+from matrix_factorization import ALSModel
+from recommender_system import (
+    GYM_VECS,
+    _cosine,
+    _encode_user,
+    _haversine,
+    _match_intensity,
+    _rank_results,
+    _weather_adjust,
+)
+
+
+@dataclass
+class RequestContext:
+    activities: Optional[List[str]]
+    env: Optional[str]
+    intensity: Optional[str]
+    user_lat: Optional[float] = None
+    user_lon: Optional[float] = None
+    user_ratings: Dict[str, float] = field(default_factory=dict)
+    open_status: Optional[Dict[str, bool]] = None
+    outdoor_factor: float = 1.0                    # weather_context.py
+
+    # filled in while the pipeline runs
+    user_vec: List[float] = field(default_factory=list)
+    distances: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def has_location(self) -> bool:
+        return self.user_lat is not None and self.user_lon is not None
+
+    def distance(self, gym: dict) -> Optional[float]:
+        if not self.has_location:
+            return None
+        name = gym["name"]
+        d = self.distances.get(name)
+        if d is None:
+            d = _haversine(self.user_lat, self.user_lon, gym["latitude"], gym["longitude"])
+            self.distances[name] = d
+        return d
+
+
+@dataclass
+class PipelineResult:
+    names: List[str]
+    n_filtered: int
+    n_candidates: int
+    timings: Dict[str, float]          # stage name → seconds
+
+
+# -----------------------------
+# Stage 1: filters + candidate generators
+# -----------------------------
+
+class AttributeFilter:
+    """Hard preference filters, answered from type / env indexes."""
+    name = "filter:attributes"
+
+    def __init__(self, gyms: Iterable[dict] = GYMS):
+        self.gyms = list(gyms)
+        self.by_type: Dict[str, List[int]] = {}
+        self.by_env: Dict[str, set] = {}
+        for i, g in enumerate(self.gyms):
+            self.by_type.setdefault(g.get("type"), []).append(i)
+            self.by_env.setdefault(g.get("env"), set()).add(i)
+
+    def __call__(self, ctx: RequestContext) -> List[dict]:
+        if ctx.activities:
+            rows = sorted(i for a in set(ctx.activities) for i in self.by_type.get(a, ()))
+        else:
+            rows = range(len(self.gyms))
+        if ctx.env:
+            allowed = self.by_env.get(ctx.env, set())
+            rows = [i for i in rows if i in allowed]
+        return [
+            self.gyms[i] for i in rows
+            if _match_intensity(self.gyms[i], ctx.intensity)
+        ]
+
+
+class GeoProximity:
+    """The `limit` venues nearest to the user (none without a location)."""
+    name = "candidates:geo"
+
+    def __init__(self, limit: int = 200):
+        self.limit = limit
+
+    def __call__(self, ctx: RequestContext, pool: List[dict]) -> List[dict]:
+        if not ctx.has_location:
+            return []
+        return sorted(pool, key=ctx.distance)[: self.limit]
+
+
+class Popularity:
+    """The `limit` venues with the best aggregate rating score."""
+    name = "candidates:popular"
+
+    def __init__(self, scores: Optional[Dict[str, float]] = None, limit: int = 100):
+        self.scores = scores or {}
+        self.limit = limit
+
+    def __call__(self, ctx: RequestContext, pool: List[dict]) -> List[dict]:
+        return sorted(pool, key=lambda g: -self.scores.get(g["name"], 0.0))[: self.limit]
+
+
+def popularity_scores(docs: Iterable[dict], prior_count: float = 5.0) -> Dict[str, float]:
+    """
+    Bayesian-average rating per gym from rating documents
+    ({gym_name, rating}), shrunk towards the global mean.
+    """
+    sums: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for d in docs:
+        name, r = d.get("gym_name"), d.get("rating")
+        if name and isinstance(r, (int, float)):
+            sums[name] = sums.get(name, 0.0) + r
+            counts[name] = counts.get(name, 0) + 1
+    if not counts:
+        return {}
+    mean = sum(sums.values()) / sum(counts.values())
+    return {
+        n: (sums[n] + prior_count * mean) / (counts[n] + prior_count)
+        for n in counts
+    }
+
+
+# -----------------------------
+# Stage 2: scorers
+# -----------------------------
+
+class PreferenceSimilarity:
+    """Cosine between the user's preference vector and each gym."""
+    name = "score:preferences"
+    weight = 1.0
+
+    def __call__(self, ctx: RequestContext, candidates: List[dict]) -> Dict[str, float]:
+        return {g["name"]: _cosine(ctx.user_vec, GYM_VECS[g["name"]]) for g in candidates}
+
+
+class RatingBoost:
+    """Similarity to the gyms the user rated ≥ 4, weighted by (rating - 3)."""
+    name = "score:rating_boost"
+
+    def __init__(self, weight: float = 0.1):
+        self.weight = weight
+
+    def __call__(self, ctx: RequestContext, candidates: List[dict]) -> Dict[str, float]:
+        liked = [
+            (GYM_VECS[n], r - 3.0)
+            for n, r in ctx.user_ratings.items()
+            if r >= 4.0 and n in GYM_VECS
+        ]
+        if not liked:
+            return {}
+        return {
+            g["name"]: sum(c * _cosine(GYM_VECS[g["name"]], v) for v, c in liked)
+            for g in candidates
+        }
+
+
+class MFScore:
+    """ALS predicted deviation from the mean rating (matrix_factorization)."""
+    name = "score:mf"
+
+    def __init__(self, model: ALSModel, weight: float = 0.1):
+        self.model = model
+        self.weight = weight
+
+    def __call__(self, ctx: RequestContext, candidates: List[dict]) -> Dict[str, float]:
+        if not ctx.user_ratings:
+            return {}
+        user_vec = self.model.fold_in(ctx.user_ratings)
+        rows = [
+            (g["name"], self.model.item_index[g["name"]])
+            for g in candidates if g["name"] in self.model.item_index
+        ]
+        if not rows:
+            return {}
+        scores = self.model.item_factors[[i for _, i in rows]] @ user_vec
+        return dict(zip((n for n, _ in rows), scores.tolist()))
+
+
+class PopularityScore:
+    """Aggregate rating (popularity_scores) mapped from 1..5 to -1..+1."""
+    name = "score:popularity"
+
+    def __init__(self, scores: Dict[str, float], weight: float = 0.1):
+        self.scores = scores
+        self.weight = weight
+
+    def __call__(self, ctx: RequestContext, candidates: List[dict]) -> Dict[str, float]:
+        return {
+            g["name"]: (self.scores[g["name"]] - 3.0) / 2.0
+            for g in candidates if g["name"] in self.scores
+        }
+
+
+class ContentSimilarity:
+    """
+    Content similarity to the user's liked gyms, from any neighbor lookup
+    `similar(name, k) -> [(name, sim)]`, e.g. IncrementalContentModel.similar.
+    """
+    name = "score:content"
+
+    def __init__(self, similar: Callable[[str, int], List[Tuple[str, float]]],
+                 weight: float = 0.1, k: int = 50):
+        self.similar = similar
+        self.weight = weight
+        self.k = k
+
+    def __call__(self, ctx: RequestContext, candidates: List[dict]) -> Dict[str, float]:
+        wanted = {g["name"] for g in candidates}
+        out: Dict[str, float] = {}
+        for liked, r in ctx.user_ratings.items():
+            if r < 4.0:
+                continue
+            try:
+                neighbors = self.similar(liked, self.k)
+            except KeyError:
+                continue
+            for name, sim in neighbors:
+                if name in wanted:
+                    out[name] = out.get(name, 0.0) + (r - 3.0) * sim
+        return out
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+
+class RecommendationPipeline:
+    def __init__(
+        self,
+        filters: Optional[Callable] = None,
+        generators: Optional[List[Callable]] = None,
+        scorers: Optional[List[Callable]] = None,
+        max_candidates: int = 300,
+    ):
+        self.filters = filters or AttributeFilter()
+        self.generators = generators if generators is not None else [GeoProximity(), Popularity()]
+        self.scorers = scorers if scorers is not None else [PreferenceSimilarity(), RatingBoost()]
+        self.max_candidates = max_candidates
+
+    def run(self, ctx: RequestContext, top_k: int = 15) -> PipelineResult:
+        timings: Dict[str, float] = {}
+
+        def timed(name, fn, *args):
+            t0 = time.perf_counter()
+            out = fn(*args)
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - t0
+            return out
+
+        ctx.user_vec = _encode_user(ctx.activities, ctx.env, ctx.intensity)
+
+        # stage 1
+        pool = timed(self.filters.name, self.filters, ctx)
+        candidates = pool
+        if len(pool) > self.max_candidates and self.generators:
+            picked: Dict[str, dict] = {}
+            for gen in self.generators:
+                for g in timed(gen.name, gen, ctx, pool):
+                    picked.setdefault(g["name"], g)
+            candidates = list(picked.values())[: self.max_candidates]
+
+        # stage 2
+        total = {g["name"]: 0.0 for g in candidates}
+        for scorer in self.scorers:
+            scores = timed(scorer.name, scorer, ctx, candidates)
+            w = scorer.weight
+            for name, s in scores.items():
+                if name in total:
+                    total[name] += w * s
+
+        def rank():
+            rows = []
+            for g in candidates:
+                name = g["name"]
+                is_open = True
+                if ctx.open_status is not None:
+                    is_open = bool(ctx.open_status.get(name, False))
+                score, is_open = _weather_adjust(g, total[name], is_open, ctx.outdoor_factor)
+                rows.append((name, score, ctx.distance(g), is_open))
+            return _rank_results(rows, ctx.has_location, top_k)
+
+        names = timed("rank", rank)
+        return PipelineResult(names, len(pool), len(candidates), timings)
+
+
+def default_pipeline(
+    mf_model: Optional[ALSModel] = None,
+    popularity: Optional[Dict[str, float]] = None,
+    mf_alpha: float = 0.1,
+    filters: Optional[Callable] = None,
+    similar: Optional[Callable[[str, int], List[Tuple[str, float]]]] = None,
+) -> RecommendationPipeline:
+    """
+    The gyms_for_preferences signals, as a two-stage pipeline; `similar`
+    (e.g. IncrementalContentModel.similar) adds ContentSimilarity.
+    """
+    scorers: List[Callable] = [PreferenceSimilarity(), RatingBoost()]
+    if mf_model is not None:
+        scorers.append(MFScore(mf_model, weight=mf_alpha))
+    if similar is not None:
+        scorers.append(ContentSimilarity(similar))
+    return RecommendationPipeline(
+        filters=filters,
+        generators=[GeoProximity(), Popularity(popularity)],
+        scorers=scorers,
+    )
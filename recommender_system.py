@@ -4,6 +4,7 @@ from math import radians, sin, cos, asin, sqrt
 from typing import List, Optional, Dict, Tuple
 from gyms import GYMS
 from mongodb import ratings_collection
+from matrix_factorization import ALSModel
 
 # -----------------------------
 # Feature vocabularies
@@ -31,6 +32,15 @@ VECTOR_DIM = len(ALL_TYPES) + len(ALL_ENVS) + len(ALL_LEVELS)
 # Encoding helpers
 # -----------------------------
 
+def venue_text(gym: dict) -> str:
+    """
+    Free-text features of a gym for the TF-IDF / content models:
+    type, env, levels ("level:2") and address / neighbourhood tokens.
+    """
+    levels = " ".join(f"level:{lvl}" for lvl in gym.get("level", []))
+    return f"{gym.get('type', '')} {gym.get('env', '')} {levels} {gym.get('address', '')}"
+
+
 def _encode_gym(gym: dict) -> List[float]:
     """One-hot encode gym (type, env, level) into a vector."""
     vec = [0.0] * VECTOR_DIM
@@ -115,6 +125,29 @@ def _haversine(lat1, lon1, lat2, lon2) -> float:
 GYM_VECS: Dict[str, List[float]] = {
     g["name"]: _encode_gym(g) for g in GYMS
 }
+GYMS_BY_NAME: Dict[str, dict] = {g["name"]: g for g in GYMS}
+
+
+# -----------------------------
+# Catalog edits (in memory; gyms.py is the seed)
+# -----------------------------
+
+def upsert_gym(gym: dict) -> bool:
+    """Add or replace a venue by name in GYMS and its lookups; True if new."""
+    name = gym["name"]
+    old = GYMS_BY_NAME.get(name)
+    if old is None:
+        GYMS.append(gym)
+    else:
+        GYMS[GYMS.index(old)] = gym
+    GYMS_BY_NAME[name] = gym
+    GYM_VECS[name] = _encode_gym(gym)
+    return old is None
+
+
+def remove_gym(name: str) -> None:
+    GYMS.remove(GYMS_BY_NAME.pop(name))
+    GYM_VECS.pop(name, None)
 
 
 def _load_user_ratings(user_id: Optional[str]) -> Dict[str, float]:
@@ -135,6 +168,23 @@ def _load_user_ratings(user_id: Optional[str]) -> Dict[str, float]:
     return out
 
 
+# below this outdoor suitability (weather_context.py), outdoor venues rank
+# with the closed ones
+OUTDOOR_MIN_SUITABILITY = 0.5
+
+
+def _weather_adjust(
+    gym: dict, score: float, is_open: bool, outdoor_factor: float
+) -> Tuple[float, bool]:
+    """Down-rank env == "Outdoor" venues in bad weather."""
+    if outdoor_factor >= 1.0 or gym.get("env") != "Outdoor":
+        return score, is_open
+    # a penalty, not a scale: scores can be negative (ALS term), and scaling
+    # those toward 0 would rank the venue higher
+    penalty = (1.0 - outdoor_factor) * abs(score)
+    return score - penalty, is_open and outdoor_factor >= OUTDOOR_MIN_SUITABILITY
+
+
 def _match_intensity(gym: dict, intensity: Optional[str]) -> bool:
     """Filter: does this gym roughly match the user's intensity?"""
     if not intensity:
@@ -173,25 +223,41 @@ def gyms_for_preferences(
     user_id: Optional[str] = None,
     top_k: int = 15,
     open_status: Optional[Dict[str, bool]] = None,   # ✅ NEW
+    mf_model: Optional[ALSModel] = None,
+    mf_alpha: float = 0.1,
+    user_ratings: Optional[Dict[str, float]] = None,
+    outdoor_factor: float = 1.0,
 ) -> List[str]:
     """
     Content-based recommendations:
     - filter by user's activities, env, intensity
     - adjust similarity by user's past ratings
+    - optionally add the ALS predicted rating (mf_model) as a scoring term
+    - user_ratings can be passed in directly (offline evaluation); otherwise
+      they are loaded from Mongo for user_id
     - optionally use open_status to prefer *open* places first
+    - outdoor_factor (0..1, weather_context.py) down-ranks outdoor venues
     - then distance, then similarity
     """
     user_vec = _encode_user(activities, env, intensity)
-    user_ratings = _load_user_ratings(user_id)
+    if user_ratings is None:
+        user_ratings = _load_user_ratings(user_id)
 
     # only consider positively rated gyms for personalization
     liked_gyms: List[Tuple[str, float]] = [
         (name, r) for name, r in user_ratings.items() if r >= 4.0
     ]
 
+    # ALS: fold the user in from their ratings, one dot product per gym
+    mf_scores: Dict[str, float] = {}
+    if mf_model is not None:
+        mf_scores = mf_model.scores_for_ratings(user_ratings)
+
     # results will store (name, similarity_score, distance_km, is_open)
     results: List[Tuple[str, float, Optional[float], bool]] = []
 
+    # large catalogs: candidates by location come from the two-stage
+    # pipeline on region shards (recommendation_pipeline.py, regions.py)
     for gym in GYMS:
         # 1) HARD FILTERS based on preferences
         if activities:
@@ -224,6 +290,9 @@ def gyms_for_preferences(
         alpha = 0.1
         similarity_score = base_sim + alpha * rating_boost
 
+        # 3b) matrix-factorization term (predicted deviation from mean rating)
+        similarity_score += mf_alpha * mf_scores.get(name, 0.0)
+
         # 4) distance in km (if we know user location)
         dist_km: Optional[float] = None
         if user_lat is not None and user_lon is not None:
@@ -238,11 +307,25 @@ def gyms_for_preferences(
             # default False if missing from dict
             is_open = bool(open_status.get(name, False))
 
+        # 5b) weather: outdoor venues lose score, and count as closed in bad weather
+        similarity_score, is_open = _weather_adjust(gym, similarity_score, is_open, outdoor_factor)
+
         results.append((name, similarity_score, dist_km, is_open))
 
+    return _rank_results(
+        results, user_lat is not None and user_lon is not None, top_k
+    )
+
+
+def _rank_results(
+    results: List[Tuple[str, float, Optional[float], bool]],
+    has_location: bool,
+    top_k: int,
+) -> List[str]:
+    """(name, similarity, distance_km, is_open) rows → final ordered names."""
     # 6) sort with "open first" behaviour
     BIG = 1e9
-    if user_lat is not None and user_lon is not None:
+    if has_location:
         # sort key: (open first, distance asc, similarity desc)
         results.sort(
             key=lambda x: (
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+# user–item matrix
+def build_ui(ratings, user_col="userId", item_col="itemId", rating_col="rating"):
+    R = ratings.pivot_table(index=user_col, columns=item_col, values=rating_col, aggfunc="mean")
+    return R  # rows:users, cols:items
+
+# Adjusted cosine: every rating is centered on its user's mean before comparing items,
+# so a harsh rater and a generous rater agree when they rank two venues the same way.
+def center_by_user(R):
+    X = R.to_numpy(dtype=float)
+    obs = ~np.isnan(X) #if observed
+    mu = np.where(obs.any(axis=1), np.nansum(X, axis=1) / np.maximum(obs.sum(axis=1), 1), 0.0)
+    C = np.where(obs, X - mu[:, None], 0.0)
+    return C, obs
+
+#item-item similarity (offline), truncated to the top-k neighbors per item
+def item_neighbors(R, k=20, shrink=10.0):
+    items = R.columns.to_list() #item IDs
+    C, obs = center_by_user(R)
+    num = C.T @ C
+    norms = np.sqrt((C * C).sum(axis=0))
+    den = np.outer(norms, norms)
+    S = np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+    co = obs.T.astype(float) @ obs.astype(float) #co-rating counts
+    S *= co / (co + shrink)  # simple shrinkage
+    np.fill_diagonal(S, 0.0)
+
+    nbrs = {}
+    take = min(k, len(items) - 1)
+    for j, it in enumerate(items):
+        row = S[j]
+        if take <= 0:
+            nbrs[it] = {}
+            continue
+        top = np.argpartition(-row, take - 1)[:take]
+        top = top[np.argsort(-row[top])]
+        nbrs[it] = {items[t]: float(row[t]) for t in top if row[t] > 0}
+    return nbrs
+
+# rated item -> {item it is a neighbor of: sim}, so recommending only walks the user's own ratings
+def invert_neighbors(nbrs):
+    inv = {}
+    for it, row in nbrs.items():
+        for nb, s in row.items():
+            inv.setdefault(nb, {})[it] = s
+    return inv
+
+def user_ratings_from_ui(R, user):
+    if user not in R.index: return {}
+    return R.loc[user].dropna().to_dict()
+
+#predict rating: weighted sum over the neighbors of `item` the user has rated
+def predict_item_based(nbrs, user_ratings, item):
+    row = nbrs.get(item)
+    if not row or not user_ratings: return None
+    mu_u = sum(user_ratings.values()) / len(user_ratings)
+    num = den = 0.0
+    # walk whichever side is shorter: the neighbor list or the user's ratings
+    if len(user_ratings) < len(row):
+        pairs = ((row.get(j), r) for j, r in user_ratings.items())
+    else:
+        pairs = ((s, user_ratings.get(j)) for j, s in row.items())
+    for s, r in pairs:
+        if s is None or r is None: continue
+        num += s * (r - mu_u)
+        den += abs(s)
+    if den == 0: return None
+    return float(mu_u + num / den)
+
+
+#recommendation: cost is O(#user ratings × k), independent of the number of users
+def recommend_item_based(inv, user_ratings, top_n=5):
+    if not user_ratings:
+        return pd.DataFrame(columns=["itemId", "pred"])
+    mu_u = sum(user_ratings.values()) / len(user_ratings)
+    num, den = {}, {}
+    for j, r in user_ratings.items():
+        for it, s in inv.get(j, {}).items():
+            if it in user_ratings: continue
+            num[it] = num.get(it, 0.0) + s * (r - mu_u)
+            den[it] = den.get(it, 0.0) + abs(s)
+    preds = [(it, mu_u + num[it] / den[it]) for it in num if den[it] > 0]
+    recs = pd.DataFrame(preds, columns=["itemId", "pred"]).sort_values("pred", ascending=False)
+    return recs.head(top_n).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    ratings = pd.DataFrame({
+        "userId": [1,1,1,        2,2,2,     3,3,3,3,     4,4,4,     5,5,5],
+        "itemId": [10,11,12,     10,13,14,  11,12,13,15, 10,12,14,  11,15,16],
+        "rating": [4, 5, 3,      5, 2, 4,   4, 3, 2, 4,  4, 2, 5,   2, 5, 4]
+    })
+    R = build_ui(ratings)
+    nbrs = item_neighbors(R, k=20, shrink=10.0)
+    inv = invert_neighbors(nbrs)
+    recs = recommend_item_based(inv, user_ratings_from_ui(R, 1), top_n=5)
+    print("User 1 recommendations:")
+    print(recs)
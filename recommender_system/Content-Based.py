@@ -1,31 +1,136 @@
+import os
+import sys
 import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-def build_content_model(items_df, text_col="features_text"):
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ann_index import LSHIndex
+import content_cache
+
+# top-k neighbors for rows [start, end): one dense block of block_size × N similarities at a time
+def topk_block(tfidf, start, end, k):
+    sims = (tfidf[start:end] @ tfidf.T).toarray()  # rows are L2-normalized → cosine
+    rows = np.arange(end - start)
+    sims[rows, rows + start] = -np.inf  # exclude the item itself
+    top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    top_sims = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_sims, axis=1)
+    return (np.take_along_axis(top, order, axis=1).astype(np.int32),
+            np.take_along_axis(top_sims, order, axis=1).astype(np.float32))
+
+def topk_neighbors(tfidf, top_k=50, block_size=1024, n_jobs=1):
+    n = tfidf.shape[0]
+    k = min(top_k, n - 1)
+    if k <= 0:
+        return np.zeros((n, 0), dtype=np.int32), np.zeros((n, 0), dtype=np.float32)
+    tasks = [(s, min(s + block_size, n), k) for s in range(0, n, block_size)]
+    if n_jobs > 1 and len(tasks) > 1:
+        # sparse matmul / argpartition run outside the GIL, so threads share tfidf without copies
+        with ThreadPoolExecutor(n_jobs) as pool:
+            parts = list(pool.map(lambda t: topk_block(tfidf, *t), tasks))
+    else:
+        parts = [topk_block(tfidf, *t) for t in tasks]
+    return np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts])
+
+# approximate table: one LSH query per item instead of a pass over all N items (rows padded with -1)
+def topk_neighbors_ann(index, tfidf, top_k=50):
+    n = tfidf.shape[0]
+    k = max(min(top_k, n - 1), 0)
+    nbr_idx = np.full((n, k), -1, dtype=np.int32)
+    nbr_sim = np.zeros((n, k), dtype=np.float32)
+    for i in range(n):
+        hits = index.query(tfidf[i], k=k, exclude=i)
+        nbr_idx[i, :len(hits)] = [j for j, _ in hits]
+        nbr_sim[i, :len(hits)] = [s for _, s in hits]
+    return nbr_idx, nbr_sim
+
+# title → row and id → row hash indexes (first occurrence wins, like the old column scan)
+def build_lookup(df, col):
+    if col not in df.columns: return {}
+    lookup = {}
+    for i, v in enumerate(df[col].tolist()):
+        lookup.setdefault(v, i)
+    return lookup
+
+def build_content_model(items_df, text_col="features_text", top_k=50, block_size=1024, n_jobs=1,
+                        ann_params=None, title_col="title", id_col="item_id"):
     #Tokenizing
     vec = TfidfVectorizer(stop_words="english", token_pattern=r"(?u)\b[\w:-]+\b")
     tfidf = vec.fit_transform(items_df[text_col].fillna(""))
-    #Similarity Calculation
-    cos = cosine_similarity(tfidf, dense_output=False)
-    return {"vec": vec, "tfidf": tfidf, "cos": cos, "df": items_df.reset_index(drop=True)}
+    df = items_df.reset_index(drop=True)
+    model = {"vec": vec, "tfidf": tfidf, "df": df, "title_col": title_col,
+             "title_index": build_lookup(df, title_col), "id_index": build_lookup(df, id_col)}
+    #Similarity Calculation: only the top-k neighbors per item are kept (N × k, not N × N)
+    if ann_params is not None:
+        # large catalogs: LSH index (e.g. {"n_tables": 16, "n_bits": 16, "probe": 1}), kept for new queries
+        index = LSHIndex(tfidf.shape[1], **ann_params)
+        index.add(range(tfidf.shape[0]), tfidf)
+        model["ann"] = index
+        model["nbr_idx"], model["nbr_sim"] = topk_neighbors_ann(index, tfidf, top_k=top_k)
+    else:
+        model["nbr_idx"], model["nbr_sim"] = topk_neighbors(tfidf, top_k=top_k, block_size=block_size, n_jobs=n_jobs)
+    return model
+
+# same as build_content_model, but loaded from the on-disk cache when the catalog is unchanged
+def build_content_model_cached(items_df, cache_dir=content_cache.CACHE_DIR, title_col="title", id_col="item_id", **kwargs):
+    params = dict(kwargs, model="content-based", title_col=title_col, id_col=id_col)
+    def finalize(model):
+        model["title_col"] = title_col
+        model["title_index"] = build_lookup(model["df"], title_col)
+        model["id_index"] = build_lookup(model["df"], id_col)
+        return model
+    return content_cache.load_or_build(
+        items_df, lambda df: build_content_model(df, title_col=title_col, id_col=id_col, **kwargs),
+        params=params, cache_dir=cache_dir, finalize=finalize)
 
-def recommend_similar_items(model, query_title, top_n=5, title_col="title"):
+def lookup_rows(model, query_titles=None, query_ids=None):
+    index, keys = (model["id_index"], query_ids) if query_ids is not None else (model["title_index"], query_titles)
+    rows = [index.get(k) for k in keys]
+    missing = [k for k, r in zip(keys, rows) if r is None]
+    if missing:
+        raise ValueError(f"Title not found: {missing[0]}" if query_ids is None else f"Item id not found: {missing[0]}")
+    return np.asarray(rows, dtype=np.int64)
+
+# titles are looked up in the index built at fit time, so only that column can be used
+def resolve_title_col(model, title_col=None):
+    built = model.get("title_col", "title")
+    if title_col is not None and title_col != built:
+        raise ValueError(f"model was built with title_col={built!r}, not {title_col!r}")
+    return built
+
+def recommend_similar_items(model, query_title, top_n=5, title_col=None):
+    title_col = resolve_title_col(model, title_col)
     df = model["df"]
-    idx = df.index[df[title_col] == query_title]
-    if len(idx) == 0:
-        raise ValueError(f"Title not found: {query_title}")
-    i = idx[0]
-    sims = model["cos"][i].toarray().ravel()
-    sims[i] = -np.inf  # exclude the query item
-    n = min(top_n, len(sims) - 1)
-    top = np.argpartition(-sims, range(n))[:n]
-    top = top[np.argsort(-sims[top])]
-    out = df.loc[top, [title_col]].copy()
-    out["score"] = sims[top]
+    i = lookup_rows(model, [query_title])[0]
+    # neighbor table rows are already sorted by similarity
+    n = min(top_n, model["nbr_idx"].shape[1])
+    top = model["nbr_idx"][i, :n]
+    found = top >= 0  # ANN tables may have fewer than k neighbors
+    out = df.loc[top[found], [title_col]].copy()
+    out["score"] = model["nbr_sim"][i, :n][found]
     return out.reset_index(drop=True)
 
+# many query items (by title or id) in one vectorized gather over the neighbor table
+def recommend_similar_items_batch(model, query_titles=None, top_n=5, title_col=None, query_ids=None):
+    title_col = resolve_title_col(model, title_col)
+    df = model["df"]
+    rows = lookup_rows(model, query_titles, query_ids)
+    n = min(top_n, model["nbr_idx"].shape[1])
+    top = model["nbr_idx"][rows, :n].ravel()
+    sims = model["nbr_sim"][rows, :n].ravel()
+    q = np.repeat(np.arange(len(rows)), n)
+    found = top >= 0
+    keys = query_ids if query_ids is not None else query_titles
+    out = pd.DataFrame({
+        "query": np.asarray(keys, dtype=object)[q[found]],
+        "rank": np.tile(np.arange(1, n + 1), len(rows))[found],
+        title_col: df[title_col].to_numpy()[top[found]],
+        "score": sims[found],
+    })
+    return out
+
 
 if __name__ == "__main__":
     items_df = pd.DataFrame({
@@ -40,3 +145,10 @@ if __name__ == "__main__":
     })
     model = build_content_model(items_df)
     print(recommend_similar_items(model, "Inception", top_n=3))
+    ann_model = build_content_model(items_df, ann_params={"n_tables": 16, "n_bits": 4, "probe": 1})
+    print(recommend_similar_items(ann_model, "Inception", top_n=3))
+    print(recommend_similar_items_batch(model, ["Inception", "Arrival"], top_n=2))
+
+    # real venue catalog, fitted once per catalog version
+    venues = build_content_model_cached(content_cache.catalog_items_df(), top_k=20)
+    print(recommend_similar_items(venues, "Thai Long", top_n=3))
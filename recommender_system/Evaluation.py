@@ -0,0 +1,372 @@
+# Offline evaluation + timing harness for every recommender engine.
+#
+#   python recommender_system/Evaluation.py --users 300 --seed 7
+#   python recommender_system/Evaluation.py --ratings ratings_export.json
+#
+# Ratings are either generated from the real catalog (gyms.GYMS) or loaded
+# from a mongoexport of the ratings collection, split by time (the newest
+# ratings are the test set), and every engine is scored on quality (RMSE,
+# precision@k, recall@k) and cost (build time, peak memory, query latency).
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from gyms import GYMS
+from recommender_system import gyms_for_preferences, _haversine
+from content_cache import catalog_items_df
+from matrix_factorization import train_als
+from recommendation_pipeline import RequestContext, default_pipeline, popularity_scores
+from ratings_matrix import ratings_to_csr
+
+
+def _load_sibling(filename, name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(HERE, filename))
+    mod = importlib.util.module_from_spec(spec)
+    # registered so pickle can find module-level functions (Hybrid's process-pool workers)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+user_cf = _load_sibling("Collaborative-based(user).py", "user_cf")
+item_cf = _load_sibling("Collaborative-based(item).py", "item_cf")
+content_based = _load_sibling("Content-Based.py", "content_based")
+hybrid = _load_sibling("Hybrid.py", "hybrid")
+
+NAMES = [g["name"] for g in GYMS]
+ALL_TYPES = sorted({g["type"] for g in GYMS})
+CITIES = {"montreal": (45.51, -73.60), "toronto": (43.66, -79.38)}
+
+
+# -----------------------------
+# Data
+# -----------------------------
+
+def gym_items_df():
+    """Catalog as an items frame for the TF-IDF engines (title = gym name)."""
+    return catalog_items_df(GYMS)
+
+
+def synthetic_dataset(n_users=300, mean_ratings=8, seed=0):
+    """
+    Users with preferences + a home location, rating venues they are likely
+    to visit (matching activity, nearby) with a little personal noise.
+    Returns (users, ratings) where ratings has userId/itemId/rating/ts.
+    """
+    rng = np.random.default_rng(seed)
+    quality = rng.normal(0, 0.5, size=len(GYMS))
+    users, rows = {}, []
+    for u in range(n_users):
+        uid = f"user{u}"
+        city = "montreal" if rng.random() < 0.8 else "toronto"
+        lat0, lon0 = CITIES[city]
+        prefs = {
+            "activities": list(rng.choice(ALL_TYPES, size=rng.integers(1, 3), replace=False)),
+            "env": "Indoor" if rng.random() < 0.75 else "Outdoor",
+            "intensity": rng.choice(["Low", "Medium", "High"]),
+            "lat": lat0 + rng.normal(0, 0.03),
+            "lon": lon0 + rng.normal(0, 0.04),
+        }
+        users[uid] = prefs
+        bias = rng.normal(0, 0.4)
+
+        affinity = np.array([
+            1.5 * (g["type"] in prefs["activities"])
+            + 0.5 * (g["env"] == prefs["env"])
+            - 0.05 * _haversine(prefs["lat"], prefs["lon"], g["latitude"], g["longitude"])
+            + quality[i]
+            for i, g in enumerate(GYMS)
+        ])
+        p = np.exp(affinity - affinity.max())
+        p /= p.sum()
+        n = min(len(GYMS), max(2, rng.poisson(mean_ratings)))
+        for i in rng.choice(len(GYMS), size=n, replace=False, p=p):
+            r = np.clip(np.rint(3 + 0.8 * affinity[i] + bias + rng.normal(0, 0.5)), 1, 5)
+            rows.append((uid, NAMES[i], float(r), float(rng.uniform(0, 180 * 86400))))
+    ratings = pd.DataFrame(rows, columns=["userId", "itemId", "rating", "ts"])
+    return users, ratings
+
+
+def _ts(value, fallback):
+    if isinstance(value, dict):
+        value = value.get("$date")
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            return fallback
+    if isinstance(value, (int, float)):
+        return float(value) / 1000.0  # mongoexport epoch millis
+    return fallback
+
+
+def load_dataset(path):
+    """Ratings from a mongoexport (JSON array or lines); users have no prefs."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    docs = json.loads(text) if text.startswith("[") else [json.loads(l) for l in text.splitlines() if l.strip()]
+    rows = [
+        (str(d["user_id"]), d["gym_name"], float(d["rating"]), _ts(d.get("updated_at"), float(n)))
+        for n, d in enumerate(docs)
+        if d.get("user_id") and d.get("gym_name") and isinstance(d.get("rating"), (int, float))
+    ]
+    ratings = pd.DataFrame(rows, columns=["userId", "itemId", "rating", "ts"])
+    return {}, ratings
+
+
+def time_split(ratings, train_frac=0.8):
+    cutoff = ratings["ts"].quantile(train_frac)
+    return ratings[ratings["ts"] <= cutoff], ratings[ratings["ts"] > cutoff]
+
+
+# -----------------------------
+# Engines: build(train) once, then rank(user, k, seen) / predict(user, item, seen)
+# -----------------------------
+
+class PreferencesEngine:
+    name = "gyms_for_preferences"
+
+    def __init__(self, users):
+        self.users = users
+
+    def build(self, train):
+        self.train = train
+
+    def rank(self, user, k, seen):
+        p = self.users.get(user, {})
+        names = gyms_for_preferences(
+            activities=p.get("activities"), env=p.get("env"), intensity=p.get("intensity"),
+            user_lat=p.get("lat"), user_lon=p.get("lon"),
+            user_ratings=seen, top_k=len(GYMS),
+        )
+        return [n for n in names if n not in seen][:k]
+
+
+class TwoStageEngine:
+    """recommendation_pipeline.py: preference signals + ALS term, popularity candidates."""
+    name = "two_stage"
+
+    def __init__(self, users, rank=16, seed=0):
+        self.users = users
+        self.als = ALSEngine(rank=rank, seed=seed)
+
+    def build(self, train):
+        self.als.build(train)
+        popularity = popularity_scores(
+            {"gym_name": i, "rating": r} for i, r in zip(train["itemId"], train["rating"])
+        )
+        self.pipeline = default_pipeline(mf_model=self.als.model, popularity=popularity)
+
+    def rank(self, user, k, seen):
+        p = self.users.get(user, {})
+        ctx = RequestContext(
+            activities=p.get("activities"), env=p.get("env"), intensity=p.get("intensity"),
+            user_lat=p.get("lat"), user_lon=p.get("lon"), user_ratings=seen,
+        )
+        names = self.pipeline.run(ctx, top_k=len(GYMS)).names
+        return [n for n in names if n not in seen][:k]
+
+
+class UserCFEngine:
+    name = "user_cf"
+
+    def build(self, train):
+        self.R = user_cf.build_ui(train)
+        self.S = user_cf.user_sim_matrix(self.R, shrink=10.0)
+
+    def rank(self, user, k, seen):
+        return user_cf.recommend_user_based(self.R, self.S, user, top_n=k)["itemId"].tolist()
+
+    def predict(self, user, item, seen):
+        return user_cf.predict_user_based(self.R, self.S, user, item)
+
+
+class ItemCFEngine:
+    name = "item_cf"
+
+    def build(self, train):
+        R = item_cf.build_ui(train)
+        self.nbrs = item_cf.item_neighbors(R, k=20, shrink=10.0)
+        self.inv = item_cf.invert_neighbors(self.nbrs)
+
+    def rank(self, user, k, seen):
+        return item_cf.recommend_item_based(self.inv, seen, top_n=k)["itemId"].tolist()
+
+    def predict(self, user, item, seen):
+        return item_cf.predict_item_based(self.nbrs, seen, item)
+
+
+class ALSEngine:
+    name = "als"
+
+    def __init__(self, rank=16, reg=0.1, iterations=15, seed=0):
+        self.params = dict(rank=rank, reg=reg, iterations=iterations, seed=seed)
+
+    def build(self, train):
+        R, users, items = ratings_to_csr(zip(train["userId"], train["itemId"], train["rating"]))
+        self.model = train_als(R, users, items, **self.params)
+
+    def rank(self, user, k, seen):
+        scores = self.model.scores_for_ratings(seen)
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [n for n in ranked if n not in seen][:k]
+
+    def predict(self, user, item, seen):
+        return self.model.predict(user, item)
+
+
+def _anchor(seen):
+    """The user's favourite venue so far – the query item for content engines."""
+    return max(seen, key=seen.get) if seen else None
+
+
+class ContentEngine:
+    name = "content_tfidf"
+
+    def build(self, train):
+        self.model = content_based.build_content_model(gym_items_df())
+
+    def rank(self, user, k, seen):
+        anchor = _anchor(seen)
+        if anchor is None:
+            return []
+        recs = content_based.recommend_similar_items(self.model, anchor, top_n=k + len(seen))
+        return [n for n in recs["title"] if n not in seen][:k]
+
+
+class HybridEngine:
+    name = "hybrid"
+
+    def __init__(self, alpha=0.5):
+        self.alpha = alpha
+
+    def build(self, train):
+        self.content = hybrid.build_content(gym_items_df())
+        self.R = hybrid.build_ui(train)
+        self.S = hybrid.user_sim_matrix(self.R, shrink=10.0)
+        self.cache = hybrid.CollabCache(self.R, self.S, self.content["df"]["item_id"])
+
+    def rank(self, user, k, seen):
+        anchor = _anchor(seen)
+        if anchor is None:
+            return []
+        recs = hybrid.hybrid_recommendations(
+            self.content, self.R, self.S, user, anchor, alpha=self.alpha, top_n=k,
+            collab_cache=self.cache,
+        )
+        return recs["title"].tolist()
+
+
+# -----------------------------
+# Harness
+# -----------------------------
+
+def _percentiles(xs):
+    if not xs:
+        return (float("nan"),) * 3
+    p50, p95, p99 = np.percentile(np.array(xs) * 1000.0, [50, 95, 99])
+    return p50, p95, p99
+
+
+def evaluate_engine(engine, train, test, k=10, relevant_min=4.0):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    engine.build(train)
+    build_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seen_by_user = {u: dict(zip(g["itemId"], g["rating"])) for u, g in train.groupby("userId")}
+    precisions, recalls, latencies = [], [], []
+    for user, g in test.groupby("userId"):
+        seen = seen_by_user.get(user)
+        if not seen:
+            continue  # cold users: nothing in train to personalize from
+        relevant = set(g.loc[g["rating"] >= relevant_min, "itemId"])
+        t0 = time.perf_counter()
+        recs = engine.rank(user, k, seen)
+        latencies.append(time.perf_counter() - t0)
+        if relevant:
+            hits = len(relevant & set(recs))
+            precisions.append(hits / k)
+            recalls.append(hits / len(relevant))
+
+    errs = []
+    if hasattr(engine, "predict"):
+        for user, item, r in zip(test["userId"], test["itemId"], test["rating"]):
+            seen = seen_by_user.get(user)
+            if not seen:
+                continue
+            p = engine.predict(user, item, seen)
+            if p is not None and not np.isnan(p):
+                errs.append((min(max(p, 1.0), 5.0) - r) ** 2)
+
+    p50, p95, p99 = _percentiles(latencies)
+    return {
+        "engine": engine.name,
+        "rmse": float(np.sqrt(np.mean(errs))) if errs else float("nan"),
+        "rmse_coverage": len(errs) / len(test) if hasattr(engine, "predict") and len(test) else float("nan"),
+        f"precision@{k}": float(np.mean(precisions)) if precisions else float("nan"),
+        f"recall@{k}": float(np.mean(recalls)) if recalls else float("nan"),
+        "build_s": build_s,
+        "peak_mb": peak / 2**20,
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+    }
+
+
+def all_engines(users, seed=0):
+    return [
+        PreferencesEngine(users),
+        TwoStageEngine(users, seed=seed),
+        UserCFEngine(),
+        ItemCFEngine(),
+        ALSEngine(seed=seed),
+        ContentEngine(),
+        HybridEngine(),
+    ]
+
+
+def run(users, ratings, k=10, train_frac=0.8, seed=0, only=None):
+    np.random.seed(seed)
+    train, test = time_split(ratings, train_frac)
+    print(f"{ratings['userId'].nunique()} users, {ratings['itemId'].nunique()} venues, "
+          f"{len(train)} train / {len(test)} test ratings")
+    rows = []
+    for engine in all_engines(users, seed=seed):
+        if only and engine.name not in only:
+            continue
+        rows.append(evaluate_engine(engine, train, test, k=k))
+    return pd.DataFrame(rows).set_index("engine")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare recommender engines offline.")
+    parser.add_argument("--ratings", help="mongoexport of the ratings collection (default: synthetic)")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--mean-ratings", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--train-frac", type=float, default=0.8)
+    parser.add_argument("--engines", nargs="*", help="subset of engine names to run")
+    args = parser.parse_args()
+
+    if args.ratings:
+        users, ratings = load_dataset(args.ratings)
+    else:
+        users, ratings = synthetic_dataset(args.users, args.mean_ratings, seed=args.seed)
+
+    report = run(users, ratings, k=args.k, train_frac=args.train_frac, seed=args.seed, only=args.engines)
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.float_format", "{:.4f}".format):
+        print(report)
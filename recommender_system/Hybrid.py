@@ -1,28 +1,73 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 import numpy as np
 import pandas as pd
+from scipy import sparse
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import content_cache
+
 #Content-based filtering
-def build_content(items_df, text_col="features_text"):
+def build_lookup(df, col):
+    if col not in df.columns: return {}
+    lookup = {}
+    for i, v in enumerate(df[col].tolist()):
+        lookup.setdefault(v, i)  # first occurrence wins
+    return lookup
+
+def build_content(items_df, text_col="features_text", title_col="title", id_col="item_id"):
     vec = TfidfVectorizer(stop_words="english")
     tfidf = vec.fit_transform(items_df[text_col].fillna(""))
     cos = cosine_similarity(tfidf, dense_output=False)
-    return {"df": items_df.reset_index(drop=True), "cos": cos}
+    df = items_df.reset_index(drop=True)
+    return {"df": df, "cos": cos, "title_col": title_col,
+            "title_index": build_lookup(df, title_col), "id_index": build_lookup(df, id_col)}
 
-def content_scores_for_query(content, query_title, title_col="title"):
-    df = content["df"]
-    idx = df.index[df[title_col] == query_title]
-    if len(idx) == 0: raise ValueError(f"Title not found: {query_title}")
-    i = idx[0]
-    scores = content["cos"][i].toarray().ravel()
+def build_content_cached(items_df, text_col="features_text", title_col="title", id_col="item_id",
+                         cache_dir=content_cache.CACHE_DIR):
+    params = {"model": "hybrid", "text_col": text_col, "title_col": title_col, "id_col": id_col}
+    def finalize(content):
+        content["title_col"] = title_col
+        content["title_index"] = build_lookup(content["df"], title_col)
+        content["id_index"] = build_lookup(content["df"], id_col)
+        return content
+    return content_cache.load_or_build(
+        items_df, lambda df: build_content(df, text_col, title_col, id_col),
+        params=params, cache_dir=cache_dir, finalize=finalize)
+
+def content_rows(content, query_titles):
+    rows = [content["title_index"].get(t) for t in query_titles]
+    for t, r in zip(query_titles, rows):
+        if r is None: raise ValueError(f"Title not found: {t}")
+    return np.asarray(rows, dtype=np.int64)
+
+def normalized_content_rows(cos, rows):
+    scores = cos[rows].toarray()
+    smin = scores.min(axis=1, keepdims=True); smax = scores.max(axis=1, keepdims=True)
+    span = np.where(smax > smin, smax - smin, 1.0)
+    scores = np.where(smax > smin, (scores - smin) / span, scores)
+    scores[np.arange(len(rows)), rows] = 0.0
+    return scores
 
-    # normalizing scores [0,1]
-    smin, smax = scores.min(), scores.max()
-    if smax > smin: scores = (scores - smin) / (smax - smin)
+# Q query titles → Q × N content scores, each row min-max normalized to [0,1]
+def content_scores_for_queries(content, query_titles):
+    return normalized_content_rows(content["cos"], content_rows(content, query_titles))
 
-    scores[i] = 0.0
-    return pd.Series(scores, index=df.index)
+# queries go through the title index built with the content, so only its column can be used
+def resolve_title_col(content, title_col=None):
+    built = content.get("title_col", "title")
+    if title_col is not None and title_col != built:
+        raise ValueError(f"content was built with title_col={built!r}, not {title_col!r}")
+    return built
+
+def content_scores_for_query(content, query_title, title_col=None):
+    resolve_title_col(content, title_col)
+    scores = content_scores_for_queries(content, [query_title])[0]
+    return pd.Series(scores, index=content["df"].index)
 
 # Collaborative Filtering
 def build_ui(ratings, user_col="userId", item_col="itemId", rating_col="rating"):
@@ -71,16 +116,155 @@ def collab_scores_for_user(R, S, user):
         else: s.loc[valid.index] = 0.5
     return s
 
+# Same scores as collab_scores_for_user, for a block of users at once on plain arrays:
+# X is users × items (NaN = unrated), Sx users × users, rows are positions in X.
+# Weights are kept sparse: per user, only the observed (item, rater) entries, cut to the
+# k most similar positive raters of each item, so a user costs O(nnz log nnz), not O(U·I).
+def observed_ratings(X):
+    # observed (item, rater) pairs of X grouped by item, and the raters' means
+    obs = ~np.isnan(X)
+    n_obs = obs.sum(axis=1)
+    mu = np.where(n_obs > 0, np.nansum(X, axis=1) / np.maximum(n_obs, 1), np.nan)
+    item, rater = np.nonzero(obs.T)
+    return item, rater, mu
+
+def top_raters(item, sims, k=20):
+    # positions of the pairs kept: each item's k most similar raters with sim > 0,
+    # ordered by item, most similar first
+    pos = np.flatnonzero(sims > 0)
+    order = pos[np.lexsort((-sims[pos], item[pos]))]
+    it = item[order]
+    return order[np.arange(len(it)) - np.searchsorted(it, it) < k]
+
+def collab_scores_matrix(X, Sx, rows, k=20):
+    n_items = X.shape[1]
+    item, rater, mu = observed_ratings(X)
+    centered = X[rater, item] - mu[rater]
+    out = np.full((len(rows), n_items), np.nan)
+    for o, u in enumerate(rows):
+        s = Sx[u, rater]
+        top = top_raters(item, s, k)
+        it, w = item[top], s[top]
+        num = np.bincount(it, weights=w * centered[top], minlength=n_items)
+        den = np.bincount(it, weights=w, minlength=n_items)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[o] = np.where(den > 0, mu[u] + num / den, np.nan)
+    # min-max normalize each row over its valid predictions
+    valid = ~np.isnan(out)
+    smin = np.where(valid, out, np.inf).min(axis=1, keepdims=True)
+    smax = np.where(valid, out, -np.inf).max(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore"):
+        scaled = np.where(smax > smin, (out - smin) / (smax - smin), 0.5)
+    return np.where(valid, scaled, np.nan)
+
+# Per-user cache of normalized collab score vectors (float32, aligned to content["df"] rows).
+# Only the content side depends on the anchor title, so repeat queries for a user skip
+# the collab prediction entirely. Each vector records the raters it used (the top-k
+# positive raters per item) and, per item, the k-th similarity it took. After new
+# ratings a vector goes stale when its user or one of its raters changed, or when a
+# changed user now reaches that floor on an item they rated (they would enter the top-k).
+class CollabCache:
+    def __init__(self, R, S, item_ids, k=20):
+        self.item_ids = pd.Index(item_ids)
+        self.k = k
+        self.vectors = {}     # user -> float32 scores
+        self.used = {}        # user -> (raters used, per-item similarity floor over R.columns)
+        self.dependents = {}  # rater -> users whose cached vector used them
+        self._set_matrices(R, S)
+
+    def _set_matrices(self, R, S):
+        self.R, self.S = R, S
+        self._X = R.to_numpy(dtype=float)
+        self._Sx = S.reindex(index=R.index, columns=R.index).fillna(0.0).to_numpy(dtype=float)
+        self._pos = {u: i for i, u in enumerate(R.index)}
+        self._item, self._rater, _ = observed_ratings(self._X)
+        self._cols = self._X.shape[1]
+
+    def get(self, user):
+        vec = self.vectors.get(user)
+        if vec is None:
+            if user in self._pos:
+                scores = collab_scores_matrix(self._X, self._Sx, [self._pos[user]], k=self.k)[0]
+                collab = pd.Series(scores, index=self.R.columns)
+            else:
+                collab = pd.Series(dtype=float)
+            vec = collab.reindex(self.item_ids).fillna(0.0).to_numpy(dtype=np.float32)
+            self.put(user, vec)
+        return vec
+
+    def _record(self, user):
+        # raters and per-item floors of the top-k cut that user's scores came from
+        floor = np.zeros(self._cols)
+        if user not in self._pos:
+            return set(), floor
+        s = self._Sx[self._pos[user], self._rater]
+        top = top_raters(self._item, s, self.k)
+        it = self._item[top]
+        full = np.bincount(it, minlength=self._cols) >= self.k
+        kth = np.full(self._cols, np.inf)
+        np.minimum.at(kth, it, s[top])
+        floor[full] = kth[full]  # items with fewer than k raters take any positive one
+        return set(self.R.index[np.unique(self._rater[top])]), floor
+
+    def put(self, user, vec):
+        self._drop(user)
+        self.vectors[user] = np.asarray(vec, dtype=np.float32)
+        raters, floor = self.used[user] = self._record(user)
+        for r in raters:
+            self.dependents.setdefault(r, set()).add(user)
+
+    def _drop(self, user):
+        self.vectors.pop(user, None)
+        raters, _ = self.used.pop(user, (set(), None))
+        for r in raters:
+            self.dependents.get(r, set()).discard(user)
+
+    def _stale(self, changed_users):
+        stale = set()
+        for w in changed_users:
+            stale.add(w)
+            stale |= self.dependents.get(w, set())
+        for w in changed_users:
+            wi = self._pos.get(w)
+            if wi is None: continue
+            rated = np.flatnonzero(~np.isnan(self._X[wi]))
+            for u, (_, floor) in self.used.items():
+                if u in stale or u not in self._pos: continue
+                sim = self._Sx[self._pos[u], wi]
+                if sim > 0 and (floor[rated] <= sim).any():
+                    stale.add(u)
+        return stale
+
+    # a user rated something under the current R / S
+    def invalidate(self, user):
+        for u in self._stale([user]):
+            self._drop(u)
+
+    # swap in matrices rebuilt after new ratings, dropping only the affected vectors
+    def update(self, R, S, changed_users):
+        old_cols = self.R.columns
+        self._set_matrices(R, S)
+        if not R.columns.equals(old_cols):
+            # floors follow the items; a new item has floor 0 (any positive rater enters)
+            for u, (raters, floor) in self.used.items():
+                self.used[u] = (raters, pd.Series(floor, index=old_cols).reindex(R.columns).fillna(0.0).to_numpy())
+        for u in self._stale(changed_users):
+            self._drop(u)
+
 # Combining them => making it hybrid
 def hybrid_recommendations(content, R, S, user, query_title, alpha=0.5, top_n=5,
-                           title_col="title", id_col="item_id"):
+                           title_col=None, id_col="item_id", collab_cache=None):
+    title_col = resolve_title_col(content, title_col)
     df = content["df"]
     # Content-Based scores
     c_scores = content_scores_for_query(content, query_title, title_col=title_col)
 
     # Collab scores
-    collab = collab_scores_for_user(R, S, user)
-    collab = collab.reindex(df[id_col]).fillna(0.0).to_numpy()
+    if collab_cache is not None:
+        collab = collab_cache.get(user)
+    else:
+        collab = collab_scores_for_user(R, S, user)
+        collab = collab.reindex(df[id_col]).fillna(0.0).to_numpy()
 
     blended = alpha * c_scores.to_numpy() + (1 - alpha) * collab
 
@@ -103,6 +287,150 @@ def hybrid_recommendations(content, R, S, user, query_title, alpha=0.5, top_n=5,
     out["alpha"]   = alpha
     return out.reset_index(drop=True)
 
+# Batched hybrid: many (user, anchor title) pairs at once.
+# Content rows, collab rows and the seen mask are stacked into Q × N arrays, blended with a
+# per-row alpha and cut to top-n with argpartition. With n_workers > 1 the model arrays
+# (R, S, the content cos matrix) live in shared memory and a process pool fills the collab
+# rows and the per-row top-n in chunks, so nothing big is pickled per task.
+_SHARED = {}  # name -> ndarray view, set per worker process
+
+def _share(arrays):
+    blocks, specs = [], {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+        blocks.append(shm)
+        specs[name] = (shm.name, a.shape, a.dtype.str)
+    return blocks, specs
+
+def _attach(specs):
+    views, blocks = {}, []
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)  # keep mapped for the worker's lifetime
+        views[name] = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+    return views, blocks
+
+def _init_worker(specs, meta):
+    views, blocks = _attach(specs)
+    _SHARED.update(views, _blocks=blocks, **meta)
+
+def _collab_block(a, user_rows):
+    # collab score rows for the given users, aligned to the content items
+    out_rows = [o for o, _ in user_rows]
+    scores = collab_scores_matrix(a["R"], a["S"], [u for _, u in user_rows])
+    cols = a["item_cols"]
+    aligned = np.where(cols >= 0, scores[:, np.maximum(cols, 0)], 0.0)
+    a["collab"][out_rows] = np.nan_to_num(aligned, nan=0.0).astype(np.float32)
+
+def _blend_block(a, lo, hi, top_n):
+    cos = sparse.csr_matrix((a["cos_data"], a["cos_indices"], a["cos_indptr"]), shape=a["cos_shape"])
+    c = normalized_content_rows(cos, a["anchor_rows"][lo:hi])
+    co = a["collab"][a["collab_rows"][lo:hi]]
+    alpha = a["alpha"][lo:hi, None]
+    blended = alpha * c + (1 - alpha) * co
+
+    # exclude items each user already rated
+    urows = a["pair_user_rows"][lo:hi]
+    cols = a["item_cols"]
+    known = (urows >= 0)[:, None] & (cols >= 0)[None, :]
+    rated = known & ~np.isnan(a["R"][np.ix_(np.maximum(urows, 0), np.maximum(cols, 0))])
+    blended[rated] = -np.inf
+
+    take = min(top_n, blended.shape[1])
+    top = np.argpartition(-blended, take - 1, axis=1)[:, :take]
+    order = np.argsort(-np.take_along_axis(blended, top, axis=1), axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    a["top"][lo:hi] = top
+    a["top_content"][lo:hi] = np.take_along_axis(c, top, axis=1)
+    a["top_collab"][lo:hi] = np.take_along_axis(co, top, axis=1)
+    a["top_hybrid"][lo:hi] = np.take_along_axis(blended, top, axis=1)
+
+def _collab_task(user_rows):
+    _collab_block(_SHARED, user_rows)
+
+def _blend_task(args):
+    _blend_block(_SHARED, *args)
+
+def hybrid_recommendations_batch(content, R, S, pairs, alpha=0.5, top_n=5, title_col=None,
+                                 id_col="item_id", n_workers=1, chunk_size=512, collab_cache=None):
+    title_col = resolve_title_col(content, title_col)
+    df = content["df"]
+    users = [u for u, _ in pairs]
+    anchors = [t for _, t in pairs]
+    n_items = len(df)
+    take = min(top_n, n_items)
+
+    user_pos = {u: i for i, u in enumerate(R.index)}
+    uniq = list(dict.fromkeys(users))
+    collab_row = {u: i for i, u in enumerate(uniq)}
+
+    arrays = {
+        "R": R.to_numpy(dtype=float),
+        "S": S.reindex(index=R.index, columns=R.index).to_numpy(dtype=float),
+        "cos_data": content["cos"].data, "cos_indices": content["cos"].indices,
+        "cos_indptr": content["cos"].indptr,
+        "anchor_rows": content_rows(content, anchors),
+        "alpha": np.broadcast_to(np.asarray(alpha, dtype=float), (len(pairs),)).copy(),
+        "collab": np.zeros((len(uniq), n_items), dtype=np.float32),
+        "collab_rows": np.array([collab_row[u] for u in users], dtype=np.int64),
+        "pair_user_rows": np.array([user_pos.get(u, -1) for u in users], dtype=np.int64),
+        "item_cols": R.columns.get_indexer(df[id_col]),
+        "top": np.zeros((len(pairs), take), dtype=np.int64),
+        "top_content": np.zeros((len(pairs), take)),
+        "top_collab": np.zeros((len(pairs), take)),
+        "top_hybrid": np.zeros((len(pairs), take)),
+    }
+    meta = {"cos_shape": content["cos"].shape}
+
+    # collab rows: from the cache when warm, computed otherwise (only users R knows)
+    todo = []
+    for u in uniq:
+        if collab_cache is not None and u in collab_cache.vectors:
+            arrays["collab"][collab_row[u]] = collab_cache.vectors[u]
+        elif u in user_pos:
+            todo.append((collab_row[u], user_pos[u]))
+    user_chunks = [todo[i:i + max(1, chunk_size // 8)] for i in range(0, len(todo), max(1, chunk_size // 8))]
+    pair_chunks = [(lo, min(lo + chunk_size, len(pairs)), take) for lo in range(0, len(pairs), chunk_size)]
+
+    if n_workers > 1 and len(pairs) > chunk_size:
+        blocks, specs = _share(arrays)
+        try:
+            with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(specs, meta)) as pool:
+                list(pool.map(_collab_task, user_chunks))
+                list(pool.map(_blend_task, pair_chunks))
+            views, _ = _attach({k: specs[k] for k in ("collab", "top", "top_content", "top_collab", "top_hybrid")})
+            out = {k: v.copy() for k, v in views.items()}
+        finally:
+            for shm in blocks:
+                shm.close(); shm.unlink()
+    else:
+        a = dict(arrays, **meta)
+        for chunk in user_chunks: _collab_block(a, chunk)
+        for lo, hi, t in pair_chunks: _blend_block(a, lo, hi, t)
+        out = a
+
+    if collab_cache is not None:
+        for row, _ in todo:
+            collab_cache.put(uniq[row], out["collab"][row])
+
+    top = out["top"]
+    q = np.repeat(np.arange(len(pairs)), take)
+    flat = top.ravel()
+    res = pd.DataFrame({
+        "pair": q,
+        "user": np.asarray(users, dtype=object)[q],
+        "anchor": np.asarray(anchors, dtype=object)[q],
+        "rank": np.tile(np.arange(1, take + 1), len(pairs)),
+        id_col: df[id_col].to_numpy()[flat],
+        title_col: df[title_col].to_numpy()[flat],
+        "content": out["top_content"].ravel(),
+        "collab": out["top_collab"].ravel(),
+        "hybrid": out["top_hybrid"].ravel(),
+    })
+    return res[np.isfinite(res["hybrid"])].reset_index(drop=True)
+
 
 if __name__ == "__main__":
     items_df = pd.DataFrame({
@@ -133,3 +461,12 @@ if __name__ == "__main__":
 
     recs = hybrid_recommendations(content, R, S, user=1, query_title="Inception", alpha=0.6, top_n=5)
     print(recs)
+
+    cache = CollabCache(R, S, content["df"]["item_id"])
+    for anchor in ["Inception", "Arrival", "Gravity"]:  # only the first call predicts collab scores
+        print(hybrid_recommendations(content, R, S, user=1, query_title=anchor, alpha=0.6, top_n=3,
+                                     collab_cache=cache))
+
+    # every user × their own anchor in one call
+    pairs = [(1, "Inception"), (2, "Arrival"), (3, "Gravity"), (4, "The Matrix"), (5, "Ex Machina")]
+    print(hybrid_recommendations_batch(content, R, S, pairs, alpha=0.6, top_n=2))
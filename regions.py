@@ -0,0 +1,208 @@
+# regions.py
+#
+# Catalog sharding by city / region.
+#
+# gyms.GYMS mixes Montréal and Toronto venues; without sharding every request
+# filters and scores the whole list only for distance to push the other city
+# to the bottom. Here the catalog is split once into per-region shards, each
+# with its own filter index (and, via map_shards, any other derived model such
+# as a content similarity table). A request is routed by the user's location:
+#   - the home shard (nearest region center),
+#   - plus any shard whose area starts within border_km of the user,
+#   - plus the next-nearest shards while there are fewer than top_k results.
+# Users without a location get every shard (same as the unsharded path).
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from gyms import GYMS
+from recommendation_pipeline import (
+    AttributeFilter,
+    PipelineResult,
+    RecommendationPipeline,
+    RequestContext,
+)
+from recommender_system import _haversine
+
+
+@dataclass(frozen=True)
+class Region:
+    name: str
+    latitude: float
+    longitude: float
+    radius_km: float            # rough extent of the metro area
+
+
+REGIONS: Dict[str, Region] = {
+    r.name: r for r in (
+        Region("montreal", 45.5088, -73.5878, 30.0),
+        Region("toronto", 43.6532, -79.3832, 35.0),
+    )
+}
+
+
+def region_of(lat: float, lon: float, regions: Dict[str, Region] = REGIONS) -> str:
+    """Name of the region whose center is closest to (lat, lon)."""
+    return min(regions.values(), key=lambda r: _haversine(lat, lon, r.latitude, r.longitude)).name
+
+
+def partition(gyms: Iterable[dict], regions: Dict[str, Region] = REGIONS) -> Dict[str, List[dict]]:
+    """{region: [gym, ...]}, every gym in the region of its coordinates."""
+    out: Dict[str, List[dict]] = {name: [] for name in regions}
+    for g in gyms:
+        out[region_of(g["latitude"], g["longitude"], regions)].append(g)
+    return out
+
+
+# -----------------------------
+# Shards
+# -----------------------------
+
+@dataclass
+class Shard:
+    region: Region
+    gyms: List[dict]
+    filter: AttributeFilter
+
+    def __len__(self) -> int:
+        return len(self.gyms)
+
+
+def _build_shard(args: Tuple[Region, List[dict]]) -> Shard:
+    region, gyms = args
+    return Shard(region, gyms, AttributeFilter(gyms))
+
+
+def _call(args):
+    fn, region, gyms = args
+    return fn(region, gyms)
+
+
+def _map(fn, items: Sequence, n_workers: int) -> list:
+    if n_workers <= 1 or len(items) <= 1:
+        return [fn(it) for it in items]
+    with ProcessPoolExecutor(max_workers=min(n_workers, len(items))) as ex:
+        return list(ex.map(fn, items))
+
+
+class ShardFilter:
+    """
+    Several shards' filters together (cross-shard requests), merged back
+    into catalog order so ties rank as they do unsharded.
+    """
+    name = "filter:attributes"
+
+    def __init__(self, shards: Sequence[Shard], order: Dict[str, int]):
+        self.shards = list(shards)
+        self.order = order
+
+    def __call__(self, ctx: RequestContext) -> List[dict]:
+        out: List[dict] = []
+        for s in self.shards:
+            out.extend(s.filter(ctx))
+        out.sort(key=lambda g: self.order[g["name"]])
+        return out
+
+
+class ShardedCatalog:
+    def __init__(
+        self,
+        gyms: Iterable[dict] = GYMS,
+        regions: Dict[str, Region] = REGIONS,
+        border_km: float = 25.0,
+        n_workers: int = 1,
+    ):
+        """
+        n_workers > 1 builds the shards in separate processes.
+        border_km: users this close to another region's area also get its venues.
+        """
+        self.regions = regions
+        self.border_km = border_km
+        self.n_workers = n_workers
+        gyms = list(gyms)
+        self.order = {g["name"]: i for i, g in enumerate(gyms)}
+        parts = partition(gyms, regions)
+        jobs = [(regions[name], parts[name]) for name in regions if parts[name]]
+        self.shards: Dict[str, Shard] = {
+            s.region.name: s for s in _map(_build_shard, jobs, n_workers)
+        }
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def map_shards(self, fn: Callable[[Region, List[dict]], object]) -> Dict[str, object]:
+        """
+        {region: fn(region, gyms)} – per-shard derived models (content
+        similarity, ANN index, …), in parallel when n_workers > 1.
+        fn must be picklable (a module-level function) in that case.
+        """
+        names = list(self.shards)
+        jobs = [(fn, self.shards[n].region, self.shards[n].gyms) for n in names]
+        return dict(zip(names, _map(_call, jobs, self.n_workers)))
+
+    def route(self, lat: Optional[float], lon: Optional[float]) -> Tuple[List[str], List[str]]:
+        """
+        (regions to search, remaining regions nearest first).
+        Without a location every shard is searched.
+        """
+        if lat is None or lon is None:
+            return list(self.shards), []
+
+        by_dist = sorted(
+            self.shards,
+            key=lambda n: _haversine(lat, lon, self.regions[n].latitude, self.regions[n].longitude),
+        )
+        home, rest = by_dist[:1], []
+        for name in by_dist[1:]:
+            r = self.regions[name]
+            edge_km = _haversine(lat, lon, r.latitude, r.longitude) - r.radius_km
+            (home if edge_km <= self.border_km else rest).append(name)
+        return home, rest
+
+
+class ShardedRecommender:
+    """A RecommendationPipeline per shard combination, routed by location."""
+
+    def __init__(
+        self,
+        catalog: ShardedCatalog,
+        make_pipeline: Callable[..., RecommendationPipeline] = RecommendationPipeline,
+    ):
+        """make_pipeline(filters=...) builds the pipeline for a set of shards."""
+        self.catalog = catalog
+        self.make_pipeline = make_pipeline
+        self._pipelines: Dict[Tuple[str, ...], RecommendationPipeline] = {}
+
+    def _pipeline(self, names: Sequence[str]) -> RecommendationPipeline:
+        key = tuple(sorted(names))
+        pipe = self._pipelines.get(key)
+        if pipe is None:
+            shards = [self.catalog.shards[n] for n in key]
+            filt = shards[0].filter if len(shards) == 1 else ShardFilter(shards, self.catalog.order)
+            pipe = self._pipelines[key] = self.make_pipeline(filters=filt)
+        return pipe
+
+    def run(self, ctx: RequestContext, top_k: int = 15) -> PipelineResult:
+        names, rest = self.catalog.route(ctx.user_lat, ctx.user_lon)
+        result = self._pipeline(names).run(ctx, top_k)
+        # cross-shard fallback: widen to the next-nearest region until full
+        while len(result.names) < top_k and rest:
+            names = names + [rest.pop(0)]
+            result = self._pipeline(names).run(ctx, top_k)
+        return result
+
+
+if __name__ == "__main__":
+    import time
+
+    t0 = time.perf_counter()
+    catalog = ShardedCatalog()
+    print(f"built {len(catalog)} shards in {1000 * (time.perf_counter() - t0):.1f} ms:",
+          {n: len(s) for n, s in catalog.shards.items()})
+
+    rec = ShardedRecommender(catalog)
+    for where, (lat, lon) in {"montreal": (45.50, -73.57), "toronto": (43.65, -79.38)}.items():
+        ctx = RequestContext(["Boxing", "Parks"], None, None, lat, lon)
+        r = rec.run(ctx, top_k=5)
+        print(where, catalog.route(lat, lon)[0], r.n_filtered, r.names)
@@ -0,0 +1,261 @@
+# replay.py
+#
+# Replays traffic captured by traffic_capture.py and compares latency
+# distributions between runs.
+#
+#   python replay.py run traffic.jsonl --json base.json             # real pacing
+#   python replay.py run traffic.jsonl --speed 0 --concurrency 64   # flat out
+#   python replay.py stats traffic.jsonl --json prod.json           # as captured
+#   python replay.py compare base.json new.json --tolerance 0.1
+#
+# run: every pseudonymized user in the log ("user:<hash>") gets a synthetic
+# account, seeded like loadtest.py does, and every captured assistant session
+# ("session:<hash>") a fresh session; the requests are re-issued with those
+# ids, and redacted chat text with a stand-in for its intent. --speed keeps
+# the captured inter-arrival times (2 = twice as fast); 0 sends them in order
+# from --concurrency workers. Targets are the same as loadtest.py: --url, or
+# main.app in-process.
+#
+# Reports (run / stats / loadtest.py --json) are per-route percentiles;
+# compare prints both side by side and exits 1 when a route's p50/p95/p99
+# got slower by more than the tolerance.
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from loadtest import RouteStats, SyntheticUser, app_client, make_users, report, seed
+from traffic_capture import SESSION_PREFIX, TEXT, USER_PREFIX, read_log
+
+AUTH_ROUTES = {"/login", "/signup"}
+
+# redacted free text is replayed as a stand-in utterance with the same intent
+INTENT_SAMPLES = {
+    "greet": "hello", "help": "help", "time": "what's the time", "date": "what's the date",
+    "set_name": "my name is Alex", "get_name": "what's my name",
+    "remember_city": "remember my city is Montreal", "weather_city": "weather in Montreal",
+    "weather": "weather", "smalltalk": "how are you", "gyms_near": "boxing gyms near me",
+    "bye": "bye",
+}
+
+
+def label(record: Dict[str, Any]) -> str:
+    return f"{record['method']} {record['route']}"
+
+
+def _tokens(value: Any, prefix: str):
+    if isinstance(value, dict):
+        for v in value.values():
+            yield from _tokens(v, prefix)
+    elif isinstance(value, list):
+        for v in value:
+            yield from _tokens(v, prefix)
+    elif isinstance(value, str) and value.startswith(prefix):
+        yield value
+
+
+def _record_tokens(records: List[Dict[str, Any]], prefix: str) -> List[str]:
+    return sorted({
+        t for r in records
+        for t in _tokens([r["body"], r["query"], r.get("path_params")], prefix)
+    })
+
+
+def accounts_for(records: List[Dict[str, Any]], rng: random.Random) -> Dict[str, SyntheticUser]:
+    """One synthetic account per pseudonymized user in the log."""
+    tokens = _record_tokens(records, USER_PREFIX)
+    return dict(zip(tokens, make_users(len(tokens), rng, uuid.uuid4().hex[:8])))
+
+
+async def sessions_for(client: httpx.AsyncClient, records: List[Dict[str, Any]]) -> Dict[str, str]:
+    """One assistant session on the target per captured session."""
+    sessions = {}
+    for token in _record_tokens(records, SESSION_PREFIX):
+        r = await client.post("/assistant/sessions", json={})
+        r.raise_for_status()
+        sessions[token] = r.json()["session_id"]
+    return sessions
+
+
+def _stand_in(text: Dict[str, Any]) -> str:
+    return INTENT_SAMPLES.get(text.get("intent")) or "x" * int(text.get("len") or 1)
+
+
+def materialize(
+    record: Dict[str, Any], accounts: Dict[str, SyntheticUser], sessions: Dict[str, str], n: int
+) -> Tuple[str, str, List[Tuple[str, str]], Any]:
+    """(method, path, query, json body) with the synthetic accounts and sessions filled in."""
+    signup = record["route"] == "/signup"
+
+    def fill(value, key=None):
+        if isinstance(value, dict):
+            if value.get("redacted") == TEXT:
+                return _stand_in(value)
+            out = {k: fill(v, k) for k, v in value.items()}
+            user = accounts.get(value.get("email"))
+            if user is not None and record["route"] in AUTH_ROUTES:
+                out["password"] = user.password
+            return out
+        if isinstance(value, list):
+            return [fill(v) for v in value]
+        if not isinstance(value, str):
+            return value
+        if value in sessions:
+            return sessions[value]
+        user = accounts.get(value)
+        if user is None:
+            return value
+        if key == "email":
+            # a replayed signup must not collide with the seeded account
+            return f"replay-{n}-{user.email}" if signup else user.email
+        return user.user_id
+
+    path = record.get("path")
+    if path is None:
+        path = record["route"].format(**fill(record.get("path_params") or {}))
+    query = [(k, fill(v, k)) for k, v in record["query"]]
+    return record["method"], path, query, fill(record["body"])
+
+
+async def replay(
+    client: httpx.AsyncClient,
+    records: List[Dict[str, Any]],
+    accounts: Dict[str, SyntheticUser],
+    sessions: Dict[str, str],
+    speed: float,
+    concurrency: int,
+) -> Tuple[Dict[str, RouteStats], float]:
+    stats: Dict[str, RouteStats] = {label(r): RouteStats() for r in records}
+
+    async def issue(n: int, record: Dict[str, Any]):
+        method, path, query, body = materialize(record, accounts, sessions, n)
+        t0 = time.perf_counter()
+        try:
+            r = await client.request(method, path, params=query or None, json=body)
+            failed = r.status_code >= 400
+        except httpx.HTTPError:
+            failed = True
+        st = stats[label(record)]
+        st.latencies_ms.append(1000 * (time.perf_counter() - t0))
+        st.errors += failed
+
+    t0 = time.perf_counter()
+    if speed > 0:
+        # open loop: requests leave on the captured schedule, however slow the
+        # responses are
+        start = records[0]["ts"] if records else 0.0
+        tasks = []
+        for n, record in enumerate(records):
+            delay = (record["ts"] - start) / speed - (time.perf_counter() - t0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(issue(n, record)))
+        await asyncio.gather(*tasks)
+    else:
+        it = iter(enumerate(records))
+
+        async def worker():
+            for n, record in it:
+                await issue(n, record)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats, time.perf_counter() - t0
+
+
+async def run(args) -> Dict[str, dict]:
+    records = read_log(args.log)
+    if args.limit:
+        records = records[:args.limit]
+    rng = random.Random(args.seed)
+    accounts = accounts_for(records, rng)
+
+    async with app_client(args.url, args.concurrency) as client:
+        await seed(client, list(accounts.values()), args.ratings_per_user, args.concurrency, rng)
+        sessions = await sessions_for(client, records)
+        stats, elapsed = await replay(client, records, accounts, sessions, args.speed, args.concurrency)
+
+    pace = f"speed {args.speed:g}" if args.speed > 0 else f"as fast as possible, concurrency {args.concurrency}"
+    print(f"replayed {len(records)} requests for {len(accounts)} users ({pace}) in {elapsed:.2f}s")
+    return report(stats, elapsed)
+
+
+def captured_stats(log: str) -> Dict[str, dict]:
+    """The log's own server-side latencies, in the same report format."""
+    records = read_log(log)
+    stats: Dict[str, RouteStats] = {}
+    for r in records:
+        st = stats.setdefault(label(r), RouteStats())
+        st.latencies_ms.append(r["duration_ms"])
+        st.errors += r["status"] >= 400
+    elapsed = records[-1]["ts"] - records[0]["ts"] if records else 0.0
+    print(f"{len(records)} captured requests over {elapsed:.0f}s")
+    return report(stats, elapsed)
+
+
+def compare(base: Dict[str, dict], new: Dict[str, dict], tolerance: float) -> bool:
+    """Side-by-side percentiles; False when some route regressed past tolerance."""
+    ok = True
+    print(f"{'route':26s} {'pct':>4s} {'base':>9s} {'new':>9s} {'change':>8s}")
+    for route in [r for r in base if r in new]:
+        for pct in ("p50", "p95", "p99"):
+            b, n = base[route][pct], new[route][pct]
+            change = (n - b) / b if b else 0.0
+            worse = change > tolerance
+            ok &= not worse
+            print(f"{route:26s} {pct:>4s} {b:9.2f} {n:9.2f} {100 * change:+7.1f}%{'  REGRESSED' if worse else ''}")
+    only = sorted(set(base) ^ set(new))
+    if only:
+        print("in one run only:", ", ".join(only))
+    return ok
+
+
+def _write(rows: Dict[str, dict], path: Optional[str]) -> None:
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured API traffic and compare runs.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="re-issue a capture against a build")
+    p_run.add_argument("log")
+    p_run.add_argument("--url", help="base URL of a running server (default: main.app in-process)")
+    p_run.add_argument("--speed", type=float, default=1.0,
+                       help="time scale of the captured schedule; 0 = as fast as possible")
+    p_run.add_argument("--concurrency", type=int, default=32)
+    p_run.add_argument("--ratings-per-user", type=int, default=5)
+    p_run.add_argument("--limit", type=int, help="replay only the first N requests")
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--json", dest="json_out")
+
+    p_stats = sub.add_parser("stats", help="latencies recorded in a capture")
+    p_stats.add_argument("log")
+    p_stats.add_argument("--json", dest="json_out")
+
+    p_cmp = sub.add_parser("compare", help="compare two reports")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--tolerance", type=float, default=0.1,
+                       help="allowed slowdown per percentile (0.1 = 10%%)")
+
+    args = parser.parse_args()
+    if args.cmd == "run":
+        _write(asyncio.run(run(args)), args.json_out)
+    elif args.cmd == "stats":
+        _write(captured_stats(args.log), args.json_out)
+    else:
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        if not compare(base, new, args.tolerance):
+            sys.exit(1)
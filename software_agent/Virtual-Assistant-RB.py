@@ -1,11 +1,21 @@
+import asyncio
+import os
 import re
+import sys
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 #Context
 class Ctx:
     def __init__(self):
         self.last_intent = None
-        self.memory = {"user_name": None, "default_city": None}
+        # location / activities / ratings are filled in by the API from the user's profile
+        self.memory = {"user_name": None, "default_city": None,
+                       "location": None, "activities": None, "ratings": None}
 
     @property
     def time_of_day(self):
@@ -21,6 +31,16 @@ ctx = Ctx()
 NAME_RE = r"([\w'’\-]+)"
 CITY_RE = r"([\w\s'’\-]+)"
 
+ACTIVITY_WORDS = {
+    "boxing": "Boxing", "muay thai": "Muay Thai", "savate": "Savate",
+    "park": "Parks", "parks": "Parks", "spa": "Relax", "yoga": "Relax",
+    "relax": "Relax", "eat": "Eat", "food": "Eat",
+}
+ACTIVITY_RE = re.compile(r"\b(" + "|".join(sorted(ACTIVITY_WORDS, key=len, reverse=True)).replace(" ", r"\s+") + r")\b", re.I)
+
+# "<gym / place / spot / any activity word>(s) near me"
+PLACE_RE = "|".join(sorted(["gym", "place", "spot", *ACTIVITY_WORDS], key=len, reverse=True)).replace(" ", r"\s+")
+
 INTENTS = [
     ("greet",          re.compile(r"\b(hi|hello|hey|good\s(morning|afternoon|evening|night))\b", re.I)),
     ("help",           re.compile(r"\b(help|what\s+can\s+you\s+do|commands?)\b", re.I)),
@@ -32,68 +52,174 @@ INTENTS = [
     ("weather_city",   re.compile(rf"\bweather\s+in\s+{CITY_RE}\b", re.I)),
     ("weather",        re.compile(r"\b(weather|forecast)\b", re.I)),
     ("smalltalk",      re.compile(r"\b(how\s+are\s+you|what'?s\s+up|how'?s\s+it\s+going)\b", re.I)),
+    ("gyms_near",      re.compile(rf"\b({PLACE_RE})s?\s+(near|around|close\s+to)\s+(me|here)\b", re.I)),
     ("bye",            re.compile(r"\b(bye|goodbye|exit|quit)\b", re.I)),
 ]
 
+# Trigger words: every match of an intent's pattern contains one of them as a
+# whole word, so an utterance only runs the patterns whose triggers it has.
+# One combined scan finds the triggers; candidates then run in INTENTS order,
+# which keeps the priority and the captured groups of the plain loop.
+TRIGGERS = {
+    "greet":         ["hi", "hello", "hey", "good"],
+    "help":          ["help", "what", "command", "commands"],
+    "time":          ["time"],
+    "date":          ["date"],
+    "set_name":      ["name"],
+    "get_name":      ["name", "who"],
+    "remember_city": ["remember"],
+    "weather_city":  ["weather"],
+    "weather":       ["weather", "forecast"],
+    "smalltalk":     ["how", "hows", "what", "whats"],
+    "gyms_near":     ["near", "around", "close"],
+    "bye":           ["bye", "goodbye", "exit", "quit"],
+}
+
+_PRIORITY = {tag: i for i, (tag, _) in enumerate(INTENTS)}
+_BY_TRIGGER = {}
+for _tag, _words in TRIGGERS.items():
+    for _w in _words:
+        _BY_TRIGGER.setdefault(_w, []).append(_PRIORITY[_tag])
+TRIGGER_RE = re.compile(r"\b(?:" + "|".join(sorted(_BY_TRIGGER, key=len, reverse=True)) + r")\b", re.I)
+
 # Handlers
-def h_greet(m):
+def h_greet(m, ctx):
     n = ctx.memory["user_name"]
     return f"Good {ctx.time_of_day}" + (f", {n}!" if n else "!") + " How can I help you today?"
 
-def h_help(m):
+def h_help(m, ctx):
     return (
         "I can help with time, date, your name, simple weather, and small talk.\n"
         "- “what’s the time”, “what’s the date”\n"
         "- “my name is Alex” → “what’s my name”\n"
         "- “weather”, “weather in Montreal”, “remember my city is Calgary”\n"
+        "- “boxing gyms near me”, “parks near me”, “spa near me”\n"
         "- “bye” to exit"
     )
 
-def h_time(m): return datetime.now().strftime("It's %H:%M.")
-def h_date(m): return datetime.now().strftime("Today is %A, %B %d, %Y.")
+def h_time(m, ctx): return datetime.now().strftime("It's %H:%M.")
+def h_date(m, ctx): return datetime.now().strftime("Today is %A, %B %d, %Y.")
 
-def h_set_name(m):
+def h_set_name(m, ctx):
     name = m.group(1).strip().title()
     ctx.memory["user_name"] = name
     return f"Nice to meet you, {name}! I’ll remember that."
 
-def h_get_name(m):
+def h_get_name(m, ctx):
     n = ctx.memory["user_name"]
     return f"You're {n}." if n else "I don't know your name yet. Say “my name is <name>”."
 
-def h_remember_city(m):
+def h_remember_city(m, ctx):
     city = m.group(1).strip().title()
     ctx.memory["default_city"] = city
     return f"Okay, I’ll remember your city as {city}."
 
-def _weather_stub(city):
+def _weather_stub(city, ctx):
     city = (city or ctx.memory["default_city"] or "your area").title()
     return f"(Demo) Weather in {city}: " + {"morning":"clear","afternoon":"partly cloudy","evening":"cool breeze","night":"calm"}[ctx.time_of_day] + "."
 
-def h_weather_city(m): return _weather_stub(m.group(1).strip())
-def h_weather(m):      return _weather_stub(None)
-def h_smalltalk(m):    return "I'm doing well—processing intents and sipping data ☕️. What can I do for you?"
-def h_bye(m):          return "Goodbye! 👋"
+def h_weather_city(m, ctx): return _weather_stub(m.group(1).strip(), ctx)
+def h_weather(m, ctx):      return _weather_stub(None, ctx)
+def h_smalltalk(m, ctx):    return "I'm doing well—processing intents and sipping data ☕️. What can I do for you?"
+def h_bye(m, ctx):          return "Goodbye! 👋"
+
+def h_gyms_near(m, ctx):
+    from recommender_system import gyms_for_preferences
+
+    said = {ACTIVITY_WORDS[" ".join(w.lower().split())] for w in ACTIVITY_RE.findall(m.string)}
+    activities = sorted(said) or ctx.memory["activities"] or None
+    lat, lon = ctx.memory["location"] or (None, None)
+    names = gyms_for_preferences(activities, None, None, lat, lon,
+                                 user_ratings=ctx.memory["ratings"] or {}, top_k=5)
+    if not names:
+        return "I couldn't find anything matching that nearby."
+    where = "near you" if lat is not None else "in the catalog (share your location for nearby spots)"
+    return f"Top picks {where}: " + ", ".join(names) + "."
 
 HANDLERS = {
     "greet": h_greet, "help": h_help, "time": h_time, "date": h_date,
     "set_name": h_set_name, "get_name": h_get_name,
     "remember_city": h_remember_city, "weather_city": h_weather_city, "weather": h_weather,
-    "smalltalk": h_smalltalk, "bye": h_bye
+    "smalltalk": h_smalltalk, "gyms_near": h_gyms_near, "bye": h_bye
 }
 
+# handlers that touch data run off the event loop in respond_async
+BLOCKING_INTENTS = {"gyms_near"}
+
 # Core
-def detect_intent(text):
+def detect_intent_linear(text):
     for tag, pat in INTENTS:
         m = pat.search(text)
         if m: return tag, m
     return "fallback", None
 
-def respond(text):
+def detect_intent(text):
+    hits = TRIGGER_RE.findall(text)
+    if not hits: return "fallback", None
+    candidates = set()
+    for w in hits:
+        # re.I also matches Unicode case variants ("hı", "whatſ") that lower()
+        # doesn't map back to a trigger; those take the plain loop
+        ids = _BY_TRIGGER.get(w.lower())
+        if ids is None: return detect_intent_linear(text)
+        candidates.update(ids)
+    for i in sorted(candidates):
+        tag, pat = INTENTS[i]
+        m = pat.search(text)
+        if m: return tag, m
+    return "fallback", None
+
+FALLBACK = 'I’m not sure I understood. Type “help” for examples.'
+
+def respond(text, ctx=ctx):
     tag, match = detect_intent(text)
     ctx.last_intent = tag
-    if tag == "fallback": return 'I’m not sure I understood. Type “help” for examples.'
-    return HANDLERS[tag](match)
+    if tag == "fallback": return FALLBACK
+    return HANDLERS[tag](match, ctx)
+
+async def respond_async(text, ctx):
+    """(intent, reply); regex work inline, data-backed handlers in a thread."""
+    tag, match = detect_intent(text)
+    ctx.last_intent = tag
+    if tag == "fallback": return tag, FALLBACK
+    if tag in BLOCKING_INTENTS:
+        return tag, await asyncio.to_thread(HANDLERS[tag], match, ctx)
+    return tag, HANDLERS[tag](match, ctx)
+
+# Sessions: one Ctx per chat, least recently used first; bounded in size and
+# idle time. Used from a single event loop, so no locking.
+class SessionStore:
+    def __init__(self, max_sessions=10000, idle_s=30 * 60):
+        self.max_sessions = max_sessions
+        self.idle_s = idle_s
+        self._sessions = OrderedDict()          # id → (Ctx, last seen)
+
+    def __len__(self): return len(self._sessions)
+
+    def _evict(self, now):
+        while self._sessions:
+            sid, (_, seen) = next(iter(self._sessions.items()))
+            if now - seen < self.idle_s and len(self._sessions) <= self.max_sessions: break
+            del self._sessions[sid]
+
+    def create(self, ctx=None):
+        sid = uuid.uuid4().hex
+        now = time.monotonic()
+        self._sessions[sid] = (ctx or Ctx(), now)
+        self._evict(now)
+        return sid
+
+    def get(self, sid):
+        now = time.monotonic()
+        self._evict(now)
+        hit = self._sessions.get(sid)
+        if hit is None: return None
+        self._sessions[sid] = (hit[0], now)
+        self._sessions.move_to_end(sid)
+        return hit[0]
+
+    def drop(self, sid):
+        return self._sessions.pop(sid, None) is not None
 
 def repl():
     print('Assistant ready. Type “help”. “bye” to exit.')
@@ -105,8 +231,44 @@ def repl():
             break
         if not user: continue
         if detect_intent(user)[0] == "bye":
-            print(h_bye(None)); break
+            print(h_bye(None, ctx)); break
         print(respond(user))
 
+def benchmark(n=20000, seed=0):
+    """Throughput of detect_intent vs. the linear scan on a synthetic chat corpus."""
+    import random
+    rng = random.Random(seed)
+    intents = [
+        "hi there", "Good morning!", "help", "what can you do", "what's the time",
+        "today's date please", "my name is Alex", "what's my name", "who am i",
+        "remember my city is Calgary", "weather in Montreal", "any forecast?",
+        "how are you", "what's up", "bye",
+    ]
+    chatter = [
+        "can you book a boxing class for tomorrow", "I liked the last gym a lot",
+        "which parks are open near the old port", "recommend a spa downtown",
+        "is there muay thai in the plateau", "thanks, that was useful",
+        "show me something cheaper", "lol ok", "I want to train outdoors",
+        "anything with sparring for beginners",
+    ]
+    corpus = [rng.choice(intents if rng.random() < 0.3 else chatter) for _ in range(n)]
+
+    # Unicode case variants that re.I matches but lower() doesn't fold back
+    odd = ["hı", "quıt", "whatſ up", "HELLO", "ſo, the weather?"]
+    for a in corpus[:2000] + odd:
+        ta, ma = detect_intent(a)
+        tb, mb = detect_intent_linear(a)
+        assert ta == tb and (ma and ma.groups()) == (mb and mb.groups()), a
+
+    for fn in (detect_intent_linear, detect_intent):
+        t0 = time.perf_counter()
+        for u in corpus:
+            fn(u)
+        dt = time.perf_counter() - t0
+        print(f"{fn.__name__:22s} {n / dt:10.0f} utterances/s")
+
 if __name__ == "__main__":
-    repl()
+    if "--bench" in sys.argv:
+        benchmark()
+    else:
+        repl()
@@ -0,0 +1,203 @@
+# traffic_capture.py
+#
+# Opt-in capture of sampled API traffic, for replay.py.
+#
+# TrafficRecorder is an ASGI middleware; main.py installs it when TRAFFIC_LOG
+# is set. A sampled request becomes one JSON line:
+#   {"ts", "method", "route", "path", "path_params", "query", "body", "status",
+#    "duration_ms"}
+#   ts      wall clock (s) at arrival, so replays keep the relative timing
+#   route   the matched route template ("/recommendations"), else the path
+#   path    null for templated routes: rebuilt from path_params on replay
+#   query / body / path_params
+#           only the fields allowlisted for the route (BODY_FIELDS,
+#           QUERY_FIELDS, PATH_FIELDS), each through its rule; everything
+#           else, and bodies of routes not listed, is dropped
+# Rules: user_id and email values become "user:<hash>" and session ids
+# "session:<hash>" (salted sha256, stable within a log); coordinates are
+# rounded to COORD_DECIMALS (≈ 1 km); free text is replaced by
+# {"redacted": "text", "len"}, plus "intent" (from classify_text) for chat.
+# The replay tool maps each hash to a synthetic account or session.
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+KEEP, USER, SESSION, COORD, TEXT, CHAT = "keep", "user", "session", "coord", "text", "chat"
+COORD_DECIMALS = 2
+USER_PREFIX = "user:"
+SESSION_PREFIX = "session:"
+MAX_BODY_BYTES = 64 * 1024              # larger bodies are recorded as null
+
+_LOCATION = {"latitude": COORD, "longitude": COORD}
+_PREFERENCES = {"activities": KEEP, "env": KEEP, "intensity": KEEP, "time": KEEP}
+
+# route template → allowlisted body fields (nested dicts for nested objects)
+BODY_FIELDS: Dict[str, Dict[str, Any]] = {
+    "/signup": {"email": USER},
+    "/login": {"email": USER},
+    "/api/preferences/": {"user_id": USER, **_PREFERENCES},
+    "/user/preferences": {"user_id": USER, "preferences": _PREFERENCES},
+    "/map/search": {"searchQuery": TEXT},
+    "/map/location": _LOCATION,
+    "/user/location": {"user_id": USER, "location": _LOCATION},
+    "/user/time": {"user_id": USER, "time": KEEP},
+    "/user/weather": {"user_id": USER, "main": KEEP, "description": KEEP, "temp_c": KEEP,
+                      "location": _LOCATION},
+    "/api/ratings/": {"user_id": USER, "place_id": KEEP, "gym_name": KEEP, "rating": KEEP},
+    "/api/update_location": {"user_id": USER, "lat": COORD, "lon": COORD},
+    "/assistant/sessions": {"user_id": USER},
+    "/assistant/messages": {"session_id": SESSION, "text": CHAT},
+}
+QUERY_FIELDS: Dict[str, str] = {"user_id": USER}
+PATH_FIELDS: Dict[str, str] = {"session_id": SESSION}
+
+
+def user_token(value: Any, salt: str) -> str:
+    digest = hashlib.sha256(f"{salt}:{value}".encode("utf-8")).hexdigest()[:16]
+    return USER_PREFIX + digest
+
+
+def session_token(value: Any, salt: str) -> str:
+    return SESSION_PREFIX + user_token(value, salt)[len(USER_PREFIX):]
+
+
+def _apply(rule: str, v: Any, salt: str, classify: Optional[Callable[[str], str]]) -> Any:
+    if v is None or rule == KEEP:
+        return v
+    if rule == USER:
+        return user_token(v, salt)
+    if rule == SESSION:
+        return session_token(v, salt)
+    if rule == COORD:
+        return round(v, COORD_DECIMALS) if isinstance(v, (int, float)) else None
+    text = str(v)
+    out = {"redacted": TEXT, "len": len(text)}
+    if rule == CHAT:
+        out["intent"] = classify(text) if classify else None
+    return out
+
+
+def scrub(value: Any, fields: Dict[str, Any], salt: str,
+          classify: Optional[Callable[[str], str]] = None) -> Any:
+    """Only the allowlisted fields of a JSON object, each through its rule."""
+    if not isinstance(value, dict):
+        return None
+    out = {}
+    for k, rule in fields.items():
+        if k not in value:
+            continue
+        if isinstance(rule, dict):
+            out[k] = scrub(value[k], rule, salt, classify)
+        else:
+            out[k] = _apply(rule, value[k], salt, classify)
+    return out
+
+
+def scrub_query(query: str, salt: str) -> List[Tuple[str, str]]:
+    return [
+        (k, _apply(QUERY_FIELDS[k], v, salt, None))
+        for k, v in parse_qsl(query, keep_blank_values=True)
+        if k in QUERY_FIELDS
+    ]
+
+
+class TrafficRecorder:
+    def __init__(
+        self,
+        app,
+        path: str = "traffic.jsonl",
+        sample_rate: float = 0.01,
+        salt: Optional[str] = None,
+        seed: Optional[int] = None,
+        classify_text: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        salt: keeps user hashes stable across restarts when set.
+        classify_text: text → label (e.g. the assistant's intent), recorded
+        in place of free text.
+        """
+        self.app = app
+        self.classify_text = classify_text
+        self.path = path
+        self.sample_rate = sample_rate
+        self.salt = salt if salt is not None else os.urandom(8).hex()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self.recorded = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._rng.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        ts = time.time()
+        t0 = time.perf_counter()
+        chunks: List[bytes] = []
+        size = 0
+        status = 500
+
+        async def receive_tee():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                size += len(message.get("body", b""))
+                if size <= MAX_BODY_BYTES:
+                    chunks.append(message.get("body", b""))
+            return message
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_tee, send_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            self._write({
+                "ts": ts,
+                "method": scope["method"],
+                "route": route or scope["path"],
+                # templated routes are rebuilt from path_params on replay
+                "path": None if route and "{" in route else scope["path"],
+                "path_params": scrub(scope.get("path_params") or {}, PATH_FIELDS, self.salt),
+                "query": scrub_query(scope.get("query_string", b"").decode("latin-1"), self.salt),
+                "body": self._body(route, chunks, size),
+                "status": status,
+                "duration_ms": 1000 * (time.perf_counter() - t0),
+            })
+
+    def _body(self, route: Optional[str], chunks: List[bytes], size: int) -> Any:
+        fields = BODY_FIELDS.get(route)
+        if fields is None or not size or size > MAX_BODY_BYTES:
+            return None
+        try:
+            return scrub(json.loads(b"".join(chunks)), fields, self.salt, self.classify_text)
+        except ValueError:
+            return None                 # not JSON: replay without a body
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.recorded += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path: str) -> List[Dict[str, Any]]:
+    """Records in arrival order."""
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r["ts"])
+    return records
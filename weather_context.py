@@ -0,0 +1,210 @@
+# weather_context.py
+#
+# Shared weather per geographic cell.
+#
+# Clients push the forecast they fetched (PUT /user/weather). Every client in
+# the same area reports the same conditions, so reports are kept per geocell
+# (cold_start.geocell on a coarser grid) with a TTL:
+#   - the first report for a cell is stored (in memory, and one upsert into
+#     the weather collection so other API workers see it),
+#   - further reports for that cell are dropped until the entry expires.
+# Expired cells are swept out by the report path, at most once per TTL.
+# Writes go from one per user to one per cell per TTL.
+#
+# outdoor_suitability() turns conditions into a 0..1 factor that the
+# recommender applies to env == "Outdoor" venues (parks).
+
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from cold_start import geocell
+
+CELL_DEG = 0.1                          # ≈ 11 km: one forecast area
+TTL_S = 30 * 60
+MISS_TTL_S = 60                         # re-check the collection for empty cells
+
+# OpenWeather "main" groups → how pleasant it is to be outside
+CONDITION_FACTOR: Dict[str, float] = {
+    "clear": 1.0,
+    "clouds": 0.9,
+    "mist": 0.7,
+    "haze": 0.7,
+    "fog": 0.6,
+    "smoke": 0.4,
+    "dust": 0.4,
+    "sand": 0.4,
+    "drizzle": 0.5,
+    "snow": 0.4,
+    "rain": 0.3,
+    "squall": 0.2,
+    "thunderstorm": 0.1,
+    "ash": 0.1,
+    "tornado": 0.0,
+}
+
+COMFORT_C = (10.0, 28.0)                # no temperature penalty inside this range
+LIMIT_C = (-15.0, 38.0)                 # factor bottoms out at these
+
+
+@dataclass(frozen=True)
+class WeatherReport:
+    main: str
+    description: Optional[str]
+    temp_c: Optional[float]
+    updated_at: datetime
+
+
+def outdoor_suitability(report: Optional[WeatherReport]) -> float:
+    """0 (stay inside) … 1 (great outdoor weather); 1 when unknown."""
+    if report is None:
+        return 1.0
+    factor = CONDITION_FACTOR.get((report.main or "").lower(), 1.0)
+
+    t = report.temp_c
+    if t is not None:
+        lo, hi = COMFORT_C
+        min_c, max_c = LIMIT_C
+        if t < lo:
+            factor *= max(0.0, (t - min_c) / (lo - min_c))
+        elif t > hi:
+            factor *= max(0.0, (max_c - t) / (max_c - hi))
+    return factor
+
+
+class WeatherCache:
+    def __init__(self, collection=None, ttl_s: float = TTL_S, cell_deg: float = CELL_DEG):
+        """collection: optional Mongo collection shared by API workers."""
+        self.collection = collection
+        self.ttl_s = ttl_s
+        self.cell_deg = cell_deg
+        self._cells: Dict[str, Tuple[WeatherReport, float]] = {}   # cell → (report, expires)
+        self._misses: Dict[str, float] = {}                          # cell → retry after
+        self._lock = threading.Lock()
+        self._next_evict = time.monotonic() + ttl_s
+        self.writes = 0
+        self.deduped = 0
+
+    def cell(self, lat: Optional[float], lon: Optional[float]) -> Optional[str]:
+        if lat is None or lon is None:
+            return None
+        return geocell(lat, lon, self.cell_deg)
+
+    def _cached(self, cell: str, now: float) -> Tuple[Optional[WeatherReport], bool]:
+        """(fresh in-memory report, should the collection be checked?); under the lock."""
+        hit = self._cells.get(cell)
+        if hit is not None and hit[1] > now:
+            return hit[0], False
+        return None, self.collection is not None and self._misses.get(cell, 0.0) <= now
+
+    def _load(self, cell: str, now: float) -> Optional[WeatherReport]:
+        """The cell's report from the collection; the read happens outside the lock."""
+        doc = self.collection.find_one({"cell": cell})
+        age = (datetime.utcnow() - doc["updated_at"]).total_seconds() if doc else self.ttl_s
+        with self._lock:
+            hit = self._cells.get(cell)
+            if hit is not None and hit[1] > now:
+                return hit[0]               # a report landed while we were reading
+            if age >= self.ttl_s:
+                self._misses[cell] = now + MISS_TTL_S
+                return None
+            report = WeatherReport(doc["main"], doc.get("description"), doc.get("temp_c"), doc["updated_at"])
+            self._cells[cell] = (report, now + self.ttl_s - age)
+            return report
+
+    def _fresh(self, cell: str, now: float) -> Optional[WeatherReport]:
+        with self._lock:
+            report, check = self._cached(cell, now)
+        if check:
+            report = self._load(cell, now)
+        return report
+
+    def report(
+        self,
+        lat: Optional[float],
+        lon: Optional[float],
+        main: str,
+        description: Optional[str] = None,
+        temp_c: Optional[float] = None,
+    ) -> Tuple[Optional[WeatherReport], bool]:
+        """
+        A client's report → (current report for the cell, stored?).
+        Reports for a cell that already has fresh weather are dropped.
+        """
+        cell = self.cell(lat, lon)
+        if cell is None:
+            return None, False
+
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_evict:
+                self._evict(now)
+        current = self._fresh(cell, now)
+
+        with self._lock:
+            if current is None:
+                # another report may have been stored while the collection was read
+                current, _ = self._cached(cell, now)
+            if current is not None:
+                self.deduped += 1
+                return current, False
+
+            report = WeatherReport(main, description, temp_c, datetime.utcnow())
+            self._cells[cell] = (report, now + self.ttl_s)
+            self._misses.pop(cell, None)
+            self.writes += 1
+
+        if self.collection is not None:
+            try:
+                self.collection.update_one(
+                    {"cell": cell},
+                    {"$set": {
+                        "main": main,
+                        "description": description,
+                        "temp_c": temp_c,
+                        "updated_at": report.updated_at,
+                    }},
+                    upsert=True,
+                )
+            except DuplicateKeyError:
+                pass            # another worker created the cell first
+        return report, True
+
+    def get(self, lat: Optional[float], lon: Optional[float]) -> Optional[WeatherReport]:
+        cell = self.cell(lat, lon)
+        if cell is None:
+            return None
+        return self._fresh(cell, time.monotonic())
+
+    def suitability(self, lat: Optional[float], lon: Optional[float]) -> float:
+        return outdoor_suitability(self.get(lat, lon))
+
+    def _evict(self, now: float) -> int:
+        stale = [c for c, (_, exp) in self._cells.items() if exp <= now]
+        for c in stale:
+            del self._cells[c]
+        self._misses = {c: t for c, t in self._misses.items() if t > now}
+        self._next_evict = now + self.ttl_s
+        return len(stale)
+
+    def evict_expired(self) -> int:
+        with self._lock:
+            return self._evict(time.monotonic())
+
+
+if __name__ == "__main__":
+    import random
+
+    cache = WeatherCache(ttl_s=60)
+    rng = random.Random(0)
+    for _ in range(10000):
+        lat, lon = 45.45 + rng.random() * 0.15, -73.70 + rng.random() * 0.15
+        cache.report(lat, lon, "Rain", "light rain", 6.0)
+    print(f"10000 reports → {cache.writes} writes, {cache.deduped} deduplicated")
+    for main, t in [("Clear", 22), ("Clouds", 5), ("Rain", 12), ("Snow", -8), ("Clear", 34)]:
+        r = WeatherReport(main, None, t, datetime.utcnow())
+        print(f"{main:8s} {t:4d}°C → outdoor suitability {outdoor_suitability(r):.2f}")